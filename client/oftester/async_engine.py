@@ -0,0 +1,208 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from oftester.convergence import async_wait_for_convergence
+from oftester.scenario.model import STEP_RUN, STEP_SWITCHES, STEP_WAIT
+
+MAX_WORKERS = 32
+
+
+class AsyncScenarioEngine:
+    """
+    Runs a Scenario on an asyncio loop so independent blocking calls
+    overlap: every switch runs and is polled concurrently while waiting for
+    steady state.  add_flows(), send_packet_outs(), cleanup_switch() and
+    bring_switches_full_load() are async variants of the Scenario methods
+    that send independent requests at the same time.  The report data of a
+    packet size is collected once its traffic has drained.
+
+    The blocking Scenario methods run in a thread pool, so scenarios need
+    no changes and the synchronous Scenario.execute() keeps working.
+    """
+
+    def __init__(self, scenario, report_generator=None, store=None,
+                 resume=False, max_workers=MAX_WORKERS):
+        self.scenario = scenario
+        self.report_generator = report_generator
+        self.store = store
+        self.resume = resume
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def call(self, fn, *args, **kwargs):
+        """
+        Runs a blocking function in the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def gather(self, calls, limit=None):
+        """
+        Runs the blocking calls at the same time, at most limit at once.
+
+        :param calls: (iterable) (fn, args, kwargs) tuples
+        :param limit: (int) calls in flight, all of them by default
+        :return: (list) results in the order of the calls
+        """
+        calls = list(calls)
+        semaphore = asyncio.Semaphore(limit or len(calls) or 1)
+
+        async def call(fn, args, kwargs):
+            async with semaphore:
+                return await self.call(fn, *args, **kwargs)
+
+        return await asyncio.gather(*(call(*c) for c in calls))
+
+    async def add_flow(self, flowmod):
+        return await self.call(self.scenario.add_flow, flowmod)
+
+    async def add_flows(self, flowmods):
+        """
+        Installs flows that do not depend on each other with up to
+        flow_pipeline_depth flow mods in flight, whatever switch they are
+        for.
+
+        :param flowmods: (iterable) flows in the ofctl_rest format
+        :return: (list) responses in the order of the flows
+        """
+        return await self.gather(
+            ((self.scenario.add_flow, (flowmod,), {}) for flowmod in flowmods),
+            self.scenario.flow_pipeline_depth)
+
+    async def send_packet_out(self, dpid, *args, **kwargs):
+        return await self.call(self.scenario.send_packet_out, dpid, *args,
+                               **kwargs)
+
+    async def send_packet_outs(self, packet_outs):
+        """
+        Sends several packet outs at the same time.
+
+        :param packet_outs: (iterable) keyword arguments of
+        Scenario.send_packet_out(), one dict per packet out
+        """
+        await self.gather((self.scenario.send_packet_out, (), packet_out)
+                          for packet_out in packet_outs)
+
+    async def cleanup_switch(self, dpid=None):
+        """
+        Cleans up one switch or all of them at the same time.
+
+        :param dpid: Switch DPID, all switches by default
+        """
+        if dpid:
+            return await self.call(self.scenario.cleanup_switch, dpid)
+        await self.for_switches(self.scenario.cleanup_switch)
+
+    async def bring_switches_full_load(self, loads):
+        """
+        Scenario.bring_switch_full_load() for several switches: they are
+        saturated at the same time and then share a single peak load wait
+        instead of waiting one after the other.
+
+        :param loads: (dict) dpid -> keyword arguments of
+        Scenario.saturate_switch() besides the dpid
+        :return: (dict) dpid -> saturation result
+        """
+        scenario = self.scenario
+        dpids = list(loads)
+        results = await self.gather((scenario.saturate_switch, (dpid,),
+                                     loads[dpid]) for dpid in dpids)
+        await self.wait_for_steady_state('peak_load',
+                                         scenario.min_sleep_after_peak_load,
+                                         scenario.sleep_after_peak_load,
+                                         dpids=dpids)
+        return dict(zip(dpids, results))
+
+    async def for_switches(self, fn):
+        """
+        Runs fn(dpid) for all switches at the same time.
+        """
+        await asyncio.gather(*(self.call(fn, dpid)
+                               for dpid in self.scenario.environment.switches))
+
+    async def rate_samples(self, dpid):
+        return await self.call(self.scenario.rate_samples, dpid)
+
+    async def wait_for_steady_state(self, phase, min_duration, max_duration,
+                                    dpids=None):
+        """
+        Scenario.wait_for_steady_state() polling all switches at once.
+        """
+        scenario = self.scenario
+        if not scenario.adaptive_waits:
+            await asyncio.sleep(max_duration)
+            return False
+        detectors = scenario.convergence_detectors(dpids)
+        converged, seconds = await async_wait_for_convergence(
+            self.rate_samples, detectors, min_duration, max_duration,
+            scenario.convergence_poll_interval)
+        scenario.record_convergence(phase, detectors, converged, seconds)
+        return converged
+
+    async def run(self):
+        """
+        Scenario.run() with a coroutine per switch, at most
+        max_parallel_switches at a time.
+        """
+        scenario = self.scenario
+        switches = list(scenario.environment.switches.values())
+        if not switches:
+            return
+        limit = asyncio.Semaphore(scenario.max_parallel_switches or
+                                  len(switches))
+
+        async def run_switch(sw):
+            async with limit:
+                try:
+                    await self.call(scenario.run_switch, sw)
+                except Exception as e:
+                    logging.exception('%s failed on switch %s',
+                                      scenario.name, sw.dpid)
+                    scenario.time_metrics[-1].errors[sw.dpid] = str(e)
+
+        await asyncio.gather(*(run_switch(sw) for sw in switches))
+
+    async def collect_data(self):
+        if self.report_generator is not None:
+            await self.call(self.report_generator.collect_data)
+
+    async def execute(self):
+        """
+        The steps of Scenario.phases() followed by collecting the report
+        data once the traffic has drained.
+        """
+        scenario = self.scenario
+        logging.info('Running %s test case asynchronously', scenario.name)
+        logging.info('Packet size of %i', scenario.current_packet_size())
+        for step in scenario.phases():
+            kind, args = step[0], step[1:]
+            if kind == STEP_SWITCHES:
+                await self.for_switches(*args)
+            elif kind == STEP_RUN:
+                await self.run()
+            elif kind == STEP_WAIT:
+                await self.wait_for_steady_state(*args)
+            else:
+                await self.call(*args)
+        await self.collect_data()
+
+    async def execute_all(self):
+        """
+        Runs every remaining packet size of the scenario, checkpointing
+        them to the store if there is one.
+        """
+        scenario = self.scenario
+        try:
+            while scenario.has_next_packet_size():
+                scenario.next_packet_size()
+                if self.resume and self.store.restore(
+                        scenario, self.report_generator):
+                    continue
+                await self.execute()
+                if self.store:
+                    await self.call(self.store.save, scenario,
+                                    self.report_generator)
+        finally:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,116 @@
+"""
+Packet conservation along the snake.
+
+Ports are connected in pairs (start, start + 1), (start + 2, start + 3)...
+and the snake rules forward from the second port of a pair to the first
+port of the next one, the last port back to the first one and the same in
+reverse.  Every packet therefore crosses a link, where the tx counter of
+one port has to match the rx counter of its peer, and a rule, where the rx
+counter of the in port has to match the tx counter of the out port.  The
+first hop where fewer packets come out than went in is where they are
+dropped.
+"""
+
+LINK = 'link'
+RULE = 'rule'
+FORWARD = 'forward'
+REVERSE = 'reverse'
+LOSS_TOLERANCE = 0.001
+
+
+def snake_hops(start_port, end_port):
+    """
+    Hops of the snake in the order packets pass them, first the forward
+    direction from start_port to end_port and the rule back to start_port,
+    then the reverse direction.
+
+    :param start_port: (int) first port of the snake
+    :param end_port: (int) last port of the snake
+    :return: (list) dicts with kind, direction, src and dst port
+    """
+    hops = []
+    for port in range(start_port, end_port, 2):
+        hops.append({'kind': LINK, 'direction': FORWARD,
+                     'src': port, 'dst': port + 1})
+        hops.append({'kind': RULE, 'direction': FORWARD, 'src': port + 1,
+                     'dst': port + 2 if port + 2 < end_port else start_port})
+    for port in range(end_port, start_port, -2):
+        hops.append({'kind': RULE, 'direction': REVERSE,
+                     'src': port + 1 if port < end_port else start_port,
+                     'dst': port})
+        hops.append({'kind': LINK, 'direction': REVERSE,
+                     'src': port, 'dst': port - 1})
+    return hops
+
+
+def hop_name(hop):
+    return '%s %s->%s' % (hop['kind'], hop['src'], hop['dst'])
+
+
+def flow_for_port(flows, in_port, table_id=0):
+    """
+    Flow of the table that packets coming in on a port hit: the one with
+    the highest priority matching the port or any port.
+
+    :param flows: (list) flow stats as returned by ofctl_rest
+    :return: (dict) or None if no flow matches
+    """
+    candidates = [flow for flow in flows
+                  if flow.get('table_id', 0) == table_id and
+                  flow.get('match', {}).get('in_port', in_port) == in_port]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda flow: flow.get('priority', 0))
+
+
+def analyze(start_port, end_port, before, after, seconds, flows=None,
+            tolerance=LOSS_TOLERANCE):
+    """
+    Per hop packet deltas of the snake between two port stats snapshots.
+
+    A hop drops packets if more than tolerance of what went in is missing.
+    Rule hops name the cookie of the flow the packets hit, which is the
+    scenario rule rather than the snake if one takes over the port.
+
+    :param start_port: (int) first port of the snake
+    :param end_port: (int) last port of the snake
+    :param before: (dict) port_no -> port stats at the start
+    :param after: (dict) port_no -> port stats at the end
+    :param seconds: (float) time between the snapshots
+    :param flows: (list) flow stats of the switch to find the cookies in
+    :param tolerance: (float) loss ratio below which a hop is lossless
+    :return: (dict) hops in snake order, the dropping ones and the worst
+    """
+    def delta(port, counter):
+        return after[port][counter] - before[port][counter]
+
+    hops = []
+    for hop in snake_hops(start_port, end_port):
+        packets_in = delta(hop['src'], 'rx_packets' if hop['kind'] == RULE
+                           else 'tx_packets')
+        packets_out = delta(hop['dst'], 'tx_packets' if hop['kind'] == RULE
+                            else 'rx_packets')
+        lost = packets_in - packets_out
+        hop.update({
+            'name': hop_name(hop),
+            'packets_in': packets_in,
+            'packets_out': packets_out,
+            'lost': lost,
+            'loss': lost / packets_in if packets_in else 0.0,
+            'in_pps': packets_in / seconds if seconds else 0.0,
+            'out_pps': packets_out / seconds if seconds else 0.0,
+            'lost_pps': lost / seconds if seconds else 0.0
+        })
+        hop['dropping'] = hop['loss'] > tolerance
+        if hop['kind'] == RULE and flows is not None:
+            flow = flow_for_port(flows, hop['src'])
+            hop['cookie'] = flow['cookie'] if flow else None
+        hops.append(hop)
+    drops = [hop for hop in hops if hop['dropping']]
+    return {
+        'seconds': seconds,
+        'hops': hops,
+        'drops': [hop['name'] for hop in drops],
+        'worst': max(drops, key=lambda hop: hop['lost'])['name']
+        if drops else None
+    }
@@ -1,4 +1,6 @@
 OFPP_IN_PORT = 4294967288
+OFPTT_ALL = 255
+COOKIE_MASK_EXACT = 0xffffffffffffffff
 
 COOKIE_LOOP = 100
 COOKIE_GOTO_TABLE = 101
@@ -20,6 +22,16 @@ COOKIE_MULTICAST_GOTO_TABLE = 116
 COOKIE_MULTICAST_GROUP = 117
 COOKIE_CONNECTED_DEVICES = 118
 COOKIE_RTL = 119
-STATS_INTERVAL = 10  # This is set in OpenTsdbCollector
+COOKIE_PROBE = 120
+COOKIE_PACKET_IN = 121
+COOKIE_FLOW_SCALE = 122
+COOKIE_DRAIN = 123
+COOKIE_SNAKE_SINK = 124
+# every cookie above, new ones have to stay in the range and extend
+# TESTER_COOKIES of RyuToOpentsdb
+TESTER_COOKIES = range(COOKIE_LOOP, COOKIE_SNAKE_SINK + 1)
+STATS_INTERVAL = 10  # Default STATS_INTERVAL of RyuToOpentsdb
 
 GROUP_ID = 1
+
+PROBE_UDP_PORT = 10001  # Default udp_dst_port of TpnRyuUtils probes
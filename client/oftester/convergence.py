@@ -0,0 +1,144 @@
+import asyncio
+import collections
+import math
+import time
+
+Z_95 = 1.96
+
+
+def coefficient_of_variation(values):
+    """
+    Sample standard deviation relative to the mean.  A series of zeros has
+    no variation at all.
+
+    :param values: (list) at least two values
+    :return: (float)
+    """
+    mean = sum(values) / len(values)
+    variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    if mean == 0:
+        return 0.0 if variance == 0 else float('inf')
+    return math.sqrt(variance) / abs(mean)
+
+
+def relative_confidence(values, z=Z_95):
+    """
+    Half width of the confidence interval of the mean, relative to the
+    mean, 0.01 means the mean is known within +-1% (95% by default).
+
+    :param values: (list) at least two values
+    :param z: (float) z score of the confidence level
+    :return: (float)
+    """
+    return z * coefficient_of_variation(values) / math.sqrt(len(values))
+
+
+class ConvergenceDetector:
+    """
+    Decides when a rate is stable: the coefficient of variation of the last
+    window samples is at most threshold.
+
+    Samples are (timestamp, value) pairs and a sample is only used once, so
+    the same history can be fetched over and over.
+    """
+
+    def __init__(self, window=5, threshold=0.02):
+        if window < 2:
+            raise ValueError('The window needs at least two samples')
+        self.threshold = threshold
+        self.samples = collections.deque(maxlen=window)
+        self.last_timestamp = None
+
+    def skip(self, samples):
+        """
+        Ignores the given samples and everything older, e.g. what was
+        recorded before the wait started.
+        """
+        for timestamp, _ in samples:
+            if self.last_timestamp is None or timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+
+    def add(self, samples):
+        """
+        :param samples: (iterable) (timestamp, value) pairs, oldest first
+        """
+        for timestamp, value in samples:
+            if self.last_timestamp is not None and \
+                    timestamp <= self.last_timestamp:
+                continue
+            self.last_timestamp = timestamp
+            self.samples.append(value)
+
+    @property
+    def cv(self):
+        if len(self.samples) < self.samples.maxlen:
+            return None
+        return coefficient_of_variation(list(self.samples))
+
+    def converged(self):
+        cv = self.cv
+        return cv is not None and cv <= self.threshold
+
+    def summary(self):
+        enough = len(self.samples) >= 2
+        return {
+            'cv': self.cv,
+            'confidence': relative_confidence(list(self.samples))
+            if enough else None,
+            'samples': len(self.samples)
+        }
+
+
+def wait_for_convergence(sample, detectors, min_duration, max_duration,
+                         poll_interval=1.0, clock=time.time,
+                         sleep=time.sleep):
+    """
+    Waits until every detector has converged, but at least min_duration and
+    at most max_duration seconds.
+
+    :param sample: callable taking a detector key and returning its recent
+    (timestamp, value) samples
+    :param detectors: (dict) key -> ConvergenceDetector
+    :param min_duration: (float) seconds to wait in any case
+    :param max_duration: (float) seconds to give up after
+    :param poll_interval: (float) seconds between samples
+    :return: (tuple) whether all converged and the seconds waited
+    """
+    start = clock()
+    for key, detector in detectors.items():
+        detector.skip(sample(key))
+    while True:
+        sleep(poll_interval)
+        elapsed = clock() - start
+        for key, detector in detectors.items():
+            detector.add(sample(key))
+        converged = all(d.converged() for d in detectors.values())
+        if (converged and elapsed >= min_duration) or \
+                elapsed >= max_duration:
+            return converged, elapsed
+
+
+async def async_wait_for_convergence(sample, detectors, min_duration,
+                                     max_duration, poll_interval=1.0,
+                                     clock=time.time, sleep=asyncio.sleep):
+    """
+    Same as wait_for_convergence() but sample is a coroutine function and
+    all keys are sampled concurrently.
+    """
+    keys = list(detectors)
+
+    async def sample_all():
+        return zip(keys, await asyncio.gather(*(sample(k) for k in keys)))
+
+    start = clock()
+    for key, samples in await sample_all():
+        detectors[key].skip(samples)
+    while True:
+        await sleep(poll_interval)
+        elapsed = clock() - start
+        for key, samples in await sample_all():
+            detectors[key].add(samples)
+        converged = all(d.converged() for d in detectors.values())
+        if (converged and elapsed >= min_duration) or \
+                elapsed >= max_duration:
+            return converged, elapsed
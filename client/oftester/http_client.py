@@ -0,0 +1,140 @@
+import collections
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 60
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+POOL_SIZE = 32
+RETRY_STATUSES = (502, 503, 504)
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, seconds, error):
+        self.requests += 1
+        self.errors += int(error)
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_time': self.total_time / self.requests
+            if self.requests else None,
+            'max_time': self.max_time
+        }
+
+
+class HttpClient:
+    """
+    HTTP client shared by the scenario and its report generator.
+
+    Every host:port gets its own keep-alive session so polling reuses
+    connections.  All requests have connect and read timeouts, idempotent
+    requests are retried with exponential backoff on connection errors and
+    502/503/504, and latency and errors are counted per endpoint, i.e.
+    host:port and the first two path segments (/tpn/flows, /stats/port...).
+
+    get(), post(), put() and delete() take the same arguments as the
+    requests functions of the same name.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, retries=RETRIES,
+                 backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.sessions = {}
+        self.stats = collections.defaultdict(EndpointStats)
+        self.lock = threading.Lock()
+
+    def _session(self, netloc):
+        with self.lock:
+            session = self.sessions.get(netloc)
+            if session is None:
+                retry = Retry(total=self.retries,
+                              backoff_factor=self.backoff_factor,
+                              status_forcelist=RETRY_STATUSES,
+                              raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=self.pool_size,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[netloc] = session
+            return session
+
+    @staticmethod
+    def endpoint(url):
+        parts = urlsplit(url)
+        path = '/'.join(parts.path.split('/')[:3])
+        return parts.netloc + path
+
+    def request(self, method, url, **kwargs):
+        """
+        :param timeout: defaults to (connect_timeout, read_timeout), use
+        (connect_timeout, None) for calls that block on purpose
+        """
+        kwargs.setdefault('timeout', (self.connect_timeout,
+                                      self.read_timeout))
+        session = self._session(urlsplit(url).netloc)
+        start = time.time()
+        error = True
+        try:
+            response = session.request(method, url, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            seconds = time.time() - start
+            with self.lock:
+                self.stats['%s %s' % (method, self.endpoint(url))].add(
+                    seconds, error)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def summary(self):
+        with self.lock:
+            return {endpoint: stats.summary()
+                    for endpoint, stats in sorted(self.stats.items())}
+
+    def log_stats(self):
+        for endpoint, stats in self.summary().items():
+            logging.info('%s: %i requests, %i errors, avg %.3f s, '
+                         'max %.3f s', endpoint, stats['requests'],
+                         stats['errors'], stats['avg_time'] or 0,
+                         stats['max_time'])
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
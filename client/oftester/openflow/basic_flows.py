@@ -1,19 +1,27 @@
 import copy
 
 from oftester.constants import COOKIE_COPY_FIELDS
+from oftester.constants import COOKIE_DRAIN
+from oftester.constants import COOKIE_FLOW_SCALE
 from oftester.constants import COOKIE_GOTO_TABLE
 from oftester.constants import COOKIE_LOOP
+from oftester.constants import COOKIE_MASK_EXACT
 from oftester.constants import COOKIE_METADATA
 from oftester.constants import COOKIE_METADATA_OUT
 from oftester.constants import COOKIE_MULTICAST_GOTO_TABLE
 from oftester.constants import COOKIE_MULTICAST_GROUP
+from oftester.constants import COOKIE_PACKET_IN
 from oftester.constants import COOKIE_PASS_THROUGH
+from oftester.constants import COOKIE_PROBE
 from oftester.constants import COOKIE_SNAKE
+from oftester.constants import COOKIE_SNAKE_SINK
 from oftester.constants import COOKIE_SWAP_FIELDS
 from oftester.constants import COOKIE_VLAN
 from oftester.constants import COOKIE_VXLAN
 from oftester.constants import GROUP_ID
 from oftester.constants import OFPP_IN_PORT
+from oftester.constants import OFPTT_ALL
+from oftester.constants import PROBE_UDP_PORT
 
 
 def flow_loop_all_ports(dpid, table_id, priority=1):
@@ -164,6 +172,147 @@ def flow_snake(dpid, start_port, end_port, table_id, priority=1000):
     return flowmods
 
 
+def flow_snake_sink(dpid, end_port, table_id=0, priority=60000):
+    """
+    Drops what comes out of the snake instead of sending it back to the
+    first port, so injected packets make a single pass.  The priority is
+    above the snake and the rules of the scenarios, but below the drain.
+
+    :param dpid: Switch DPID
+    :param end_port: (int) last port of the snake
+    :param table_id: (int) table to put the flow into
+    :param priority: (int) priority of the flow
+    :return: (dict)
+    """
+    return {
+        'dpid': dpid,
+        'cookie': COOKIE_SNAKE_SINK,
+        'table_id': table_id,
+        'priority': priority,
+        'match': {'in_port': end_port},
+        'actions': []
+    }
+
+
+def flow_probe_punt(dpid, in_port, table_id=0, priority=1500,
+                    udp_dst_port=PROBE_UDP_PORT):
+    """
+    Sends the latency probes of TpnRyuUtils back to the controller.  The
+    priority is above the snake so probes leave it after one pass, and
+    below the scenario rules.
+
+    :param dpid: Switch DPID
+    :param in_port: (int) port the probes come back on
+    :param table_id: (int) table to put the flow into
+    :param priority: (int) priority of the flow
+    :param udp_dst_port: (int) UDP destination port of the probes
+    :return: (dict)
+    """
+    return {
+        'dpid': dpid,
+        'cookie': COOKIE_PROBE,
+        'table_id': table_id,
+        'priority': priority,
+        'match': {
+            'in_port': in_port,
+            'eth_type': 2048,
+            'ip_proto': 17,
+            'udp_dst': udp_dst_port
+        },
+        'actions': [
+            {'type': 'OUTPUT', 'port': 'CONTROLLER', 'max_len': 'NO_BUFFER'}
+        ]
+    }
+
+
+def flow_scale(dpid, start, count, table_id=0, priority=1000):
+    """
+    Exact match flows on unique IPv4 destinations, without actions so the
+    matched packets are dropped.  Flows are yielded one by one so that
+    large batches are never held in memory at once.
+
+    :param dpid: Switch DPID
+    :param start: (int) index of the first flow, flows with the same index
+    match the same packets
+    :param count: (int) number of flows
+    :param table_id: (int) table to put the flows into
+    :param priority: (int) priority of the flows
+    :return: generator of dicts
+    """
+    for i in range(start, start + count):
+        yield {
+            'dpid': dpid,
+            'cookie': COOKIE_FLOW_SCALE,
+            'table_id': table_id,
+            'priority': priority,
+            'match': {
+                'eth_type': 2048,
+                'ipv4_dst': '10.%i.%i.%i' % ((i >> 16) & 0xff,
+                                             (i >> 8) & 0xff, i & 0xff)
+            },
+            'actions': []
+        }
+
+
+def flow_table_miss_controller(dpid, table_id=0, max_len='NO_BUFFER',
+                               in_port=None):
+    """
+    Table miss flow that sends every unmatched packet to the controller
+
+    :param dpid: Switch DPID
+    :param table_id: (int) table to put the flow into
+    :param max_len: (int|string) bytes of the packet sent to the controller
+    :param in_port: (int) only punt the packets coming in on this port
+    :return: (dict)
+    """
+    return {
+        'dpid': dpid,
+        'cookie': COOKIE_PACKET_IN,
+        'table_id': table_id,
+        'priority': 0,
+        'match': {} if in_port is None else {'in_port': in_port},
+        'actions': [
+            {'type': 'OUTPUT', 'port': 'CONTROLLER', 'max_len': max_len}
+        ]
+    }
+
+
+def flow_drain(dpid, table_id=0, priority=65000):
+    """
+    Flow that drops every packet, to empty a snake without removing it
+
+    :param dpid: Switch DPID
+    :param table_id: (int) table to put the flow into
+    :param priority: (int) priority of the flow, above everything else
+    :return: (dict)
+    """
+    return {
+        'dpid': dpid,
+        'cookie': COOKIE_DRAIN,
+        'table_id': table_id,
+        'priority': priority,
+        'match': {},
+        'actions': []
+    }
+
+
+def flow_delete_cookie(dpid, cookie, table_id=OFPTT_ALL):
+    """
+    Delete flow mod for all flows with the cookie
+
+    :param dpid: Switch DPID
+    :param cookie: (int) cookie of the flows
+    :param table_id: (int) table of the flows, all tables by default
+    :return: (dict)
+    """
+    return {
+        'dpid': dpid,
+        'cookie': cookie,
+        'cookie_mask': COOKIE_MASK_EXACT,
+        'table_id': table_id
+    }
+
+
 def flow_vlan_push_pop(dpid, in_port, out_port, action, outer_vid=None,
                        inner_vid=None, table_id=0, priority=2000):
     """
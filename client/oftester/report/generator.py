@@ -5,12 +5,15 @@ import os
 from abc import abstractmethod, ABC
 
 import plotly.graph_objects as go
-import requests
 from jinja2 import Environment, PackageLoader
 from plotly.subplots import make_subplots
 
 base_dir = './reports'
 
+# keys of the probe session summary of TpnRyuUtils
+PROBE_PERCENTILES = ('rtt_p50', 'rtt_p99', 'rtt_p99_9')
+PROBE_RTTS = ('rtt_min', 'rtt_avg') + PROBE_PERCENTILES + ('rtt_max',)
+
 
 class ReportGenerator(ABC):
     def __init__(self, scenario):
@@ -28,6 +31,21 @@ class ReportGenerator(ABC):
     def collect_data(self):
         pass
 
+    def collected(self, packet_size):
+        """
+        Data collected for a packet size that the report needs, to be
+        checkpointed, see RunStore.
+
+        :return: (dict) JSON serializable
+        """
+        return {}
+
+    def restore(self, packet_size, data):
+        """
+        Takes back what collected() returned in an earlier run.
+        """
+        pass
+
 
 class OtsdbReportGenerator(ReportGenerator):
     def __init__(self, scenario):
@@ -59,7 +77,7 @@ class OtsdbReportGenerator(ReportGenerator):
                       self.scenario.environment.otsdb_prefix,
                       self.dpids)
         logging.info("Report data query: %s", url)
-        resp = requests.get(url, stream=True)
+        resp = self.scenario.session.get(url, stream=True)
         if resp.status_code == 200:
             with open(base_dir + '/%s_%d.png' % (self.scenario.name, idx),
                       'wb') as f:
@@ -80,6 +98,11 @@ class PlotlyReportGenerator(OtsdbReportGenerator):
     def __init__(self, scenario):
         super(PlotlyReportGenerator, self).__init__(scenario)
         self.collected_data = dict()
+        self.flow_insertion = dict()
+        self.lossless_rate = dict()
+        self.conservation = dict()
+        self.latency = dict()
+        self.packet_in = dict()
 
     def report(self):
         self.save_collected_data()
@@ -89,6 +112,26 @@ class PlotlyReportGenerator(OtsdbReportGenerator):
                                    self.collected_data[packet_size])
             figures.append(fig.to_html(full_html=False, include_plotlyjs='cdn',
                                        default_height='100vh'))
+        if self.flow_insertion:
+            fig = self.make_flow_insertion_figure(self.flow_insertion)
+            figures.append(fig.to_html(full_html=False, include_plotlyjs='cdn',
+                                       default_height='100vh'))
+        if self.lossless_rate:
+            fig = self.make_lossless_rate_figure(self.lossless_rate)
+            figures.append(fig.to_html(full_html=False, include_plotlyjs='cdn',
+                                       default_height='100vh'))
+        if self.latency:
+            fig = self.make_latency_figure(self.latency)
+            figures.append(fig.to_html(full_html=False, include_plotlyjs='cdn',
+                                       default_height='100vh'))
+        if self.packet_in:
+            fig = self.make_packet_in_figure(self.packet_in)
+            figures.append(fig.to_html(full_html=False, include_plotlyjs='cdn',
+                                       default_height='100vh'))
+        for packet_size, switches in self.conservation.items():
+            fig = self.make_conservation_figure(packet_size, switches)
+            figures.append(fig.to_html(full_html=False, include_plotlyjs='cdn',
+                                       default_height='100vh'))
 
         template = self.env.get_template('plotly_index.html')
         template.stream(name=self.scenario.name,
@@ -105,6 +148,46 @@ class PlotlyReportGenerator(OtsdbReportGenerator):
         time_metrics = self.scenario.time_metrics[
             self.scenario.get_current_packet_size_idx()]
         self.get_points(time_metrics, self.scenario.current_packet_size())
+        flow_insertion = getattr(time_metrics, 'flow_insertion', None)
+        if flow_insertion:
+            self.flow_insertion[self.scenario.current_packet_size()] = \
+                flow_insertion
+        lossless_rate = getattr(time_metrics, 'lossless_rate', None)
+        if lossless_rate:
+            self.lossless_rate[self.scenario.current_packet_size()] = \
+                lossless_rate
+        conservation = getattr(time_metrics, 'conservation', None)
+        if conservation:
+            self.conservation[self.scenario.current_packet_size()] = \
+                conservation
+        latency = getattr(time_metrics, 'latency', None)
+        if latency:
+            self.latency[self.scenario.current_packet_size()] = latency
+        packet_in = getattr(time_metrics, 'packet_in', None)
+        if packet_in:
+            self.packet_in[self.scenario.current_packet_size()] = packet_in
+
+    def collected(self, packet_size):
+        return {'points': self.collected_data.get(packet_size),
+                'flow_insertion': self.flow_insertion.get(packet_size),
+                'lossless_rate': self.lossless_rate.get(packet_size),
+                'conservation': self.conservation.get(packet_size),
+                'latency': self.latency.get(packet_size),
+                'packet_in': self.packet_in.get(packet_size)}
+
+    def restore(self, packet_size, data):
+        if data.get('points') is not None:
+            self.collected_data[packet_size] = data['points']
+        if data.get('flow_insertion'):
+            self.flow_insertion[packet_size] = data['flow_insertion']
+        if data.get('lossless_rate'):
+            self.lossless_rate[packet_size] = data['lossless_rate']
+        if data.get('conservation'):
+            self.conservation[packet_size] = data['conservation']
+        if data.get('latency'):
+            self.latency[packet_size] = data['latency']
+        if data.get('packet_in'):
+            self.packet_in[packet_size] = data['packet_in']
 
     def get_points(self, time_metrics, packet_size):
         start = time_metrics.start
@@ -122,11 +205,12 @@ class PlotlyReportGenerator(OtsdbReportGenerator):
                       self.scenario.environment.otsdb_prefix,
                       self.dpids)
         logging.info("Report data query: %s", url)
-        resp = requests.get(url)
+        resp = self.scenario.session.get(url)
         if resp.status_code == 200:
             data = resp.json()
             for d in data:
                 d['timestamps'] = time_metrics.timestamps
+                d['markers'] = getattr(time_metrics, 'markers', {})
             self.collected_data[packet_size] = data
             logging.info("Stored data for packet size: %i", packet_size)
 
@@ -151,6 +235,179 @@ class PlotlyReportGenerator(OtsdbReportGenerator):
 
         return fig
 
+    @staticmethod
+    def make_flow_insertion_figure(flow_insertion):
+        """
+        Flow insertion rate against table occupancy of every switch.
+
+        :param flow_insertion: (dict) packet size -> dpid -> batch results
+        of FlowInsertionScenario
+        """
+        fig = make_subplots()
+        for packet_size, switches in flow_insertion.items():
+            for dpid, batches in switches.items():
+                name = dpid
+                if len(flow_insertion) > 1:
+                    name += ' (%s)' % packet_size
+                fig.add_trace(go.Scatter(
+                    x=[b['occupancy'] for b in batches],
+                    y=[b['rate'] for b in batches],
+                    mode='lines+markers', name=name))
+        fig.update_xaxes(title_text='flows in table')
+        fig.update_yaxes(title_text='flows per second')
+        fig.update_layout(title_text='Flow insertion rate')
+        return fig
+
+    @staticmethod
+    def make_lossless_rate_figure(lossless_rate):
+        """
+        Maximum lossless rate against packet size of every switch.
+
+        :param lossless_rate: (dict) packet size -> dpid -> search result of
+        Scenario.search_lossless_rate()
+        """
+        sizes = sorted(lossless_rate, key=int)
+        dpids = sorted({dpid for size in sizes
+                        for dpid in lossless_rate[size]})
+        fig = make_subplots()
+        for dpid in dpids:
+            results = [lossless_rate[size].get(dpid, {}) for size in sizes]
+            fig.add_trace(go.Scatter(
+                x=[int(size) for size in sizes],
+                y=[r.get('max_lossless_pps') for r in results],
+                mode='lines+markers', name=dpid))
+        fig.update_xaxes(title_text='packet size')
+        fig.update_yaxes(title_text='packets per second')
+        fig.update_layout(title_text='Maximum lossless rate')
+        return fig
+
+    @staticmethod
+    def make_conservation_figure(packet_size, conservation):
+        """
+        Table of the hops that drop packets and the lost packets per second
+        of every hop in snake order.
+
+        :param packet_size: (int) packet size of the results
+        :param conservation: (dict) dpid -> result of conservation.analyze()
+        """
+        fig = make_subplots(rows=2, cols=1, row_heights=[0.3, 0.7],
+                            specs=[[{'type': 'table'}], [{}]])
+        rows = []
+        for dpid, result in conservation.items():
+            hops = {hop['name']: hop for hop in result['hops']}
+            for name in result['drops'] or [None]:
+                hop = hops.get(name, {})
+                cookie = hop.get('cookie')
+                rows.append([
+                    dpid, name or 'none',
+                    '' if cookie is None else str(cookie),
+                    '%.0f' % hop.get('in_pps', 0),
+                    '%.0f' % hop.get('lost_pps', 0),
+                    '%.2f%%' % (hop.get('loss', 0) * 100)])
+        fig.add_trace(go.Table(
+            header={'values': ['dpid', 'dropping hop', 'cookie', 'in pps',
+                               'lost pps', 'loss']},
+            cells={'values': list(map(list, zip(*rows)))}), row=1, col=1)
+        for dpid, result in conservation.items():
+            fig.add_trace(go.Bar(
+                x=[hop['name'] for hop in result['hops']],
+                y=[hop['lost_pps'] for hop in result['hops']],
+                name=dpid), row=2, col=1)
+        fig.update_yaxes(title_text='lost packets per second', row=2, col=1)
+        fig.update_layout(
+            title_text='Packet conservation, packet size: ' +
+                       str(packet_size))
+        return fig
+
+    @staticmethod
+    def make_latency_figure(latency):
+        """
+        Table of the probe round trip times of every switch and packet size
+        and the percentiles against packet size.
+
+        :param latency: (dict) packet size -> dpid -> probe session summary
+        of TpnRyuUtils
+        """
+        def ms(seconds):
+            return None if seconds is None else seconds * 1000
+
+        def cell(seconds):
+            return '' if seconds is None else '%.3f' % ms(seconds)
+
+        sizes = sorted(latency, key=int)
+        dpids = sorted({dpid for size in sizes for dpid in latency[size]})
+        fig = make_subplots(rows=2, cols=1, row_heights=[0.4, 0.6],
+                            specs=[[{'type': 'table'}], [{}]])
+        rows = []
+        for size in sizes:
+            for dpid in dpids:
+                result = latency[size].get(dpid)
+                if result is None:
+                    continue
+                rows.append([str(size), dpid,
+                             '%i/%i' % (result['received'], result['sent'])] +
+                            [cell(result.get(key)) for key in PROBE_RTTS])
+        header = ['packet size', 'dpid', 'received'] + [
+            '%s ms' % key[4:].replace('_', '.') for key in PROBE_RTTS]
+        fig.add_trace(go.Table(
+            header={'values': header},
+            cells={'values': list(map(list, zip(*rows)))}), row=1, col=1)
+        for dpid in dpids:
+            results = [latency[size].get(dpid, {}) for size in sizes]
+            for key in PROBE_PERCENTILES:
+                fig.add_trace(go.Scatter(
+                    x=[int(size) for size in sizes],
+                    y=[ms(r.get(key)) for r in results],
+                    mode='lines+markers',
+                    name='%s %s' % (dpid, key[4:].replace('_', '.'))),
+                    row=2, col=1)
+        fig.update_xaxes(title_text='packet size', row=2, col=1)
+        fig.update_yaxes(title_text='round trip time (ms)', row=2, col=1)
+        fig.update_layout(title_text='Latency')
+        return fig
+
+    @staticmethod
+    def make_packet_in_figure(packet_in):
+        """
+        Table of the punted packets of every switch and packet size and the
+        packet in rate against packet size.
+
+        :param packet_in: (dict) packet size -> dpid -> result of
+        PacketInScenario
+        """
+        sizes = sorted(packet_in, key=int)
+        dpids = sorted({dpid for size in sizes for dpid in packet_in[size]})
+        fig = make_subplots(rows=2, cols=1, row_heights=[0.4, 0.6],
+                            specs=[[{'type': 'table'}], [{}]])
+        rows = []
+        for size in sizes:
+            for dpid in dpids:
+                result = packet_in[size].get(dpid)
+                if result is None:
+                    continue
+                rows.append([str(size), dpid,
+                             ', '.join(str(p) for p in result['ports']),
+                             str(result['rx_packets']),
+                             str(result['packet_ins']),
+                             '%.0f' % result['packet_in_rate'],
+                             str(result['lost']),
+                             '%.2f%%' % (result['loss'] * 100)])
+        fig.add_trace(go.Table(
+            header={'values': ['packet size', 'dpid', 'ports', 'rx packets',
+                               'packet ins', 'packet ins/s', 'lost',
+                               'loss']},
+            cells={'values': list(map(list, zip(*rows)))}), row=1, col=1)
+        for dpid in dpids:
+            results = [packet_in[size].get(dpid, {}) for size in sizes]
+            fig.add_trace(go.Scatter(
+                x=[int(size) for size in sizes],
+                y=[r.get('packet_in_rate') for r in results],
+                mode='lines+markers', name=dpid), row=2, col=1)
+        fig.update_xaxes(title_text='packet size', row=2, col=1)
+        fig.update_yaxes(title_text='packet ins per second', row=2, col=1)
+        fig.update_layout(title_text='Packet in rate')
+        return fig
+
 
 class PlotlyAggregatedReportGenerator(PlotlyReportGenerator):
 
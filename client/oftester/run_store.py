@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from oftester.scenario.model import ScenarioTimestamps
+
+
+class RunStore:
+    """
+    Checkpoints of a run in a directory, one JSON file per finished
+    scenario and packet size with its time_metrics and the data the report
+    generator collected for it:
+
+        run_dir/<scenario name>/<packet size>.json
+
+    A resumed run restores the finished iterations instead of running them
+    again, so their reports are built without querying OpenTSDB.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+
+    def path(self, name, packet_size):
+        return os.path.join(self.run_dir, name, '%s.json' % packet_size)
+
+    def completed(self, name, packet_size):
+        return os.path.isfile(self.path(name, packet_size))
+
+    def save(self, scenario, report_generator):
+        """
+        Stores the current iteration of the scenario.
+        """
+        packet_size = scenario.current_packet_size()
+        attributes = {}
+        datetimes = {}
+        for attr, value in vars(scenario.time_metrics[-1]).items():
+            if isinstance(value, datetime):
+                datetimes[attr] = value.isoformat()
+            else:
+                attributes[attr] = value
+        checkpoint = {
+            'name': scenario.name,
+            'packet_size': packet_size,
+            'time_metrics': attributes,
+            'datetimes': datetimes,
+            'report': report_generator.collected(packet_size)
+        }
+        path = self.path(scenario.name, packet_size)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(checkpoint, f, default=str)
+        # a run killed while writing leaves no half written checkpoint
+        os.replace(path + '.tmp', path)
+        logging.info('Saved %s with size %s to %s', scenario.name,
+                     packet_size, path)
+
+    def restore(self, scenario, report_generator):
+        """
+        Restores the current iteration of the scenario if it finished in an
+        earlier run.
+
+        :return: (bool) False if the iteration still has to run
+        """
+        packet_size = scenario.current_packet_size()
+        path = self.path(scenario.name, packet_size)
+        if not os.path.isfile(path):
+            return False
+        with open(path) as f:
+            checkpoint = json.load(f)
+        metrics = ScenarioTimestamps()
+        for attr, value in checkpoint['time_metrics'].items():
+            setattr(metrics, attr, value)
+        for attr, value in checkpoint['datetimes'].items():
+            setattr(metrics, attr, datetime.fromisoformat(value))
+        # JSON object keys are strings
+        metrics.timestamps = {int(ts): event for ts, event
+                              in checkpoint['time_metrics'].get(
+                                  'timestamps', {}).items()}
+        metrics.markers = {dpid: {int(ts): label
+                                  for ts, label in markers.items()}
+                           for dpid, markers in checkpoint[
+                               'time_metrics'].get('markers', {}).items()}
+        scenario.time_metrics[-1] = metrics
+        report_generator.restore(packet_size, checkpoint['report'])
+        logging.info('Restored %s with size %s from %s', scenario.name,
+                     packet_size, path)
+        return True
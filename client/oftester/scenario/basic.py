@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime
+import time
 
 from oftester.constants import OFPP_IN_PORT
 from oftester.openflow import basic_flows as flows
@@ -8,175 +8,170 @@ from oftester.scenario.model import Scenario
 
 
 class PpsScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            logging.info('Switch under full load adding push/pop rules')
+    def run_switch(self, sw):
+        self.mark(sw.dpid, 'start')
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        logging.info('Switch under full load adding push/pop rules')
 
 
 class VlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding push/pop rules')
-
-            self.add_flow(flows.flow_vlan_push_pop(sw.dpid,
-                                                   sw.snake_end_port,
-                                                   OFPP_IN_PORT, 'pop'))
-            self.add_flow(flows.flow_vlan_push_pop(sw.dpid,
-                                                   sw.snake_start_port,
-                                                   OFPP_IN_PORT, 'push',
-                                                   outer_vid=42))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding push/pop rules')
+
+        self.add_flow(flows.flow_vlan_push_pop(sw.dpid,
+                                               sw.snake_end_port,
+                                               OFPP_IN_PORT, 'pop'))
+        self.add_flow(flows.flow_vlan_push_pop(sw.dpid,
+                                               sw.snake_start_port,
+                                               OFPP_IN_PORT, 'push',
+                                               outer_vid=42))
 
 
 class VlanScenarioShort(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding push/pop rules')
-            self.add_flow(flows.flow_vlan_push_pop(sw.dpid, sw.snake_end_port,
-                                                   OFPP_IN_PORT, 'pop'))
-            logging.info('Setting header values')
-            self.add_flow(flows.flow_vlan_push_pop(sw.dpid,
-                                                   sw.snake_start_port,
-                                                   OFPP_IN_PORT, 'push'))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding push/pop rules')
+        self.add_flow(flows.flow_vlan_push_pop(sw.dpid, sw.snake_end_port,
+                                               OFPP_IN_PORT, 'pop'))
+        logging.info('Setting header values')
+        self.add_flow(flows.flow_vlan_push_pop(sw.dpid,
+                                               sw.snake_start_port,
+                                               OFPP_IN_PORT, 'push'))
 
 
 class VxlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding push/pop vxlan rules')
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding push/pop vxlan rules')
 
-            self.add_flow(flows.flow_vxlan_pop(sw.dpid, sw.snake_end_port,
-                                               OFPP_IN_PORT))
-            logging.info('Setting header values')
-            self.add_flow(flows.flow_vxlan_push(sw.dpid, sw.snake_start_port,
-                                                OFPP_IN_PORT, vni=4242))
+        self.add_flow(flows.flow_vxlan_pop(sw.dpid, sw.snake_end_port,
+                                           OFPP_IN_PORT))
+        logging.info('Setting header values')
+        self.add_flow(flows.flow_vxlan_push(sw.dpid, sw.snake_start_port,
+                                            OFPP_IN_PORT, vni=4242))
 
 
 class VxlanScenarioShort(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
 
-            logging.info('Switch under full load adding push/pop vxlan rules')
-            self.add_flow(flows.flow_vxlan_pop(sw.dpid, sw.snake_end_port,
-                                               OFPP_IN_PORT))
-            self.add_flow(flows.flow_vxlan_push(sw.dpid, sw.snake_start_port_,
-                                                OFPP_IN_PORT, flags=0))
+        logging.info('Switch under full load adding push/pop vxlan rules')
+        self.add_flow(flows.flow_vxlan_pop(sw.dpid, sw.snake_end_port,
+                                           OFPP_IN_PORT))
+        self.add_flow(flows.flow_vxlan_push(sw.dpid, sw.snake_start_port_,
+                                            OFPP_IN_PORT, flags=0))
 
 
 class SwapScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding swap fields rules')
-            self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
-                                                  OFPP_IN_PORT))
-            self.add_flow(flows.flow_swap_fields(sw.dpid, sw.snake_start_port,
-                                                 OFPP_IN_PORT))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding swap fields rules')
+        self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
+                                              OFPP_IN_PORT))
+        self.add_flow(flows.flow_swap_fields(sw.dpid, sw.snake_start_port,
+                                             OFPP_IN_PORT))
 
 
 class CopyScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding copy fields rules')
-            self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
-                                                  OFPP_IN_PORT))
-            self.add_flow(flows.flow_copy_fields(sw.dpid, sw.snake_start_port,
-                                                 OFPP_IN_PORT))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding copy fields rules')
+        self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
+                                              OFPP_IN_PORT))
+        self.add_flow(flows.flow_copy_fields(sw.dpid, sw.snake_start_port,
+                                             OFPP_IN_PORT))
 
 
 class RxTimestampScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding rx_timestamp fields rules')
-            self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
-                                                  OFPP_IN_PORT))
-            self.add_flow(flows.flow_copy_fields(sw.dpid, sw.snake_start_port,
-                                                 OFPP_IN_PORT,
-                                                 n_bits=64,
-                                                 src='novi_rx_timestamp',
-                                                 dst='novi_packet_offset'))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding rx_timestamp fields rules')
+        self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
+                                              OFPP_IN_PORT))
+        self.add_flow(flows.flow_copy_fields(sw.dpid, sw.snake_start_port,
+                                             OFPP_IN_PORT,
+                                             n_bits=64,
+                                             src='novi_rx_timestamp',
+                                             dst='novi_packet_offset'))
 
 
 class TxTimestampScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding tx_timestamp fields rules')
-            self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
-                                                  OFPP_IN_PORT))
-            self.add_flow(flows.flow_copy_fields(
-                sw.dpid, sw.snake_start_port, OFPP_IN_PORT, n_bits=64,
-                src='novi_tx_timestamp', dst='novi_packet_offset'))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding tx_timestamp fields rules')
+        self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
+                                              OFPP_IN_PORT))
+        self.add_flow(flows.flow_copy_fields(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, n_bits=64,
+            src='novi_tx_timestamp', dst='novi_packet_offset'))
 
 
 class MetadataScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding metadata_write rules')
-            self.add_flow(flows.pass_through_flow(sw.dpid,
-                                                  sw.snake_end_port,
-                                                  OFPP_IN_PORT))
-            for flow in flows.metadata_multi_table_flows(sw.dpid,
-                                                         sw.snake_start_port,
-                                                         OFPP_IN_PORT):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding metadata_write rules')
+        self.add_flow(flows.pass_through_flow(sw.dpid,
+                                              sw.snake_end_port,
+                                              OFPP_IN_PORT))
+        self.add_flows(sw.dpid, flows.metadata_multi_table_flows(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT),
+            phase='metadata', confirm=True)
 
 
 class MulticastGotoTableScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding multicast_goto_table rules')
-            self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
-                                                  OFPP_IN_PORT))
-            for flow in flows.multicast_goto_table_flows(sw.dpid,
-                                                         sw.snake_start_port,
-                                                         OFPP_IN_PORT):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding multicast_goto_table rules')
+        self.add_flow(flows.pass_through_flow(sw.dpid, sw.snake_end_port,
+                                              OFPP_IN_PORT))
+        self.add_flows(sw.dpid, flows.multicast_goto_table_flows(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT),
+            phase='multicast_goto_table', confirm=True)
 
 
 class MulticastGroupScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size())
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding multicast_group rules')
-            group = groups.group_output_in_two_ports(sw.dpid,
-                                                     sw.snake_end_port - 2,
-                                                     sw.snake_end_port)
-            self.add_group(group)
-            self.add_flow(flows.multicast_group_flow(sw.dpid,
-                                                     sw.snake_start_port))
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding multicast_group rules')
+        group = groups.group_output_in_two_ports(sw.dpid,
+                                                 sw.snake_end_port - 2,
+                                                 sw.snake_end_port)
+        self.add_group(group)
+        self.add_flow(flows.multicast_group_flow(sw.dpid,
+                                                 sw.snake_start_port))
+
+
+class LatencyScenario(Scenario):
+    def run_switch(self, sw):
+        count = self.options.get('probe_count', 1000)
+        interval = self.options.get('probe_interval', 0.01)
+        size = self.options.get('probe_size', 128)
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load sending latency probes')
+        self.add_flow(flows.flow_probe_punt(sw.dpid, sw.snake_end_port))
+        probes = self.start_probes(sw.dpid, sw.snake_start_port, count,
+                                   interval, size)
+        # the controller waits a second for the last probes
+        time.sleep(count * interval + 2)
+        result = self.probe_results(probes['session_id'])
+        self.time_metrics[-1].latency[sw.dpid] = result
+        logging.info('Probes %i/%i received, rtt p50 %s p99 %s '
+                     'p99.9 %s seconds', result['received'],
+                     result['sent'], result['rtt_p50'],
+                     result['rtt_p99'], result['rtt_p99_9'])
@@ -0,0 +1,66 @@
+import logging
+import time
+
+from oftester.constants import COOKIE_FLOW_SCALE
+from oftester.openflow import basic_flows as flows
+from oftester.scenario.model import Scenario
+
+
+class FlowInsertionScenario(Scenario):
+    """
+    Measures how fast the switch accepts flow mods as its table fills up.
+
+    Exact match flows are installed in growing batches (options 'batches',
+    default 1k, 10k and 100k flows) into the table 'table_id'.  Every batch
+    is timed on the controller from its first flow mod to the barrier reply
+    after its last one, see record_phase(), so the HTTP requests are not
+    counted, and the table occupancy is read back from the switch.  The run
+    stops at the first batch the switch rejected flows of, which is the
+    failure point.
+    """
+
+    def run_switch(self, sw):
+        table_id = self.options.get('table_id', 0)
+        batches = self.options.get('batches', [1000, 10000, 100000])
+        results = []
+        self.time_metrics[-1].flow_insertion[sw.dpid] = results
+
+        self.mark(sw.dpid, 'start')
+        installed = 0
+        occupancy = self.flow_count(sw.dpid, COOKIE_FLOW_SCALE, table_id)
+        for batch in batches:
+            phase = 'batch-%i' % (len(results) + 1)
+            start = time.time()
+            responses = self.add_flows(sw.dpid, flows.flow_scale(
+                sw.dpid, installed, batch, table_id), phase=phase)
+            wall_seconds = time.time() - start
+            timings = self.time_metrics[-1].phases.get(sw.dpid, {}).get(
+                phase)
+            seconds = timings['barrier'] - timings['sent'] if timings else 0.0
+            installed += batch
+
+            previous = occupancy
+            occupancy = self.flow_count(sw.dpid, COOKIE_FLOW_SCALE,
+                                        table_id)
+            errors = sum(r['errors'] for r in responses)
+            result = {
+                'batch': batch,
+                'occupancy': occupancy,
+                'seconds': seconds,
+                'wall_seconds': wall_seconds,
+                'rate': (occupancy - previous) / seconds if seconds else 0.0,
+                'errors': errors,
+                'error_samples': [e for r in responses
+                                  for e in r['error_samples']][:10],
+                'failed': bool(errors) or occupancy < installed
+            }
+            results.append(result)
+            logging.info('Installed %i flows on %s in %.2f seconds, %.0f '
+                         'flows per second, %i flows in table %i',
+                         batch, sw.dpid, seconds, result['rate'],
+                         occupancy, table_id)
+            if result['failed']:
+                logging.warning('Switch %s failed with %i flows in table '
+                                '%i, %i errors', sw.dpid, occupancy,
+                                table_id, errors)
+                break
@@ -1,5 +1,4 @@
 import logging
-from datetime import datetime
 
 from oftester.constants import OFPP_IN_PORT
 from oftester.openflow import pipeline_flows
@@ -8,77 +7,61 @@ from oftester.scenario.model import Scenario
 
 class IngressEgressQnqVlanScenario(Scenario):
 
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=46, inner_vlan=47)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding ingress_egress_qnq_vlan rules')
-            for flow in pipeline_flows.flow_egress_vlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=47, priority=2000):
-                self.add_flow(flow)
-            for flow in pipeline_flows.flow_ingress_vlan(
-                    sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=47, priority=2000):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=46, inner_vlan=47)
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding ingress_egress_qnq_vlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_egress_vlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=47, priority=2000), phase='egress', confirm=True)
+        self.add_flows(sw.dpid, pipeline_flows.flow_ingress_vlan(
+            sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=47, priority=2000), phase='ingress', confirm=True)
 
 
 class IngressEgressVlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=46)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding ingress_egress_vlan rules')
-            for flow in pipeline_flows.flow_egress_vlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=None, priority=2000):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=46)
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding ingress_egress_vlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_egress_vlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=None, priority=2000), phase='egress', confirm=True)
 
-            for flow in pipeline_flows.flow_ingress_vlan(
-                    sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=None, priority=2000):
-                self.add_flow(flow)
+        self.add_flows(sw.dpid, pipeline_flows.flow_ingress_vlan(
+            sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=None, priority=2000), phase='ingress', confirm=True)
 
 
 class IngressEgressQnqVxlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=46, inner_vlan=47)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding ingress_egress_qnq_vxlan rules')
-            for flow in pipeline_flows.flow_egress_vxlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT,
-                    outer_vid=46, inner_vid=47, priority=2000):
-                self.add_flow(flow)
-            for flow in pipeline_flows.flow_ingress_vxlan(
-                    sw.dpid, sw.snake_end_port, OFPP_IN_PORT,
-                    outer_vid=46, inner_vid=47, priority=2000):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=46, inner_vlan=47)
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding ingress_egress_qnq_vxlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_egress_vxlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=47, priority=2000), phase='egress', confirm=True)
+        self.add_flows(sw.dpid, pipeline_flows.flow_ingress_vxlan(
+            sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=47, priority=2000), phase='ingress', confirm=True)
 
 
 class IngressEgressVxlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=46)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding ingress_egress_vxlan rules')
-            for flow in pipeline_flows.flow_egress_vxlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=None, priority=2000):
-                self.add_flow(flow)
-            for flow in pipeline_flows.flow_ingress_vxlan(
-                    sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=None, priority=2000):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=46)
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding ingress_egress_vxlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_egress_vxlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=None, priority=2000), phase='egress', confirm=True)
+        self.add_flows(sw.dpid, pipeline_flows.flow_ingress_vxlan(
+            sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=None, priority=2000), phase='ingress', confirm=True)
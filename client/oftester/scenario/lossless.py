@@ -0,0 +1,16 @@
+from oftester.scenario.model import SEARCH_LOSSLESS, Scenario
+
+
+class MaxLosslessRateScenario(Scenario):
+    """
+    Searches the maximum lossless rate of the bare snake for every packet
+    size, see Scenario.search_lossless_rate().  Other scenarios search
+    through their own rules with the option search: lossless.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(MaxLosslessRateScenario, self).__init__(*args, **kwargs)
+        self.options.setdefault('search', SEARCH_LOSSLESS)
+
+    def run_switch(self, sw):
+        self.install_snake(sw.dpid)
@@ -1,13 +1,34 @@
+import collections
+import itertools
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import requests
 
-from oftester.constants import GROUP_ID
+from oftester import conservation
+from oftester.constants import COOKIE_DRAIN, COOKIE_SNAKE, GROUP_ID, \
+    OFPTT_ALL, TESTER_COOKIES
+from oftester.convergence import ConvergenceDetector, wait_for_convergence
+from oftester.http_client import CONNECT_TIMEOUT, READ_TIMEOUT, RETRIES, \
+    HttpClient
 from oftester.openflow import basic_flows as flows
+from oftester.throughput import search_max_lossless_rate
 
 HTTP_HEADERS = {'Content-Type': 'application/json'}
+FLOW_CHUNK_SIZE = 500
+FLOW_PIPELINE_DEPTH = 4
+PEAK_LOAD_WINDOW = 40
+
+# kinds of the steps of Scenario.phases()
+STEP_SWITCHES = 'switches'
+STEP_CALL = 'call'
+STEP_RUN = 'run'
+STEP_WAIT = 'wait'
+
+# value of the search option running search_lossless_rate()
+SEARCH_LOSSLESS = 'lossless'
 
 
 class Switch:
@@ -62,8 +83,23 @@ class ScenarioTimestamps:
 
 class Scenario:
 
+    # False for scenarios measuring on their own in run_switch(), which
+    # skip the settle and collection phases
+    collect_rates = True
+
     def __init__(self, name, environment, packet_sizes=None,
-                 collection_interval=120, sleep_after_peak_load=30):
+                 collection_interval=120, sleep_after_peak_load=30,
+                 stats_burst_interval=0.1, stats_burst_duration=0,
+                 saturation_tolerance=0.05, packet_variations=None,
+                 packet_flows=None, options=None, max_parallel_switches=None,
+                 flow_chunk_size=FLOW_CHUNK_SIZE,
+                 flow_pipeline_depth=FLOW_PIPELINE_DEPTH,
+                 adaptive_waits=True, convergence_threshold=0.02,
+                 convergence_window=5, convergence_poll_interval=1.0,
+                 min_collection_interval=30, min_sleep_after_peak_load=0,
+                 settle_time=10, http_connect_timeout=CONNECT_TIMEOUT,
+                 http_read_timeout=READ_TIMEOUT, http_retries=RETRIES,
+                 reuse_snake=False, cleanup_mode='tracked'):
         self.name = name
         if not packet_sizes:
             packet_sizes = [9000]
@@ -72,11 +108,71 @@ class Scenario:
         self.current_packet_idx = -1
         self.collection_interval = collection_interval
         self.sleep_after_peak_load = sleep_after_peak_load
+        self.stats_burst_interval = stats_burst_interval
+        self.stats_burst_duration = stats_burst_duration
+        self.saturation_tolerance = saturation_tolerance
+        self.packet_variations = packet_variations
+        self.packet_flows = packet_flows
+        # settings only some scenarios use, keyed by scenario name
+        self.options = (options or {}).get(name, {})
+        self.max_parallel_switches = max_parallel_switches
+        self.flow_chunk_size = flow_chunk_size
+        self.flow_pipeline_depth = flow_pipeline_depth
+        # waits end once the rates are stable, see wait_for_steady_state()
+        self.adaptive_waits = adaptive_waits
+        self.convergence_threshold = convergence_threshold
+        self.convergence_window = convergence_window
+        self.convergence_poll_interval = convergence_poll_interval
+        self.min_collection_interval = min_collection_interval
+        self.min_sleep_after_peak_load = min_sleep_after_peak_load
+        self.settle_time = settle_time
+        # keep the snake between packet sizes, see reset_switch()
+        self.reuse_snake = reuse_snake
+        self.snakes = set()
+        self.cleanup_mode = cleanup_mode
+        # (table_id, cookie) pairs and group ids added to every switch
+        self.cookies = collections.defaultdict(set)
+        self.groups = collections.defaultdict(set)
+        # switches cleared of flows left behind by earlier runs
+        self.swept = set()
+        # port counters at the start of the collection, see
+        # check_conservation()
+        self.port_snapshots = {}
         self.environment = Environment(**environment)
-        self.session = requests.Session()
+        # shared with the report generator
+        self.session = HttpClient(http_connect_timeout, http_read_timeout,
+                                  http_retries)
         self.time_metrics = []
 
     def run(self):
+        """
+        Runs run_switch() for all switches in parallel and returns once
+        every switch is done, so they are all measured over the same
+        collection window.  A switch that fails is logged and recorded in
+        time_metrics[-1].errors without stopping the others.
+        """
+        switches = list(self.environment.switches.values())
+        if not switches:
+            return
+        workers = self.max_parallel_switches or len(switches)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.run_switch, sw): sw
+                       for sw in switches}
+            for future in as_completed(futures):
+                sw = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.exception('%s failed on switch %s',
+                                      self.name, sw.dpid)
+                    self.time_metrics[-1].errors[sw.dpid] = str(e)
+
+    def run_switch(self, sw):
+        """
+        Scenario steps for a single switch.
+
+        :param sw: (Switch) switch to run the scenario on
+        """
         raise NotImplementedError()
 
     def has_next_packet_size(self):
@@ -86,6 +182,16 @@ class Scenario:
         self.current_packet_idx += 1
         self.time_metrics.append(ScenarioTimestamps())
         self.time_metrics[-1].timestamps = dict()
+        self.time_metrics[-1].markers = dict()
+        self.time_metrics[-1].saturation = dict()
+        self.time_metrics[-1].latency = dict()
+        self.time_metrics[-1].packet_in = dict()
+        self.time_metrics[-1].errors = dict()
+        self.time_metrics[-1].flow_insertion = dict()
+        self.time_metrics[-1].phases = dict()
+        self.time_metrics[-1].convergence = dict()
+        self.time_metrics[-1].lossless_rate = dict()
+        self.time_metrics[-1].conservation = dict()
         self.packet_size = self.current_packet_size()
 
     def reset_packet_size(self):
@@ -95,33 +201,235 @@ class Scenario:
     def get_current_packet_size_idx(self):
         return self.current_packet_idx
 
+    def phases(self):
+        """
+        Steps of one packet size in order, run by execute() and by
+        AsyncScenarioEngine.execute() so both engines measure the same way.
+
+        Every step is a tuple starting with its kind: STEP_SWITCHES runs a
+        method for every switch at once, STEP_CALL runs a method once,
+        STEP_RUN runs the scenario on all switches and STEP_WAIT waits for
+        the steady state of a phase, with the arguments of
+        wait_for_steady_state().
+
+        With the option search: lossless the maximum lossless rate is
+        searched once the scenario ran instead of collecting data, without
+        collect_rates nothing is collected.
+
+        :return: (list) of step tuples
+        """
+        steps = [
+            (STEP_SWITCHES, self.reset_switch),
+            (STEP_CALL, self.begin_run),
+            (STEP_RUN,)
+        ]
+        if self.options.get('search') == SEARCH_LOSSLESS:
+            steps.append((STEP_SWITCHES, self.search_lossless_rate))
+        elif self.collect_rates:
+            steps += [
+                # need to wait until traffic has settled
+                (STEP_WAIT, 'settle', 0, self.settle_time),
+                (STEP_SWITCHES, self.snapshot_ports),
+                (STEP_CALL, self.begin_collection),
+                (STEP_WAIT, 'collection', self.min_collection_interval,
+                 self.collection_interval),
+                (STEP_SWITCHES, self.check_conservation)
+            ]
+        return steps + [
+            (STEP_CALL, self.end_collection),
+            (STEP_SWITCHES, self.start_drain),
+            # the next packet size starts once the traffic is gone
+            (STEP_WAIT, 'drain', 0, self.settle_time),
+            (STEP_SWITCHES, self.finish_drain)
+        ]
+
     def execute(self):
         logging.info('Running %s test case', self.name)
-        size = self.current_packet_size()
-        logging.info('Packet size of %i', size)
-        self.cleanup_switch()
+        logging.info('Packet size of %i', self.current_packet_size())
+        for step in self.phases():
+            kind, args = step[0], step[1:]
+            if kind == STEP_SWITCHES:
+                self.for_switches(*args)
+            elif kind == STEP_RUN:
+                self.run()
+            elif kind == STEP_WAIT:
+                self.wait_for_steady_state(*args)
+            else:
+                args[0]()
+
+    def begin_run(self):
         self.time_metrics[-1].start = datetime.utcnow()
-        self.run()
-        time.sleep(10)  # need to wait until traffic has stopped
-        logging.info('Collecting data for %s with size %i for %i seconds',
-                     self.name, size, self.collection_interval)
-        time.sleep(self.collection_interval)
+
+    def begin_collection(self):
+        logging.info('Collecting data for %s with size %i for %i to %i '
+                     'seconds', self.name, self.current_packet_size(),
+                     self.min_collection_interval, self.collection_interval)
+
+    def end_collection(self):
         self.time_metrics[-1].timestamps[int(datetime.now().timestamp())] = \
             self.name
         self.time_metrics[-1].stop = datetime.utcnow()
-        self.cleanup_switch()
+
+    def mark(self, dpid, label):
+        """
+        Records a phase marker of a switch at the current second in
+        time_metrics[-1].markers[dpid].  Markers are kept per switch as the
+        switches run in parallel and would overwrite each other.
+
+        :param dpid: Switch DPID
+        :param label: (string) phase starting now
+        """
+        markers = self.time_metrics[-1].markers.setdefault(dpid, {})
+        markers[int(datetime.now().timestamp())] = label
 
     def current_packet_size(self):
         return self.packet_sizes[self.current_packet_idx]
 
     def cleanup_switch(self, dpid=None):
+        """
+        Removes what the scenario installed from one switch or from all of
+        them in parallel.
+
+        By default only the tracked flows and groups are deleted, by cookie
+        and table, in a single bulk request ending with a barrier, so flows
+        of others on the switch survive.  With cleanup_mode 'clear' all
+        flows and the group GROUP_ID are deleted instead.
+
+        :param dpid: Switch DPID, all switches by default
+        """
         if dpid:
-            self._delete_all_flows(dpid)
-            self._delete_group(dpid, GROUP_ID)
+            if self.cleanup_mode == 'clear':
+                self._delete_all_flows(dpid)
+                self._delete_group(dpid, GROUP_ID)
+            else:
+                self.delete_tracked(dpid)
+            self._forget(dpid)
+        else:
+            self.for_switches(self.cleanup_switch)
+
+    def for_switches(self, fn):
+        """
+        Runs fn(dpid) for all switches at the same time.
+
+        :return: (list) results in the order of the switches
+        """
+        dpids = list(self.environment.switches)
+        if len(dpids) < 2:
+            return [fn(dpid) for dpid in dpids]
+        workers = self.max_parallel_switches or len(dpids)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(fn, dpids))
+
+    def _forget(self, dpid):
+        self.snakes.discard(dpid)
+        self.cookies.pop(dpid, None)
+        self.groups.pop(dpid, None)
+
+    def reset_switch(self, dpid):
+        """
+        Prepares a switch for the next packet size.  It is cleared, unless
+        reuse_snake kept its snake, then only the flows and groups of the
+        scenario are removed and the snake is reused.
+
+        The first time the flows of every tester cookie and the group
+        GROUP_ID are deleted too, as a run that crashed or was resumed
+        from a checkpoint leaves flows behind that nothing tracks.
+        """
+        if dpid not in self.swept:
+            self.sweep_switch(dpid)
+        elif dpid in self.snakes:
+            self.remove_scenario_flows(dpid)
+        else:
+            self.cleanup_switch(dpid)
+
+    def sweep_switch(self, dpid):
+        """
+        Clears a switch of all flows with tester cookies, in any table, and
+        of the group GROUP_ID, leaving the flows of others alone.
+        """
+        self.cookies[dpid] |= {(OFPTT_ALL, cookie)
+                               for cookie in TESTER_COOKIES}
+        self.groups[dpid].add(GROUP_ID)
+        self.cleanup_switch(dpid)
+        self.swept.add(dpid)
+
+    def start_drain(self, dpid):
+        """
+        Stops the traffic of a switch.  A kept snake gets a flow dropping
+        every packet instead of being cleared, see finish_drain().
+        """
+        if dpid in self.snakes:
+            self.add_flow(flows.flow_drain(dpid))
         else:
-            for sw in self.environment.switches.keys():
-                self._delete_all_flows(sw)
-                self._delete_group(sw, GROUP_ID)
+            self.cleanup_switch(dpid)
+
+    def finish_drain(self, dpid):
+        """
+        Removes the drop flow and the scenario flows once the traffic of a
+        kept snake is gone, leaving only the snake.
+        """
+        if dpid in self.snakes:
+            self.remove_scenario_flows(dpid)
+
+    def remove_scenario_flows(self, dpid):
+        """
+        Deletes the flows and groups the scenario added to a switch, except
+        a kept snake.
+        """
+        keep = {(0, COOKIE_SNAKE)} if dpid in self.snakes else set()
+        self.delete_tracked(dpid, keep)
+
+    def delete_tracked(self, dpid, keep=frozenset()):
+        """
+        Deletes the tracked flows, by cookie and table, and groups of a
+        switch in one request.  The controller confirms it with a barrier.
+
+        :param dpid: Switch DPID
+        :param keep: (set) (table_id, cookie) pairs to leave alone
+        :return: (dict) result of the bulk endpoint, None if there was
+        nothing to delete
+        """
+        entries = sorted(self.cookies[dpid] - keep)
+        groups = sorted(self.groups.pop(dpid, set()))
+        self.cookies[dpid] &= keep
+        if not entries and not groups:
+            return None
+        result = self._post_entries(
+            dpid,
+            [flows.flow_delete_cookie(dpid, cookie, table_id)
+             for table_id, cookie in entries],
+            [{'dpid': dpid, 'group_id': group_id} for group_id in groups],
+            'delete')
+        if result['errors']:
+            logging.warning('%i errors deleting the flows of %s on %s: %s',
+                            result['errors'], self.name, dpid,
+                            result['error_samples'])
+        logging.info('Deleted %i cookies and %i groups of %s on %s in '
+                     '%.3f seconds', len(entries), len(groups), self.name,
+                     dpid, result['barrier_latency'])
+        return result
+
+    def delete_cookie(self, dpid, cookie, table_id=0):
+        """
+        Deletes the flows with a cookie from a table of a switch and stops
+        tracking them.
+
+        :param dpid: Switch DPID
+        :param cookie: (int) cookie of the flows
+        :param table_id: (int) table of the flows
+        :return: (dict) result of the bulk endpoint
+        """
+        self.cookies[dpid].discard((table_id, cookie))
+        return self._post_entries(
+            dpid, [flows.flow_delete_cookie(dpid, cookie, table_id)], [],
+            'delete')
+
+    def _track(self, dpid, flowmods):
+        cookies = self.cookies[dpid]
+        for flowmod in flowmods:
+            cookies.add((flowmod.get('table_id', 0),
+                         flowmod.get('cookie', 0)))
+            yield flowmod
 
     def _delete_all_flows(self, dpid):
         url = 'http://{}:{}/stats/flowentry/clear/{}'.format(
@@ -143,14 +451,119 @@ class Scenario:
         url = 'http://{}:{}/stats/flowentry/add'.format(
             self.environment.ryu_host, self.environment.ryu_port)
         logging.debug('sending flowmod %s', flowmod)
+        self.cookies[flowmod['dpid']].add((flowmod.get('table_id', 0),
+                                           flowmod.get('cookie', 0)))
         response = self.session.post(url, json=flowmod, headers=HTTP_HEADERS)
         response.raise_for_status()
         return response
 
+    def add_flows(self, dpid, flowmods, groups=None, command='add',
+                  phase=None, confirm=False):
+        """
+        Installs many flows through the bulk endpoint of TpnRyuUtils.
+
+        The flows are sent in chunks of flow_chunk_size with up to
+        flow_pipeline_depth requests in flight, every chunk ends with a
+        barrier on the switch.  Groups go in a request of their own before
+        the flows so the flows can point to them.  flowmods may be a
+        generator, only the chunks in flight are held in memory.
+
+        With confirm everything goes in a single request and the controller
+        also waits for traffic on the cookies of the new flows.  A phase
+        name records the send, barrier and data plane times, see
+        record_phase().
+
+        :param dpid: Switch DPID
+        :param flowmods: (iterable) flows in the ofctl_rest format
+        :param groups: (list) groups in the ofctl_rest format
+        :param command: (string) add, modify, modify_strict, delete or
+        delete_strict
+        :param phase: (string) name to record the timings under
+        :param confirm: (bool) wait for traffic on the new flows
+        :return: (list) results of every request
+        """
+        if command == 'add':
+            flowmods = self._track(dpid, flowmods)
+            self.groups[dpid].update(g['group_id'] for g in groups or [])
+        if confirm:
+            flowmods = list(flowmods)
+            cookies = sorted({flow.get('cookie', 0) for flow in flowmods})
+            results = [self._post_entries(dpid, flowmods, groups or [],
+                                          command, cookies)]
+            if phase:
+                self.record_phase(dpid, phase, results)
+            return results
+
+        results = []
+        if groups and command == 'add':
+            results.append(self._post_entries(dpid, [], groups, command))
+        flowmods = iter(flowmods)
+        chunks = iter(lambda: list(itertools.islice(flowmods,
+                                                    self.flow_chunk_size)),
+                      [])
+        with ThreadPoolExecutor(
+                max_workers=self.flow_pipeline_depth) as executor:
+            in_flight = collections.deque()
+            for chunk in chunks:
+                in_flight.append(executor.submit(self._post_entries, dpid,
+                                                 chunk, [], command))
+                if len(in_flight) >= self.flow_pipeline_depth:
+                    results.append(in_flight.popleft().result())
+            while in_flight:
+                results.append(in_flight.popleft().result())
+        if groups and command != 'add':
+            results.append(self._post_entries(dpid, [], groups, command))
+        logging.debug('%s %i flows and %i groups on %s in %i requests',
+                      command, sum(r['flows'] for r in results),
+                      len(groups or []), dpid, len(results))
+        if phase:
+            self.record_phase(dpid, phase, results)
+        return results
+
+    def _post_entries(self, dpid, flowmods, groups, command,
+                      confirm_cookies=None):
+        url = 'http://{}:{}/tpn/flows/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        payload = {'flows': flowmods, 'groups': groups, 'command': command}
+        if confirm_cookies:
+            payload['confirm_cookies'] = confirm_cookies
+        response = self.session.post(url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def record_phase(self, dpid, phase, results):
+        """
+        Stores the controller side timings of an install phase in
+        time_metrics[-1].phases[dpid][phase]: when the first flow mod was
+        sent, when the last barrier reply came back and when the data plane
+        started to use the new flows (None unless confirmed).  All are
+        seconds since epoch on the controller clock.
+
+        :param dpid: Switch DPID
+        :param phase: (string) name of the phase
+        :param results: (list) results of the bulk endpoint
+        """
+        if not results:
+            return
+        dataplane = [r['dataplane_time'] for r in results
+                     if r.get('dataplane_time')]
+        timings = {
+            'sent': min(r['send_time'] for r in results),
+            'barrier': max(r['barrier_time'] for r in results),
+            'dataplane': max(dataplane) if dataplane else None
+        }
+        self.time_metrics[-1].phases.setdefault(dpid, {})[phase] = timings
+        logging.info('%s on %s: barrier after %.3f seconds%s', phase, dpid,
+                     timings['barrier'] - timings['sent'],
+                     ', traffic after %.3f seconds' % (
+                         timings['dataplane'] - timings['sent'])
+                     if timings['dataplane'] else '')
+
     def add_group(self, group):
         url = 'http://{}:{}/stats/groupentry/add'.format(
             self.environment.ryu_host, self.environment.ryu_port)
         logging.debug('sending add group command %s', group)
+        self.groups[group['dpid']].add(group['group_id'])
         response = self.session.post(url, json=group, headers=HTTP_HEADERS)
         response.raise_for_status()
         return response
@@ -173,12 +586,27 @@ class Scenario:
         response.raise_for_status()
         return response
 
+    def start_stats_burst(self, dpid, interval=None, duration=None):
+        if interval is None:
+            interval = self.stats_burst_interval
+        if duration is None:
+            duration = self.stats_burst_duration
+        url = 'http://{}:{}/tpn/stats/burst/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.post(url, json={'interval': interval,
+                                                'duration': duration},
+                                     headers=HTTP_HEADERS)
+        response.raise_for_status()
+        logging.info('Polling stats of %s every %.3f seconds for %i seconds',
+                     dpid, interval, duration)
+        return response
+
     def send_packet_out(self, dpid, port, eth_src, eth_dst, udp_src_port,
                         udp_dst_port, eth_type, ip_src, ip_dst, ip_proto,
                         outer_vlan, inner_vlan, vni, pkt_size, count):
         url = 'http://{}:{}/tpn/packet_out/{}'.format(
             self.environment.ryu_host, self.environment.ryu_port, dpid)
-        resp = self.session.post(url, json={
+        payload = {
             'port': port,
             'ip_src': ip_src,
             'ip_dst': ip_dst,
@@ -193,81 +621,450 @@ class Scenario:
             'vni': vni,
             'pkt_size': pkt_size,
             'count': count
-        })
+        }
+        payload.update(self.packet_template())
+        resp = self.session.post(url, json=payload)
         resp.raise_for_status()
         logging.debug('Sending %i packet out to port %i of size %i',
                       count, port, pkt_size)
 
-    def switch_at_peak_load(self, dpid):
-        logging.debug('Checking if switch %s at peak load', dpid)
-        url = 'http://{}:{}/api/query'.format(self.environment.otsdb_host,
-                                              self.environment.otsdb_port)
-        payload = {'start': '1m-ago',
-                   'queries': [{'aggregator': 'sum',
-                                'metric': self.environment.otsdb_prefix
-                                + '.port.bits',
-                                'rate': 'true',
-                                'downsample': '20s-sum',
-                                'tags': {'dpid': dpid}
-                                }
-                               ]
-                   }
-        response = requests.post(url, headers=HTTP_HEADERS, json=payload)
+    def packet_template(self):
+        """
+        Header field variations of the injected traffic, so the load is
+        spread over many flows instead of a single 5-tuple.
+
+        :return: (dict) extra packet out payload, empty for a single flow
+        """
+        if not self.packet_variations:
+            return {}
+        return {'variations': self.packet_variations,
+                'flows': self.packet_flows}
+
+    def start_generator(self, dpid, ports, pps, size, burst=1, duration=None,
+                        **packet_args):
+        """
+        Starts sending packet outs at a steady rate from the controller.
+
+        :param dpid: Switch DPID
+        :param ports: (list) ports to send packet outs to, -1 floods
+        :param pps: (float) target packet outs per second over all ports
+        :param size: (int) packet size
+        :param burst: (int) packets sent back to back on every tick
+        :param duration: (float) seconds to run, None runs until stopped
+        :param packet_args: packet header fields as in send_packet_out
+        :return: (dict) status of the generator job
+        """
+        url = 'http://{}:{}/tpn/generator/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        payload = dict(packet_args, ports=ports, pps=pps, burst=burst,
+                       duration=duration, pkt_size=size)
+        payload.update(self.packet_template())
+        response = self.session.post(url, json=payload)
+        response.raise_for_status()
+        job = response.json()
+        logging.info('Started generator job %i: %s pps of size %i to %s',
+                     job['job_id'], pps, size, ports)
+        return job
+
+    def generator_status(self, job_id):
+        url = 'http://{}:{}/tpn/generator/job/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, job_id)
+        response = self.session.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def stop_generator(self, job_id):
+        url = 'http://{}:{}/tpn/generator/job/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, job_id)
+        response = self.session.delete(url)
+        response.raise_for_status()
+        job = response.json()
+        logging.info('Stopped generator job %i, achieved %.1f pps',
+                     job_id, job['achieved_pps'])
+        return job
+
+    def start_probes(self, dpid, port, count, interval, size, **packet_args):
+        """
+        Starts sending timestamped probe packets from the controller.  A
+        flows.flow_probe_punt rule has to send them back.
+
+        :param dpid: Switch DPID
+        :param port: (int) port to send the probes to
+        :param count: (int) number of probes
+        :param interval: (float) seconds between probes
+        :param size: (int) packet size
+        :param packet_args: packet header fields as in send_packet_out
+        :return: (dict) summary of the probe session
+        """
+        url = 'http://{}:{}/tpn/probe/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        payload = dict(packet_args, port=port, count=count,
+                       interval=interval, pkt_size=size)
+        response = self.session.post(url, json=payload)
+        response.raise_for_status()
+        probes = response.json()
+        logging.info('Started probe session %i: %i probes to port %i',
+                     probes['session_id'], count, port)
+        return probes
+
+    def probe_results(self, session_id):
+        url = 'http://{}:{}/tpn/probe/session/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, session_id)
+        response = self.session.get(url)
         response.raise_for_status()
+        return response.json()
 
-        dps = sorted(response.json()[0]['dps'].items())
-        if len(dps) < 2:
-            logging.error(
-                'Somehow we only received 1 datapoint from OpenTSDB, %s', dps)
-            return False  # What the hell try again
-        prev = dps[-2][1]
-        curr = dps[-1][1]
+    def packet_in_stats(self, dpid):
+        url = 'http://{}:{}/tpn/packet_in/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def reset_packet_in_stats(self, dpid):
+        url = 'http://{}:{}/tpn/packet_in/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.delete(url)
+        response.raise_for_status()
+
+    def flow_count(self, dpid, cookie, table_id):
+        """
+        Number of flows with the cookie in a table of the switch.
+        """
+        url = 'http://{}:{}/stats/aggregateflow/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.post(url, json={
+            'table_id': table_id,
+            'cookie': cookie,
+            'cookie_mask': 0xffffffffffffffff
+        }, headers=HTTP_HEADERS)
+        response.raise_for_status()
+        return response.json()[dpid][0]['flow_count']
+
+    def port_stats(self, dpid):
+        """
+        Current port counters of a switch.
+
+        :param dpid: Switch DPID
+        :return: (dict) port_no -> port stats as returned by ofctl_rest
+        """
+        url = 'http://{}:{}/stats/port/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.get(url)
+        response.raise_for_status()
+        return {stat['port_no']: stat for stat in response.json()[dpid]}
+
+    def flow_stats(self, dpid):
+        """
+        Flows of a switch with their counters.
+
+        :param dpid: Switch DPID
+        :return: (list) flow stats as returned by ofctl_rest
+        """
+        url = 'http://{}:{}/stats/flow/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.get(url)
+        response.raise_for_status()
+        return response.json()[dpid]
+
+    def snapshot_ports(self, dpid):
+        """
+        Takes the port counters check_conservation() compares with.
+        Switches the scenario installed no snake on are skipped.
+        """
+        if (0, COOKIE_SNAKE) not in self.cookies.get(dpid, ()):
+            self.port_snapshots.pop(dpid, None)
+            return
+        try:
+            self.port_snapshots[dpid] = (time.time(), self.port_stats(dpid))
+        except requests.RequestException as e:
+            logging.warning('Could not get port stats of %s: %s', dpid, e)
+            self.port_snapshots.pop(dpid, None)
+
+    def check_conservation(self, dpid):
+        """
+        Follows the packets through the snake of a switch since
+        snapshot_ports() and records the per hop deltas and the hops that
+        drop packets in time_metrics[-1].conservation[dpid], see
+        conservation.analyze().
+        """
+        if dpid not in self.port_snapshots:
+            return
+        start, before = self.port_snapshots.pop(dpid)
+        try:
+            after = self.port_stats(dpid)
+            entries = self.flow_stats(dpid)
+        except requests.RequestException as e:
+            logging.warning('Could not check conservation on %s: %s',
+                            dpid, e)
+            return
+        switch = self.environment.sw_by_dpid(dpid)
+        result = conservation.analyze(switch.snake_start_port,
+                                      switch.snake_end_port, before, after,
+                                      time.time() - start, entries)
+        self.time_metrics[-1].conservation[dpid] = result
+        if result['worst']:
+            logging.warning('Snake of %s drops packets at %s', dpid,
+                            ', '.join(result['drops']))
+
+    def search_lossless_rate(self, dpid):
+        """
+        Searches the highest rate the snake of a switch passes without loss
+        through the rules the scenario installed, see
+        search_max_lossless_rate().
+
+        What the scenario left looping in the snake, in either direction,
+        is dropped by a drain flow for trial_gap seconds first.  A rule on
+        the last port of the snake then drops what comes back, so every
+        packet injected into the first port passes the snake once.  The
+        result is recorded in time_metrics[-1].lossless_rate[dpid].  A
+        switch that failed, before or during the search, is logged and
+        recorded in time_metrics[-1].errors without stopping the others.
+        """
+        errors = self.time_metrics[-1].errors
+        if dpid in errors:
+            logging.warning('Not searching the lossless rate of failed '
+                            'switch %s', dpid)
+            return
+        try:
+            self._search_lossless_rate(dpid)
+        except Exception as e:
+            logging.exception('Lossless rate search of %s failed on switch '
+                              '%s', self.name, dpid)
+            errors[dpid] = str(e)
+
+    def _search_lossless_rate(self, dpid):
+        duration = self.options.get('trial_duration', 10)
+        gap = self.options.get('trial_gap', 2)
+        precision = self.options.get('precision', 0.01)
+        size = self.current_packet_size()
+        sw = self.environment.sw_by_dpid(dpid)
+
+        self.add_flow(flows.flow_snake_sink(dpid, sw.snake_end_port))
+        self.add_flow(flows.flow_drain(dpid))
+        time.sleep(gap)
+        self.delete_cookie(dpid, COOKIE_DRAIN)
+
+        def trial(pps):
+            return self.run_trial(sw, pps, size, duration, gap, precision)
+
+        pps, trials = search_max_lossless_rate(
+            trial, self.options.get('min_pps', 1000),
+            self.options.get('max_pps', 100000),
+            self.options.get('loss_threshold', 0.0), precision,
+            self.options.get('max_trials', 20))
+        hops = (sw.snake_end_port - sw.snake_start_port + 1) // 2
+        best = max((t for t in trials if t['passed']),
+                   key=lambda t: t['pps'], default=None)
+        offered = best['offered_pps'] if best else None
+        self.time_metrics[-1].lossless_rate[dpid] = {
+            'max_lossless_pps': offered,
+            'max_lossless_bps': offered * size * 8 if best else None,
+            'target_pps': pps,
+            'hops': hops,
+            'trials': trials
+        }
+        if best is None:
+            logging.warning('Switch %s lost packets of size %i even at %s '
+                            'pps', dpid, size, trials[-1]['pps'])
+        else:
+            logging.info('Maximum lossless rate of %s with size %i is %.0f '
+                         'pps through %i hops after %i trials', dpid, size,
+                         offered, hops, len(trials))
+
+    def run_trial(self, sw, pps, size, duration, gap, precision):
+        """
+        Offers pps to the first port of the snake for duration seconds.
+
+        The offered rate is measured by the tx counter of the first port,
+        a trial that offered more than precision less than pps is flagged
+        under_delivered.
+
+        :return: (dict) counter deltas, offered rate and loss of the trial
+        """
+        before = self.port_stats(sw.dpid)
+        job = self.start_generator(sw.dpid, [sw.snake_start_port], pps, size,
+                                   duration=duration)
+        # packets still in the snake once the job ends are counted too
+        time.sleep(duration + gap)
+        job = self.generator_status(job['job_id'])
+        after = self.port_stats(sw.dpid)
+        offered = after[sw.snake_start_port]['tx_packets'] - \
+            before[sw.snake_start_port]['tx_packets']
+        received = after[sw.snake_end_port]['rx_packets'] - \
+            before[sw.snake_end_port]['rx_packets']
+        lost = max(offered - received, 0)
+        result = {
+            'packets_sent': job['sent'],
+            'achieved_pps': job['achieved_pps'],
+            'offered_pps': offered / duration,
+            'under_delivered': offered / duration < pps * (1 - precision),
+            'tx_packets': offered,
+            'rx_packets': received,
+            'lost': lost,
+            'loss': lost / offered if offered else 1.0
+        }
+        if result['under_delivered']:
+            logging.warning('Trial of %s offered only %.0f of %.0f pps',
+                            sw.dpid, result['offered_pps'], pps)
+        logging.info('Trial of %s at %.0f pps: %i of %i packets lost',
+                     sw.dpid, pps, lost, offered)
+        return result
 
-        # arbitrary number to make sure we have some packets moving
-        if curr < 1000:
+    def get_rates(self, dpid, window=PEAK_LOAD_WINDOW, ports=True):
+        """
+        Recent rates of a switch from the ring buffer of RyuToOpentsdb.
+
+        :param dpid: Switch DPID
+        :param window: (int) seconds of history to fetch
+        :param ports: (bool) include per port rates, not only the totals
+        :return: (dict) with 'total' and optionally 'ports' series
+        """
+        url = 'http://{}:{}/tpn/stats/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        response = self.session.get(url, params={'window': '%ss' % window,
+                                                 'ports': int(ports)})
+        response.raise_for_status()
+        return response.json()
+
+    def rate_samples(self, dpid):
+        try:
+            total = self.get_rates(dpid, ports=False)['total']
+        except requests.RequestException as e:
+            logging.warning('Could not get rates of %s: %s', dpid, e)
+            return []
+        return list(zip(total['timestamp'], total['tx_pps']))
+
+    def wait_for_steady_state(self, phase, min_duration, max_duration,
+                              dpids=None):
+        """
+        Waits until the tx packet rate of every switch is stable, i.e. its
+        coefficient of variation over the last convergence_window samples
+        is at most convergence_threshold, but at least min_duration and at
+        most max_duration seconds.  Only samples taken after the wait
+        started count.  The outcome is recorded in
+        time_metrics[-1].convergence[phase][dpid].
+
+        With adaptive_waits off it simply sleeps max_duration.
+
+        :param phase: (string) what is waited for, e.g. 'collection'
+        :param min_duration: (float) seconds to wait in any case
+        :param max_duration: (float) seconds to give up after
+        :param dpids: (list) switches to watch, defaults to all
+        :return: (bool) whether the rates converged
+        """
+        if not self.adaptive_waits:
+            time.sleep(max_duration)
             return False
+        detectors = self.convergence_detectors(dpids)
+        converged, seconds = wait_for_convergence(
+            self.rate_samples, detectors, min_duration, max_duration,
+            self.convergence_poll_interval)
+        self.record_convergence(phase, detectors, converged, seconds)
+        return converged
 
-        growth_rate = abs(curr - prev) / curr
-        logging.debug('growth is %f', growth_rate)
+    def convergence_detectors(self, dpids=None):
+        if dpids is None:
+            dpids = list(self.environment.switches)
+        return {dpid: ConvergenceDetector(self.convergence_window,
+                                          self.convergence_threshold)
+                for dpid in dpids}
 
-        return growth_rate < 0.05
+    def record_convergence(self, phase, detectors, converged, seconds):
+        logging.info('%s of %s %s after %.1f seconds', phase, self.name,
+                     'converged' if converged else 'did not converge',
+                     seconds)
+        results = self.time_metrics[-1].convergence.setdefault(phase, {})
+        for dpid, detector in detectors.items():
+            results[dpid] = dict(detector.summary(),
+                                 converged=detector.converged(),
+                                 seconds=seconds)
 
     def bring_switch_full_load(self, dpid, port, size, outer_vlan=0,
                                inner_vlan=0, vni=0,
                                eth_src=None, eth_dst=None, udp_src_port=None,
                                udp_dst_port=None, eth_type=None,
                                ip_src=None, ip_dst=None, ip_proto=None):
+        self.saturate_switch(dpid, port, size, outer_vlan, inner_vlan, vni,
+                             eth_src, eth_dst, udp_src_port, udp_dst_port,
+                             eth_type, ip_src, ip_dst, ip_proto)
+        self.wait_for_steady_state('peak_load',
+                                   self.min_sleep_after_peak_load,
+                                   self.sleep_after_peak_load, dpids=[dpid])
+
+    def saturate_switch(self, dpid, port, size, outer_vlan=0, inner_vlan=0,
+                        vni=0, eth_src=None, eth_dst=None, udp_src_port=None,
+                        udp_dst_port=None, eth_type=None, ip_src=None,
+                        ip_dst=None, ip_proto=None):
+        """
+        Injects packets into the snake until the switch is saturated, the
+        first half of bring_switch_full_load() without the peak load wait.
+
+        :return: (dict) saturation result of the controller
+        """
         logging.info('Bringing switch %s to full load', dpid)
-        done = False
-        pkts_sent = 0
-        while not done:
-            self.send_packet_out(dpid, port, eth_src, eth_dst, udp_src_port,
-                                 udp_dst_port, eth_type, ip_src, ip_dst,
-                                 ip_proto, outer_vlan, inner_vlan, vni,
-                                 size, 1)
-            pkts_sent += 1
-            logging.debug('Injected %i packets per port in total', pkts_sent)
-            time.sleep(1)
-            done = self.switch_at_peak_load(dpid)
+        url = 'http://{}:{}/tpn/saturate/{}'.format(
+            self.environment.ryu_host, self.environment.ryu_port, dpid)
+        payload = {
+            'port': port,
+            'ip_src': ip_src,
+            'ip_dst': ip_dst,
+            'ip_proto': ip_proto,
+            'eth_src': eth_src,
+            'eth_dst': eth_dst,
+            'eth_type': eth_type,
+            'udp_src_port': udp_src_port,
+            'udp_dst_port': udp_dst_port,
+            'outer_vlan': outer_vlan,
+            'inner_vlan': inner_vlan,
+            'vni': vni,
+            'pkt_size': size,
+            'tolerance': self.saturation_tolerance
+        }
+        payload.update(self.packet_template())
+        # blocks until the switch is saturated
+        resp = self.session.post(url, json=payload,
+                                 timeout=(self.session.connect_timeout, None))
+        resp.raise_for_status()
+        result = resp.json()
+        self.time_metrics[-1].saturation[dpid] = result
+        if not result['saturated']:
+            logging.error('Switch %s did not saturate within %i seconds',
+                          dpid, result['time_to_saturation'])
         logging.info(
-            'Injected %i packets with size of %i for port %i,'
-            ' tired so gonna sleep for %i seconds',
-            pkts_sent, size, port, self.sleep_after_peak_load)
-        time.sleep(self.sleep_after_peak_load)
+            'Injected %i packets with size of %i for port %i in %.1f seconds,'
+            ' tired so gonna sleep for up to %i seconds',
+            result['packets_sent'], size, port,
+            result['time_to_saturation'], self.sleep_after_peak_load)
+        return result
+
+    def install_snake(self, dpid):
+        """
+        Installs the snake flows unless the switch kept its snake from the
+        previous packet size.
+        """
+        switch = self.environment.sw_by_dpid(dpid)
+        if dpid in self.snakes:
+            logging.info('Reusing the snake of %s', dpid)
+            return
+        flowmods = flows.flow_snake(dpid, switch.snake_start_port,
+                                    switch.snake_end_port, 0)
+        self.add_flows(dpid, flowmods, phase='snake')
+        if self.reuse_snake:
+            self.snakes.add(dpid)
 
     def prepare_snake_flows(self, dpid, size, outer_vlan=0, inner_vlan=0,
                             vni=0, eth_src=None, eth_dst=None,
                             udp_src_port=None, udp_dst_port=None,
                             eth_type=None, ip_src=None, ip_dst=None,
                             ip_proto=None):
-        switch = self.environment.sw_by_dpid(dpid)
-        flowmods = flows.flow_snake(dpid, switch.snake_start_port,
-                                    switch.snake_end_port, 0)
-        for flow in flowmods:
-            self.add_flow(flow)
+        self.install_snake(dpid)
         self.time_metrics[-1].basic_flows_installed = datetime.utcnow()
         self.bring_switch_full_load(dpid, -1, size, outer_vlan, inner_vlan,
                                     vni, eth_src, eth_dst, udp_src_port,
                                     udp_dst_port, eth_type,
                                     ip_src, ip_dst, ip_proto)
         self.time_metrics[-1].traffic_injected = datetime.utcnow()
+        if self.stats_burst_duration:
+            # scenarios add their rules right after the snake is saturated
+            self.start_stats_burst(dpid)
@@ -1,5 +1,4 @@
 import logging
-from datetime import datetime
 
 from oftester.constants import OFPP_IN_PORT
 from oftester.openflow import basic_flows
@@ -11,65 +10,58 @@ from oftester.openflow import groups
 # This scenario doesn't work until Noviflow fixes the bug related to
 # VxLAN header and metadata matching.
 class ConnectedDevicesVxlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=46, inner_vlan=47)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding connected_devices_vxlan rules')
-            for flow in pipeline_flows.flow_egress_vxlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT,
-                    outer_vid=46, inner_vid=47, priority=2000):
-                self.add_flow(flow)
-            self.add_flow(basic_flows.flow_vlan_push_pop(
-                sw.dpid, sw.snake_start_port, OFPP_IN_PORT, 'push',
-                outer_vid=46, inner_vid=47, priority=1500, table_id=4))
-            for flow in pipeline_flows.flows_connected_devices_with_vxlan(
-                    sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=47, priority=2000):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=46, inner_vlan=47)
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding connected_devices_vxlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_egress_vxlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=47, priority=2000), phase='egress', confirm=True)
+        self.add_flow(basic_flows.flow_vlan_push_pop(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, 'push',
+            outer_vid=46, inner_vid=47, priority=1500, table_id=4))
+        self.add_flows(
+            sw.dpid, pipeline_flows.flows_connected_devices_with_vxlan(
+                sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
+                inner_vid=47, priority=2000),
+            phase='connected_devices', confirm=True)
 
 
 class ConnectedDevicesVlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=46, inner_vlan=47)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info(
-                'Switch under full load adding connected_devices_vlan rules')
-            for flow in pipeline_flows.flow_egress_vlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT,
-                    outer_vid=46, inner_vid=47, priority=2000):
-                self.add_flow(flow)
-            for flow in pipeline_flows.flows_connected_devices_with_vlan(
-                    sw.dpid, sw.snake_end_port,
-                    OFPP_IN_PORT, outer_vid=46,
-                    inner_vid=47, priority=2000):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=46, inner_vlan=47)
+        self.mark(sw.dpid, 'start')
+        logging.info(
+            'Switch under full load adding connected_devices_vlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_egress_vlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, outer_vid=46,
+            inner_vid=47, priority=2000), phase='egress', confirm=True)
+        self.add_flows(
+            sw.dpid, pipeline_flows.flows_connected_devices_with_vlan(
+                sw.dpid, sw.snake_end_port, OFPP_IN_PORT, outer_vid=46,
+                inner_vid=47, priority=2000),
+            phase='connected_devices', confirm=True)
 
 
 class RtlScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            eth_dst = 'aa:bb:cc:dd:ee:ff'
-            eth_type = 2048
-            ip_proto = 17
-            udp_dst = 6000
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     eth_dst=eth_dst, eth_type=eth_type,
-                                     ip_proto=ip_proto, udp_dst_port=udp_dst)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding rtl rules')
-            group = groups.group_rtl(sw.dpid, sw.snake_end_port - 2,
-                                     sw.snake_end_port, mac=eth_dst,
-                                     udp_port=udp_dst)
-            self.add_group(group)
-            self.add_flow(pipeline_flows.flow_rtl(
-                sw.dpid, sw.snake_start_port, eth_dst=eth_dst,
-                eth_type=eth_type, ip_proto=ip_proto,
-                udp_dst_port=udp_dst, priority=2000))
+    def run_switch(self, sw):
+        eth_dst = 'aa:bb:cc:dd:ee:ff'
+        eth_type = 2048
+        ip_proto = 17
+        udp_dst = 6000
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 eth_dst=eth_dst, eth_type=eth_type,
+                                 ip_proto=ip_proto, udp_dst_port=udp_dst)
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding rtl rules')
+        group = groups.group_rtl(sw.dpid, sw.snake_end_port - 2,
+                                 sw.snake_end_port, mac=eth_dst,
+                                 udp_port=udp_dst)
+        self.add_group(group)
+        self.add_flow(pipeline_flows.flow_rtl(
+            sw.dpid, sw.snake_start_port, eth_dst=eth_dst,
+            eth_type=eth_type, ip_proto=ip_proto,
+            udp_dst_port=udp_dst, priority=2000))
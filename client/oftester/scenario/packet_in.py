@@ -0,0 +1,65 @@
+import logging
+import time
+
+from oftester.constants import COOKIE_PACKET_IN
+from oftester.openflow import basic_flows as flows
+from oftester.scenario.model import Scenario
+
+
+class PacketInScenario(Scenario):
+    """
+    Measures how fast the switch punts table miss traffic to the
+    controller.
+
+    Packet outs are sent at a fixed rate to the first punt_ports ports of
+    the snake.  No snake flows are installed, so the packets hit the table
+    miss flows of the peer ports and come back as packet ins.  The packet
+    ins of their cookie counted by the controller are compared with the rx
+    counters of those ports.  The scenario measures on its own, there is no
+    rate collection.
+    """
+
+    collect_rates = False
+
+    def run_switch(self, sw):
+        punt_ports = self.options.get('punt_ports', 2)
+        pps = self.options.get('pps', 10000)
+        duration = self.options.get('duration', 30)
+        out_ports = list(range(sw.snake_start_port, sw.snake_end_port,
+                               2))[:punt_ports]
+        in_ports = [port + 1 for port in out_ports]
+        for port in in_ports:
+            self.add_flow(flows.flow_table_miss_controller(sw.dpid,
+                                                           in_port=port))
+        self.reset_packet_in_stats(sw.dpid)
+        before = self.port_stats(sw.dpid)
+
+        self.mark(sw.dpid, 'start')
+        logging.info('Punting %s pps through ports %s',
+                     pps, in_ports)
+        job = self.start_generator(sw.dpid, out_ports, pps,
+                                   self.current_packet_size(),
+                                   duration=duration)
+        time.sleep(duration + 2)
+
+        job = self.generator_status(job['job_id'])
+        after = self.port_stats(sw.dpid)
+        packet_in = self.packet_in_stats(sw.dpid)
+        received = sum(after[port]['rx_packets'] -
+                       before[port]['rx_packets'] for port in in_ports)
+        # packet ins of other flows, like LLDP, are left out
+        packet_ins = packet_in['cookies'].get(str(COOKIE_PACKET_IN), 0)
+        lost = max(received - packet_ins, 0)
+        result = {
+            'ports': in_ports,
+            'packets_sent': job['sent'],
+            'rx_packets': received,
+            'packet_ins': packet_ins,
+            'packet_in_rate': packet_in['rate'],
+            'lost': lost,
+            'loss': lost / received if received else 0.0
+        }
+        self.time_metrics[-1].packet_in[sw.dpid] = result
+        logging.info('%i packet ins at %.1f per second, %i of %i '
+                     'received packets lost', result['packet_ins'],
+                     result['packet_in_rate'], lost, received)
@@ -1,5 +1,4 @@
 import logging
-from datetime import datetime
 
 from oftester.constants import OFPP_IN_PORT
 from oftester.openflow import pipeline_flows
@@ -7,35 +6,29 @@ from oftester.scenario.model import Scenario
 
 
 class TransitVlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     outer_vlan=48)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding transit_vlan rules')
-            for flow in pipeline_flows.flow_transit_vlan(sw.dpid,
-                                                         sw.snake_end_port,
-                                                         OFPP_IN_PORT):
-                self.add_flow(flow)
-            for flow in pipeline_flows.flow_transit_vlan(sw.dpid,
-                                                         sw.snake_start_port,
-                                                         OFPP_IN_PORT):
-                self.add_flow(flow)
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 outer_vlan=48)
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding transit_vlan rules')
+        self.add_flows(sw.dpid, pipeline_flows.flow_transit_vlan(
+            sw.dpid, sw.snake_end_port, OFPP_IN_PORT),
+            phase='transit_end', confirm=True)
+        self.add_flows(sw.dpid, pipeline_flows.flow_transit_vlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT),
+            phase='transit_start', confirm=True)
 
 
 class TransitVxlanScenario(Scenario):
-    def run(self):
-        for sw in self.environment.switches.values():
-            self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
-                                     vni=48)
-            timestamp = int(datetime.now().timestamp())
-            self.time_metrics[-1].timestamps[timestamp] = "start"
-            logging.info('Switch under full load adding transit_vxlan rules')
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size(),
+                                 vni=48)
+        self.mark(sw.dpid, 'start')
+        logging.info('Switch under full load adding transit_vxlan rules')
 
-            for flow in pipeline_flows.flow_transit_vxlan(
-                    sw.dpid, sw.snake_end_port, OFPP_IN_PORT, vni=48):
-                self.add_flow(flow)
-            for flow in pipeline_flows.flow_transit_vxlan(
-                    sw.dpid, sw.snake_start_port, OFPP_IN_PORT, vni=48):
-                self.add_flow(flow)
+        self.add_flows(sw.dpid, pipeline_flows.flow_transit_vxlan(
+            sw.dpid, sw.snake_end_port, OFPP_IN_PORT, vni=48),
+            phase='transit_end', confirm=True)
+        self.add_flows(sw.dpid, pipeline_flows.flow_transit_vxlan(
+            sw.dpid, sw.snake_start_port, OFPP_IN_PORT, vni=48),
+            phase='transit_start', confirm=True)
@@ -0,0 +1,880 @@
+#!/usr/bin/env python
+"""
+Stand-in for Ryu and OpenTSDB to run and profile the tester without a
+switch.
+
+Serves the ofctl_rest and TpnRyuUtils endpoints the snake scenarios use,
+the rate history of RyuToOpentsdb and the OpenTSDB /api/query and /q
+endpoints, all on one port.  Every switch is a snake whose ports forward
+at line rate, scaled by a per packet size throughput curve and slowed down
+by every installed rule.  The simulated clock runs speed times faster than
+the wall clock, so a stats interval of 10 seconds passes in 0.1 seconds at
+speed 100.
+
+Packets of the generator and the latency probes are followed hop by hop
+through the flows of table 0 over ports cabled in pairs, so they move the
+port counters and come back as packet ins or probe round trips.  They do
+not show in the rate history and only flows matching nothing but the in
+port apply to them, besides the probe punt rule for probes.
+"""
+
+import argparse
+import bisect
+import calendar
+import collections
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import yaml
+
+from oftester.constants import PROBE_UDP_PORT
+
+LINE_RATE = 10 ** 10
+ETHERNET_OVERHEAD = 20
+STATS_INTERVAL = 10
+HISTORY_SIZE = 600
+RULE_PENALTY = 0.0005
+FLOW_MOD_TIME = 0.00002
+TABLE_CAPACITY = 100000
+NOISE = 0.005
+OTSDB_TIME_FORMAT = '%Y/%m/%d-%H:%M:%S'
+OFPTT_ALL = 255
+OFPFMFC_TABLE_FULL = 1
+OFPET_FLOW_MOD_FAILED = 5
+# 1x1 transparent png for the OpenTSDB graph endpoint
+PNG = bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806'
+                    '0000001f15c4890000000d49444154789c6360000002000100'
+                    '05fe02fea7359a9f0000000049454e44ae426082')
+TOTAL_FIELDS = ('rx_bps', 'tx_bps', 'rx_pps', 'tx_pps')
+# packet out to packet in of a probe and the time it takes through a hop
+CONTROL_RTT = 0.0002
+HOP_LATENCY = 0.000002
+PROBE_FIELDS = {'eth_type': 2048, 'ip_proto': 17, 'udp_dst': PROBE_UDP_PORT}
+PERCENTILES = (50, 99, 99.9)
+
+
+class SimClock:
+    """
+    Wall clock running speed times faster from the moment it is created.
+    """
+
+    def __init__(self, speed=1.0, clock=time.time):
+        self.speed = speed
+        self.clock = clock
+        self.origin = clock()
+
+    def now(self):
+        return self.origin + (self.clock() - self.origin) * self.speed
+
+    def to_wall(self, timestamp):
+        return self.origin + (timestamp - self.origin) / self.speed
+
+
+def interpolate(curve, x):
+    """
+    :param curve: (dict) x -> y, linearly interpolated and flat outside
+    """
+    if not curve:
+        return 1.0
+    xs = sorted(curve)
+    i = bisect.bisect_left(xs, x)
+    if i == 0:
+        return curve[xs[0]]
+    if i == len(xs):
+        return curve[xs[-1]]
+    x0, x1 = xs[i - 1], xs[i]
+    return curve[x0] + (curve[x1] - curve[x0]) * (x - x0) / (x1 - x0)
+
+
+def percentile(values, q):
+    """
+    Nearest rank percentile as in the latency probes of TpnRyuUtils.
+
+    :param values: (list) sorted values
+    :param q: (float) percentile between 0 and 100
+    """
+    if not values:
+        return None
+    rank = int(math.ceil(q / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class SimGeneratorJob:
+    """
+    Packet outs at a steady rate, spread evenly over the ports, from start
+    until the duration is over or the job is stopped.
+    """
+
+    def __init__(self, job_id, dpid, ports, pps, size, start, burst=1,
+                 duration=None):
+        if not ports:
+            raise ValueError('At least one port is needed')
+        if pps <= 0 or burst <= 0:
+            raise ValueError('pps and burst need to be positive')
+        self.job_id = job_id
+        self.dpid = dpid
+        self.ports = ports
+        self.pps = float(pps)
+        self.size = size
+        self.burst = burst
+        self.duration = duration
+        self.start = start
+        self.end = start + duration if duration else float('inf')
+        self.stopped = False
+
+    def stop(self, now):
+        if now < self.end:
+            self.end = now
+            self.stopped = True
+
+    def status(self, now):
+        if now < self.end:
+            state, elapsed = 'running', now - self.start
+        elif self.stopped:
+            state, elapsed = 'stopped', self.end - self.start
+        else:
+            state, elapsed = 'finished', self.duration
+        sent = int(self.pps * elapsed)
+        return {
+            'job_id': self.job_id,
+            'dpid': int(self.dpid),
+            'ports': self.ports,
+            'state': state,
+            'error': None,
+            'target_pps': self.pps,
+            'burst': self.burst,
+            'duration': self.duration,
+            'sent': sent,
+            'elapsed': elapsed,
+            'achieved_pps': sent / elapsed if elapsed > 0 else 0.0
+        }
+
+
+class SimProbeSession:
+    """
+    Probes sent interval apart from start, each coming back after its
+    round trip time if the flows punt it, see SimSwitch.walk().
+    """
+
+    def __init__(self, session_id, dpid, port, count, interval, start,
+                 rtts):
+        self.session_id = session_id
+        self.dpid = dpid
+        self.port = port
+        self.count = count
+        self.interval = interval
+        self.start = start
+        # None for probes that do not come back
+        self.rtts = rtts
+
+    def summary(self, now):
+        sent = min(self.count, int((now - self.start) / self.interval) + 1)
+        rtts = sorted(rtt for seq, rtt in enumerate(self.rtts[:sent])
+                      if rtt is not None and
+                      self.start + seq * self.interval + rtt <= now)
+        result = {
+            'session_id': self.session_id,
+            'dpid': int(self.dpid),
+            'port': self.port,
+            'count': self.count,
+            'interval': self.interval,
+            # the controller waits a second for the last probes
+            'running': now < self.start + self.count * self.interval + 1,
+            'error': None,
+            'sent': sent,
+            'received': len(rtts),
+            'lost': sent - len(rtts),
+            'duplicates': 0,
+            'out_of_order': 0,
+            'rtt_min': rtts[0] if rtts else None,
+            'rtt_max': rtts[-1] if rtts else None,
+            'rtt_avg': sum(rtts) / len(rtts) if rtts else None
+        }
+        for q in PERCENTILES:
+            result['rtt_p%s' % ('%g' % q).replace('.', '_')] = \
+                percentile(rtts, q)
+        return result
+
+
+class SimSwitch:
+    """
+    Counters of one switch.  The rates only change on flow mods and when
+    traffic is injected, so the counters are integrated up to the current
+    time before every change and the stats samples are taken on the way.
+    """
+
+    def __init__(self, dpid, ports, clock, line_rate=LINE_RATE,
+                 throughput=None, rule_penalty=RULE_PENALTY,
+                 table_capacity=TABLE_CAPACITY, noise=NOISE,
+                 stats_interval=STATS_INTERVAL, seed=0):
+        self.dpid = dpid
+        self.ports = ports
+        self.clock = clock
+        self.line_rate = line_rate
+        self.throughput = throughput or {}
+        self.rule_penalty = rule_penalty
+        self.table_capacity = table_capacity
+        self.noise = noise
+        self.stats_interval = stats_interval
+        self.rng = random.Random(seed)
+        self.flows = {}
+        self.groups = {}
+        self.packet_size = None
+        self.counters = {port: collections.Counter() for port in ports}
+        self.jobs = []
+        self.packet_ins = collections.Counter()
+        self.packet_in_times = None
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self.last_update = clock.now()
+        self.next_sample = self.last_update + stats_interval
+
+    def active_ports(self):
+        """
+        Ports the injected traffic loops through: the in ports of the flows
+        or all of them once a flow matches any port.
+        """
+        ports = set()
+        for flow in self.flows.values():
+            in_port = flow.get('match', {}).get('in_port')
+            if in_port is None:
+                return set(self.counters)
+            if in_port in self.counters:
+                ports.add(in_port)
+        return ports
+
+    def port_pps(self, size=None):
+        if size is None:
+            size = self.packet_size
+        if size is None:
+            return 0.0
+        pps = self.line_rate / ((size + ETHERNET_OVERHEAD) * 8)
+        pps *= interpolate(self.throughput, size)
+        return pps / (1 + self.rule_penalty * len(self.flows))
+
+    def drops_all(self):
+        """
+        Whether a flow matching everything without actions is on top.
+        """
+        if not self.flows:
+            return False
+        top = max(flow.get('priority', 0) for flow in self.flows.values())
+        return any(not flow.get('match') and not flow.get('actions') and
+                   flow.get('priority', 0) == top
+                   for flow in self.flows.values())
+
+    def advance(self):
+        """
+        Integrates the counters up to now at the current rates.
+        """
+        now = self.clock.now()
+        ports = self.active_ports()
+        pps = self.port_pps() if ports else 0.0
+        if self.drops_all():
+            ports, pps = set(), 0.0
+            # nothing is left to loop once the drop flow is gone
+            self.packet_size = None
+        while self.next_sample <= now:
+            self._integrate(ports, pps, self.next_sample)
+            self._sample(ports, pps)
+            self.next_sample += self.stats_interval
+        self._integrate(ports, pps, now)
+
+    def _integrate(self, ports, pps, until):
+        packets = pps * (until - self.last_update)
+        for port in ports:
+            counters = self.counters[port]
+            for direction in ('rx', 'tx'):
+                counters[direction + '_packets'] += packets
+                counters[direction + '_bytes'] += \
+                    packets * (self.packet_size or 0)
+        for job in self.jobs:
+            self._integrate_job(job, until)
+        self.jobs = [job for job in self.jobs if job.end > until]
+        self.last_update = until
+
+    def _integrate_job(self, job, until):
+        start = max(self.last_update, job.start)
+        end = min(until, job.end)
+        if end <= start:
+            return
+        for port in job.ports:
+            tx, rx, punted, _ = self.walk(port, job.pps / len(job.ports),
+                                          job.size)
+            for direction, rates in (('tx', tx), ('rx', rx)):
+                for hop, pps in rates.items():
+                    packets = pps * (end - start)
+                    counters = self.counters[hop]
+                    counters[direction + '_packets'] += packets
+                    counters[direction + '_bytes'] += packets * job.size
+            for cookie, pps in punted.items():
+                self.packet_ins[cookie] += pps * (end - start)
+                if self.packet_in_times is None:
+                    self.packet_in_times = [start, end]
+                self.packet_in_times[1] = end
+
+    def peer(self, port):
+        """
+        Port cabled to port, they are paired from the lowest port on.
+        """
+        return port + 1 if (port - self.ports[0]) % 2 == 0 else port - 1
+
+    def lookup(self, in_port, fields=None):
+        """
+        Highest priority flow of table 0 matching a packet coming in on
+        in_port with the header fields.
+        """
+        fields = dict(fields or {}, in_port=in_port)
+        candidates = [flow for flow in self.flows.values()
+                      if flow.get('table_id', 0) == 0 and
+                      all(fields.get(key) == value
+                          for key, value in flow.get('match', {}).items())]
+        return max(candidates, key=lambda flow: flow.get('priority', 0),
+                   default=None)
+
+    def walk(self, port, pps, size, fields=None):
+        """
+        Follows packets sent out of a port through the flows, at most once
+        around the switch.  Every hop forwards at most port_pps(size).
+
+        :return: (tuple) tx and rx pps per port, packet in pps per cookie
+        and the number of hops through the switch
+        """
+        tx, rx = collections.Counter(), collections.Counter()
+        punted = collections.Counter()
+        capacity = self.port_pps(size)
+        hops = 0
+        while port in self.counters and hops < len(self.ports):
+            tx[port] += pps
+            port = self.peer(port)
+            if port not in self.counters:
+                break
+            rx[port] += pps
+            flow = self.lookup(port, fields) or {}
+            outputs = [action.get('port')
+                       for action in flow.get('actions', [])
+                       if action.get('type') == 'OUTPUT']
+            if not outputs:
+                break
+            hops += 1
+            pps = min(pps, capacity)
+            if outputs[0] == 'CONTROLLER':
+                punted[flow.get('cookie', 0)] += pps
+                break
+            port = outputs[0]
+        return tx, rx, punted, hops
+
+    def start_generator(self, job_id, ports, pps, size, burst=1,
+                        duration=None):
+        self.advance()
+        job = SimGeneratorJob(job_id, self.dpid, ports, pps, size,
+                              self.clock.now(), burst, duration)
+        self.jobs.append(job)
+        return job
+
+    def start_probes(self, session_id, port, count, interval, size):
+        self.advance()
+        _, _, punted, hops = self.walk(port, 1.0, size, PROBE_FIELDS)
+        rtts = [None] * count
+        if punted:
+            rtts = [(CONTROL_RTT + hops * HOP_LATENCY) *
+                    (1 + abs(self.rng.gauss(0, self.noise)))
+                    for _ in range(count)]
+        return SimProbeSession(session_id, self.dpid, port, count, interval,
+                               self.clock.now(), rtts)
+
+    def packet_in_stats(self):
+        self.advance()
+        total = int(sum(self.packet_ins.values()))
+        first, last = self.packet_in_times or (None, None)
+        rate = 0.0
+        if total > 1 and last > first:
+            rate = (total - 1) / (last - first)
+        return {'dpid': int(self.dpid),
+                'timestamp': self.clock.now(),
+                'total': total,
+                'cookies': {str(cookie): int(count)
+                            for cookie, count in self.packet_ins.items()},
+                'first': first,
+                'last': last,
+                'rate': rate}
+
+    def reset_packet_in_stats(self):
+        self.advance()
+        self.packet_ins.clear()
+        self.packet_in_times = None
+
+    def _sample(self, ports, pps):
+        jitter = 1 + self.rng.gauss(0, self.noise) if pps else 1
+        port_pps = pps * jitter
+        port_bps = port_pps * (self.packet_size or 0) * 8
+        rates = {port: {'rx_pps': port_pps, 'tx_pps': port_pps,
+                        'rx_bps': port_bps, 'tx_bps': port_bps}
+                 if port in ports else dict.fromkeys(TOTAL_FIELDS, 0.0)
+                 for port in self.counters}
+        self.history.append((self.last_update, rates))
+
+    def window(self, since, with_ports=True):
+        def series(rows):
+            result = {'timestamp': [ts for ts, _ in rows]}
+            for field in TOTAL_FIELDS:
+                result[field] = [values[field] for _, values in rows]
+            return result
+
+        samples = [(ts, rates) for ts, rates in self.history if ts > since]
+        totals = [(ts, {field: sum(r[field] for r in rates.values())
+                        for field in TOTAL_FIELDS})
+                  for ts, rates in samples]
+        result = {'dpid': int(self.dpid), 'total': series(totals)}
+        if with_ports:
+            result['ports'] = {port: series([(ts, rates[port])
+                                             for ts, rates in samples])
+                               for port in sorted(self.counters)}
+        return result
+
+    def saturate(self, pkt_size):
+        self.advance()
+        ports = self.active_ports()
+        self.packet_size = pkt_size
+        return {'dpid': int(self.dpid),
+                'saturated': bool(ports),
+                'packets_sent': len(ports),
+                'rounds': 1,
+                'time_to_saturation': 0.0,
+                'rates': {}}
+
+    @staticmethod
+    def _flow_key(flow):
+        return (flow.get('table_id', 0), flow.get('priority', 0),
+                json.dumps(flow.get('match', {}), sort_keys=True))
+
+    @staticmethod
+    def _cookie_matches(flow, spec):
+        mask = spec.get('cookie_mask', 0)
+        return (flow.get('cookie', 0) & mask) == (spec.get('cookie', 0) &
+                                                  mask)
+
+    def matching_flows(self, spec):
+        table_id = spec.get('table_id', OFPTT_ALL)
+        return [key for key, flow in self.flows.items()
+                if table_id in (OFPTT_ALL, flow.get('table_id', 0)) and
+                self._cookie_matches(flow, spec)]
+
+    def mod_flow(self, flow, command='add'):
+        """
+        Call advance() first, the rates change with the flows.
+
+        :return: (bool) False if the table is full
+        """
+        if command == 'add':
+            key = self._flow_key(flow)
+            if key not in self.flows and \
+                    len(self.flows) >= self.table_capacity:
+                return False
+            self.flows[key] = flow
+        elif command in ('modify', 'modify_strict'):
+            for key in self.matching_flows(flow):
+                self.flows[key] = dict(self.flows[key],
+                                       actions=flow.get('actions', []))
+        else:
+            for key in self.matching_flows(flow):
+                del self.flows[key]
+        return True
+
+    def clear(self):
+        self.advance()
+        self.flows.clear()
+        # the packets looping through the snake are gone with its flows
+        self.packet_size = None
+
+    def port_stats(self):
+        self.advance()
+        return [dict({'rx_packets': 0, 'tx_packets': 0, 'rx_bytes': 0,
+                      'tx_bytes': 0, 'rx_dropped': 0, 'tx_dropped': 0,
+                      'rx_errors': 0, 'tx_errors': 0},
+                     port_no=port,
+                     **{name: int(value) for name, value in counters.items()})
+                for port, counters in sorted(self.counters.items())]
+
+    def flow_stats(self):
+        self.advance()
+        return [dict({'cookie': 0, 'table_id': 0, 'priority': 0,
+                      'match': {}, 'packet_count': 0, 'byte_count': 0},
+                     **{key: flow[key] for key in ('cookie', 'table_id',
+                                                   'priority', 'match')
+                        if key in flow},
+                     actions=['%s:%s' % (action.get('type'),
+                                         action.get('port'))
+                              for action in flow.get('actions', [])])
+                for flow in self.flows.values()]
+
+    def aggregate(self, spec):
+        self.advance()
+        flows = self.matching_flows(dict({'cookie_mask': 0}, **spec))
+        return [{'flow_count': len(flows), 'packet_count': 0,
+                 'byte_count': 0}]
+
+
+class Simulator:
+
+    def __init__(self, switches, speed=1.0, **switch_args):
+        """
+        :param switches: (list) dicts with dpid and the snake ports as in
+        the environment of a scenario file
+        :param speed: (float) how much faster the simulated clock runs
+        :param switch_args: SimSwitch settings shared by all switches
+        """
+        self.clock = SimClock(speed)
+        self.lock = threading.Lock()
+        self.switches = {}
+        self.generator_jobs = {}
+        self.probe_sessions = {}
+        self.ids = itertools.count(1)
+        for i, sw in enumerate(switches):
+            dpid = str(sw['dpid'])
+            if not dpid.isdigit():
+                dpid = str(int(dpid.replace(':', ''), 16))
+            ends = [sw['snake_start_port'], sw['snake_end_port'],
+                    sw.get('ingress_port'), sw.get('egress_port')]
+            ends = [port for port in ends if port is not None]
+            ports = list(range(min(ends), max(ends) + 1))
+            self.switches[dpid] = SimSwitch(dpid, ports, self.clock, seed=i,
+                                            **switch_args)
+
+    def switch(self, dpid):
+        dpid = str(int(str(dpid), 0))
+        if dpid not in self.switches:
+            raise KeyError(dpid)
+        return self.switches[dpid]
+
+    def mod_entries(self, dpid, payload):
+        switch = self.switch(dpid)
+        flows = payload.get('flows', [])
+        groups = payload.get('groups', [])
+        command = payload.get('command', 'add')
+        send_time = self.clock.now()
+        switch.advance()
+        errors = []
+        for group in groups:
+            if command == 'delete':
+                switch.groups.pop(group.get('group_id'), None)
+            else:
+                switch.groups[group.get('group_id')] = group
+        for i, flow in enumerate(flows):
+            if not switch.mod_flow(flow, command):
+                errors.append({'xid': i, 'type': OFPET_FLOW_MOD_FAILED,
+                               'code': OFPFMFC_TABLE_FULL})
+        barrier_time = send_time + FLOW_MOD_TIME * (len(flows) + len(groups))
+        confirmed = payload.get('confirm_cookies') and switch.packet_size
+        return {'dpid': int(dpid),
+                'flows': len(flows),
+                'groups': len(groups),
+                'errors': len(errors),
+                'error_samples': errors[:10],
+                'send_time': send_time,
+                'barrier_time': barrier_time,
+                'barrier_latency': barrier_time - send_time,
+                'dataplane_time': barrier_time if confirmed else None}
+
+    def otsdb_query(self, query, start, end):
+        """
+        Sum of the rates over the switches of an OpenTSDB metric query,
+        e.g. sum:rate:oftester.port.packets{dpid=1,dpid=2}.
+        """
+        metric = re.match(r'[^:]*:(?:rate:)?([^{]+)', query).group(1)
+        dpids = re.findall(r'dpid=(\d+)', query)
+        field = 'tx_bps' if metric.endswith('bits') else 'tx_pps'
+        dps = collections.Counter()
+        for dpid in dpids or self.switches:
+            switch = self.switch(dpid)
+            switch.advance()
+            for ts, rates in switch.history:
+                wall = int(self.clock.to_wall(ts))
+                if start <= wall <= end:
+                    dps[wall] += sum(r[field] for r in rates.values())
+        return {'metric': metric, 'tags': {}, 'aggregateTags': ['dpid'],
+                'dps': {str(ts): value for ts, value in sorted(dps.items())}}
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes
+    disable_nagle_algorithm = True
+    routes = []
+
+    def log_message(self, fmt, *args):
+        logging.debug(fmt, *args)
+
+    def _send(self, status, body=b'', content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, parts.path)
+            if route_method == method and match:
+                try:
+                    payload = json.loads(body) if body else {}
+                    query = parse_qs(parts.query)
+                    with self.server.simulator.lock:
+                        result = handler(self.server.simulator, payload,
+                                         query, *match.groups())
+                except KeyError:
+                    return self._send(404)
+                except (TypeError, ValueError) as e:
+                    return self._send(400, str(e).encode(), 'text/plain')
+                if isinstance(result, tuple):
+                    return self._send(*result)
+                return self._send(200, result)
+        self._send(404)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+def route(method, pattern):
+    def wrapper(handler):
+        SimulatorHandler.routes.append((method, pattern, handler))
+        return handler
+    return wrapper
+
+
+@route('POST', r'/stats/flowentry/(add|modify|modify_strict|delete|'
+               r'delete_strict)')
+def flow_entry(sim, payload, query, command):
+    switch = sim.switch(payload['dpid'])
+    switch.advance()
+    if not switch.mod_flow(payload, command):
+        return 500, b'Table full', 'text/plain'
+    return {}
+
+
+@route('DELETE', r'/stats/flowentry/clear/(\w+)')
+def clear_flows(sim, payload, query, dpid):
+    sim.switch(dpid).clear()
+    return {}
+
+
+@route('POST', r'/stats/groupentry/(add|modify|delete)')
+def group_entry(sim, payload, query, command):
+    groups = sim.switch(payload['dpid']).groups
+    if command == 'delete':
+        groups.pop(payload.get('group_id'), None)
+    else:
+        groups[payload.get('group_id')] = payload
+    return {}
+
+
+@route('POST', r'/stats/portdesc/modify')
+def port_desc(sim, payload, query):
+    sim.switch(payload['dpid'])
+    return {}
+
+
+@route('POST', r'/stats/aggregateflow/(\w+)')
+def aggregate_flow(sim, payload, query, dpid):
+    return {dpid: sim.switch(dpid).aggregate(payload)}
+
+
+@route('GET', r'/stats/flow/(\w+)')
+def flow_stats(sim, payload, query, dpid):
+    return {dpid: sim.switch(dpid).flow_stats()}
+
+
+@route('GET', r'/stats/port/(\w+)')
+def port_stats(sim, payload, query, dpid):
+    return {dpid: sim.switch(dpid).port_stats()}
+
+
+@route('POST', r'/tpn/flows/(\w+)')
+def mod_entries(sim, payload, query, dpid):
+    return sim.mod_entries(dpid, payload)
+
+
+@route('POST', r'/tpn/packet_out/(\w+)')
+def packet_out(sim, payload, query, dpid):
+    sim.switch(dpid)
+    return {}
+
+
+@route('POST', r'/tpn/saturate/(\w+)')
+def saturate(sim, payload, query, dpid):
+    return sim.switch(dpid).saturate(payload['pkt_size'])
+
+
+@route('POST', r'/tpn/generator/(\w+)')
+def start_generator(sim, payload, query, dpid):
+    job = sim.switch(dpid).start_generator(
+        next(sim.ids), [int(port) for port in payload['ports']],
+        float(payload['pps']), int(payload['pkt_size']),
+        int(payload.get('burst') or 1), payload.get('duration'))
+    sim.generator_jobs[job.job_id] = job
+    return 201, job.status(sim.clock.now())
+
+
+@route('GET', r'/tpn/generator/job/(\d+)')
+def generator_status(sim, payload, query, job_id):
+    return sim.generator_jobs[int(job_id)].status(sim.clock.now())
+
+
+@route('DELETE', r'/tpn/generator/job/(\d+)')
+def stop_generator(sim, payload, query, job_id):
+    job = sim.generator_jobs[int(job_id)]
+    sim.switch(job.dpid).advance()
+    job.stop(sim.clock.now())
+    return job.status(sim.clock.now())
+
+
+@route('POST', r'/tpn/probe/(\w+)')
+def start_probes(sim, payload, query, dpid):
+    session = sim.switch(dpid).start_probes(
+        next(sim.ids), int(payload['port']), int(payload['count']),
+        float(payload['interval']), int(payload['pkt_size']))
+    sim.probe_sessions[session.session_id] = session
+    return 201, session.summary(sim.clock.now())
+
+
+@route('GET', r'/tpn/probe/session/(\d+)')
+def probe_results(sim, payload, query, session_id):
+    return sim.probe_sessions[int(session_id)].summary(sim.clock.now())
+
+
+@route('DELETE', r'/tpn/probe/session/(\d+)')
+def delete_probes(sim, payload, query, session_id):
+    return sim.probe_sessions.pop(int(session_id)).summary(sim.clock.now())
+
+
+@route('GET', r'/tpn/packet_in/(\w+)')
+def packet_in_stats(sim, payload, query, dpid):
+    return sim.switch(dpid).packet_in_stats()
+
+
+@route('DELETE', r'/tpn/packet_in/(\w+)')
+def reset_packet_in_stats(sim, payload, query, dpid):
+    sim.switch(dpid).reset_packet_in_stats()
+    return 204, b''
+
+
+@route('GET', r'/tpn/stats/(\w+)')
+def rates(sim, payload, query, dpid):
+    window = float(query.get('window', ['60s'])[0].rstrip('s'))
+    with_ports = query.get('ports', ['1'])[0] not in ('0', 'false')
+    switch = sim.switch(dpid)
+    switch.advance()
+    result = switch.window(sim.clock.now() - window, with_ports)
+    result['window'] = window
+    return result
+
+
+@route('POST', r'/tpn/stats/burst/(\w+)')
+def stats_burst(sim, payload, query, dpid):
+    sim.switch(dpid)
+    return []
+
+
+def _otsdb_range(query):
+    def parse(name):
+        value = datetime.strptime(query[name][0], OTSDB_TIME_FORMAT)
+        return calendar.timegm(value.timetuple())
+    return parse('start'), parse('end')
+
+
+@route('GET', r'/api/query')
+def otsdb_query(sim, payload, query):
+    start, end = _otsdb_range(query)
+    return [sim.otsdb_query(m, start, end) for m in query.get('m', [])]
+
+
+@route('GET', r'/q')
+def otsdb_graph(sim, payload, query):
+    return 200, PNG, 'image/png'
+
+
+def serve(simulator, host='127.0.0.1', port=8080):
+    server = ThreadingHTTPServer((host, port), SimulatorHandler)
+    server.daemon_threads = True
+    server.simulator = simulator
+    return server
+
+
+def _parsecmdline():
+    parser = argparse.ArgumentParser(
+        description='Serves the Ryu and OpenTSDB endpoints of oftester '
+                    'from a simulated snake')
+    parser.add_argument('scenario', help='scenario.yaml file to take the '
+                                         'switches from')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--speed', type=float, default=100.0,
+                        help='simulated seconds per wall clock second')
+    parser.add_argument('--line-rate', type=float, default=LINE_RATE,
+                        help='bits per second of every port')
+    parser.add_argument('--rule-penalty', type=float, default=RULE_PENALTY,
+                        help='relative slowdown per installed rule')
+    parser.add_argument('--table-capacity', type=int,
+                        default=TABLE_CAPACITY)
+    parser.add_argument('--noise', type=float, default=NOISE,
+                        help='relative standard deviation of the rates')
+    parser.add_argument('--throughput', action='append', default=[],
+                        metavar='SIZE=FRACTION',
+                        help='fraction of line rate forwarded at a packet '
+                             'size, interpolated in between, repeatable')
+    return parser.parse_args()
+
+
+def _throughput_curve(points):
+    curve = {}
+    for point in points:
+        size, fraction = point.split('=')
+        curve[int(size)] = float(fraction)
+    return curve
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = _parsecmdline()
+    with open(args.scenario) as f:
+        config = yaml.safe_load(f)
+    simulator = Simulator(config['environment']['switches'],
+                          speed=args.speed, line_rate=args.line_rate,
+                          throughput=_throughput_curve(args.throughput),
+                          rule_penalty=args.rule_penalty,
+                          table_capacity=args.table_capacity,
+                          noise=args.noise)
+    server = serve(simulator, args.host, args.port)
+    logging.info('Simulating %i switches on %s:%i at %gx',
+                 len(simulator.switches), args.host, args.port, args.speed)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
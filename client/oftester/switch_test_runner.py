@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 
 import argparse
+import asyncio
 import logging
-import time
 
 import yaml
 
+from oftester.async_engine import AsyncScenarioEngine
 from oftester.report import generator
+from oftester.run_store import RunStore
 from oftester.scenario import basic as basic
+from oftester.scenario import flow_insertion as flow_insertion
 from oftester.scenario import ingress_egress as ingress
+from oftester.scenario import lossless as lossless
 from oftester.scenario import loop as loop
 from oftester.scenario import multicast as multicast
+from oftester.scenario import packet_in as packet_in
 from oftester.scenario import transit as transit
 
 clazz_map = {
@@ -36,7 +41,11 @@ clazz_map = {
     'transit-vxlan': transit.TransitVxlanScenario,
     'connected-devices-vxlan': multicast.ConnectedDevicesVxlanScenario,
     'connected-devices-vlan': multicast.ConnectedDevicesVlanScenario,
-    'rtl': multicast.RtlScenario
+    'rtl': multicast.RtlScenario,
+    'latency': basic.LatencyScenario,
+    'packet-in': packet_in.PacketInScenario,
+    'flow-insertion': flow_insertion.FlowInsertionScenario,
+    'max-lossless-rate': lossless.MaxLosslessRateScenario
 }
 
 report_generator_map = {
@@ -69,33 +78,60 @@ def main(config=None):
             level=logging.INFO
         )
         config = get_args()
+    engine = config.pop('engine', 'sync')
+    run_dir = config.pop('run_dir', None)
+    resume = config.pop('resume', False)
+    if resume and not run_dir:
+        raise ValueError('Resuming needs a run directory')
+    store = RunStore(run_dir) if run_dir else None
     scenarios = get_scenarios(config)
     for scenario in scenarios:
         report_generator = get_report_generator(scenario)
         try:
-            while scenario.has_next_packet_size():
-                scenario.next_packet_size()
-                scenario.execute()
-                report_generator.collect_data()
-                time.sleep(10)
+            if engine == 'async':
+                asyncio.run(AsyncScenarioEngine(
+                    scenario, report_generator, store,
+                    resume).execute_all())
+            else:
+                while scenario.has_next_packet_size():
+                    scenario.next_packet_size()
+                    if resume and store.restore(scenario, report_generator):
+                        continue
+                    scenario.execute()
+                    report_generator.collect_data()
+                    if store:
+                        store.save(scenario, report_generator)
         except KeyboardInterrupt:
             pass
         except Exception as e:
             logging.exception(e)
         scenario.cleanup_switch()
         report_generator.report()
+        scenario.session.log_stats()
 
 
 def _parsecmdline():
     parser = argparse.ArgumentParser(argument_default=argparse.SUPPRESS)
     parser.add_argument('scenario', action='store', help='scenario.yaml file')
+    parser.add_argument('--engine', choices=['sync', 'async'],
+                        help='run scenarios on blocking calls or on an '
+                             'asyncio loop, overrides engine of the file')
+    parser.add_argument('--run-dir', dest='run_dir',
+                        help='directory to checkpoint every finished '
+                             'scenario and packet size to')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip what the run directory already has')
     return parser.parse_args()
 
 
 def get_args():
     args = _parsecmdline()
     with open(args.scenario) as f:
-        return yaml.safe_load(f)
+        config = yaml.safe_load(f)
+    for option in ('engine', 'run_dir', 'resume'):
+        if option in args:
+            config[option] = getattr(args, option)
+    return config
 
 
 if __name__ == '__main__':
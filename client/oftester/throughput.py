@@ -0,0 +1,45 @@
+"""
+Throughput search in the spirit of RFC 2544 section 26.1.
+"""
+
+
+def search_max_lossless_rate(trial, min_pps, max_pps, loss_threshold=0.0,
+                             precision=0.01, max_trials=20):
+    """
+    Binary search of the highest offered load with a loss of at most
+    loss_threshold.  The first trial runs at max_pps, the search stops once
+    the lowest failed and the highest passed rate are at most precision
+    apart relative to the failed one.  A trial flagged under_delivered did
+    not offer its rate and fails whatever its loss.
+
+    :param trial: callable taking the pps to offer, returns a dict with at
+    least 'loss' and optionally 'under_delivered'
+    :param min_pps: (float) lowest rate to try
+    :param max_pps: (float) highest rate to try
+    :param loss_threshold: (float) highest loss ratio that counts as lossless
+    :param precision: (float) relative resolution of the result
+    :param max_trials: (int) trials to give up after
+    :return: (tuple) highest passed pps or None if even min_pps failed, and
+    the list of trial results
+    """
+    trials = []
+
+    def passed(pps):
+        result = dict(trial(pps), pps=pps)
+        result['passed'] = result['loss'] <= loss_threshold and \
+            not result.get('under_delivered', False)
+        trials.append(result)
+        return result['passed']
+
+    if passed(max_pps):
+        return max_pps, trials
+    if not passed(min_pps):
+        return None, trials
+    low, high = min_pps, max_pps
+    while high - low > precision * high and len(trials) < max_trials:
+        pps = (low + high) / 2
+        if passed(pps):
+            low = pps
+        else:
+            high = pps
+    return low, trials
@@ -42,9 +42,15 @@ def validate(allowed_change, data, old_data=None):
 
 def get_data_values(data):
     d = data['dps']
-    items = list(data['timestamps'].items())
-    t = list(map(lambda x, y:
-                 (int(x[0]), int(y[0]), y[1]), items[:-1], items[1:]))
+    t = get_intervals(data['timestamps'])
+    # phases of every switch, the last one ends with the scenario
+    end = max(data['timestamps'], key=int, default=None)
+    for dpid, markers in data.get('markers', {}).items():
+        if end is not None:
+            markers = dict(markers)
+            markers[end] = data['timestamps'][end]
+        t += [(start, stop, '%s (%s)' % (key, dpid))
+              for start, stop, key in get_intervals(markers)]
 
     timestamps = list(d.keys())
     values = dict()
@@ -54,6 +60,12 @@ def get_data_values(data):
     return values
 
 
+def get_intervals(timestamps):
+    items = sorted(timestamps.items(), key=lambda item: int(item[0]))
+    return list(map(lambda x, y:
+                    (int(x[0]), int(y[0]), y[1]), items[:-1], items[1:]))
+
+
 def process(packet_size, metric, allowed_change, data, old_data=None):
     for scenario, values in data.items():
         old_values = None
@@ -9,6 +9,7 @@ setup(
     entry_points={
         'console_scripts': [
             'oftester = oftester.switch_test_runner:main',
+            'oftester-sim = oftester.simulator:main',
         ],
     },
     install_requires=[
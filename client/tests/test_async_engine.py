@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock
+
+import oftester.scenario.model as model
+from oftester.async_engine import AsyncScenarioEngine
+
+
+class CleanupScenario(model.Scenario):
+
+    def __init__(self, *args, **kwargs):
+        super(CleanupScenario, self).__init__(*args, **kwargs)
+        self.cleaned = []
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def cleanup_switch(self, dpid=None):
+        # both switches have to be cleaned up at the same time to get past
+        self.barrier.wait()
+        self.cleaned.append(dpid)
+
+    def run_switch(self, sw):
+        if sw.dpid == '2':
+            raise ValueError('broken switch')
+
+
+class OverlapScenario(model.Scenario):
+    """
+    Every call blocks until a second one is in flight, so the calls only
+    get through if they overlap.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(OverlapScenario, self).__init__(*args, **kwargs)
+        self.barrier = threading.Barrier(2, timeout=5)
+        self.calls = []
+
+    def overlap(self, *args):
+        self.barrier.wait()
+        self.calls.append(args)
+
+    def add_flow(self, flowmod):
+        self.overlap('add_flow', flowmod['dpid'])
+
+    def send_packet_out(self, dpid, port, **kwargs):
+        self.overlap('send_packet_out', dpid, port)
+
+    def cleanup_switch(self, dpid=None):
+        self.overlap('cleanup_switch', dpid)
+
+    def saturate_switch(self, dpid, port, size, **kwargs):
+        self.overlap('saturate_switch', dpid, size)
+        return {'saturated': True}
+
+
+class RecordingScenario(model.Scenario):
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingScenario, self).__init__(*args, **kwargs)
+        self.steps = []
+
+    def reset_switch(self, dpid):
+        self.steps.append('reset_switch')
+
+    def snapshot_ports(self, dpid):
+        self.steps.append('snapshot_ports')
+
+    def check_conservation(self, dpid):
+        self.steps.append('check_conservation')
+
+    def start_drain(self, dpid):
+        self.steps.append('start_drain')
+
+    def finish_drain(self, dpid):
+        self.steps.append('finish_drain')
+
+    def run_switch(self, sw):
+        self.steps.append('run')
+
+    def wait_for_steady_state(self, phase, *args, **kwargs):
+        self.steps.append(phase)
+
+
+class TestAsyncScenarioEngine(unittest.TestCase):
+
+    def setUp(self):
+        switch = {
+            'snake_start_port': 5,
+            'snake_end_port': 28,
+            'ingress_port': 3,
+            'egress_port': 4
+        }
+        self.environment = {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': [dict(switch, dpid='1'), dict(switch, dpid='2')]
+        }
+
+    def test_execute_all(self):
+        scenario = CleanupScenario('test', self.environment,
+                                   packet_sizes=[100, 200],
+                                   adaptive_waits=False, settle_time=0,
+                                   collection_interval=0)
+        report_generator = Mock()
+        engine = AsyncScenarioEngine(scenario, report_generator)
+
+        asyncio.run(engine.execute_all())
+
+        self.assertEqual(sorted(scenario.cleaned), ['1'] * 4 + ['2'] * 4)
+        self.assertEqual(report_generator.collect_data.call_count, 2)
+        for metrics in scenario.time_metrics:
+            self.assertEqual(metrics.errors, {'2': 'broken switch'})
+            self.assertLessEqual(metrics.start, metrics.stop)
+
+    def test_async_variants_overlap(self):
+        scenario = OverlapScenario('test', self.environment,
+                                   flow_pipeline_depth=2)
+        engine = AsyncScenarioEngine(scenario)
+        engine.wait_for_steady_state = Mock(side_effect=lambda *args, **kw:
+                                            asyncio.sleep(0))
+
+        async def run():
+            await engine.add_flows([{'dpid': '1'}, {'dpid': '2'}])
+            await engine.send_packet_outs([{'dpid': '1', 'port': 5},
+                                           {'dpid': '2', 'port': 5}])
+            await engine.cleanup_switch()
+            return await engine.bring_switches_full_load({
+                '1': {'port': -1, 'size': 100},
+                '2': {'port': -1, 'size': 100}})
+
+        results = asyncio.run(run())
+
+        self.assertEqual(sorted(scenario.calls), [
+            ('add_flow', '1'), ('add_flow', '2'),
+            ('cleanup_switch', '1'), ('cleanup_switch', '2'),
+            ('saturate_switch', '1', 100), ('saturate_switch', '2', 100),
+            ('send_packet_out', '1', 5), ('send_packet_out', '2', 5)])
+        self.assertEqual(results, {'1': {'saturated': True},
+                                   '2': {'saturated': True}})
+        # one peak load wait for both switches
+        engine.wait_for_steady_state.assert_called_once_with(
+            'peak_load', scenario.min_sleep_after_peak_load,
+            scenario.sleep_after_peak_load, dpids=['1', '2'])
+
+    def test_add_flows_limit(self):
+        scenario = OverlapScenario('test', self.environment,
+                                   flow_pipeline_depth=1)
+        scenario.barrier = threading.Barrier(2, timeout=0.1)
+        engine = AsyncScenarioEngine(scenario)
+
+        with self.assertRaises(threading.BrokenBarrierError):
+            asyncio.run(engine.add_flows([{'dpid': '1'}, {'dpid': '2'}]))
+
+    def test_engines_run_the_same_phases(self):
+        environment = dict(self.environment,
+                           switches=self.environment['switches'][:1])
+        sync = RecordingScenario('test', environment, settle_time=0,
+                                 collection_interval=0)
+        sync.next_packet_size()
+        sync.execute()
+
+        scenario = RecordingScenario('test', environment, settle_time=0,
+                                     collection_interval=0)
+        scenario.next_packet_size()
+        engine = AsyncScenarioEngine(scenario, Mock())
+        engine.report_generator.collect_data.side_effect = \
+            lambda: scenario.steps.append('collect_data')
+
+        async def wait_for_steady_state(phase, *args):
+            scenario.steps.append(phase)
+
+        engine.wait_for_steady_state = wait_for_steady_state
+        asyncio.run(engine.execute())
+
+        self.assertEqual(sync.steps, [
+            'reset_switch', 'run', 'settle', 'snapshot_ports', 'collection',
+            'check_conservation', 'start_drain', 'drain', 'finish_drain'])
+        # the report data is only collected once the traffic has drained
+        self.assertEqual(scenario.steps, sync.steps + ['collect_data'])
+        engine.report_generator.collect_data.assert_called_once_with()
+        self.assertLessEqual(scenario.time_metrics[-1].start,
+                             scenario.time_metrics[-1].stop)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import oftester.openflow.basic_flows as basic_flows
 import oftester.openflow.noviflow_flows as novi
 import base64
 import socket
@@ -59,3 +60,12 @@ def test_action_payload_vxlan_pop():
     action = novi.action_payload_vxlan_pop()
     s = base64.b64decode(action)
     assert s.hex() == 'ff00000300000000'
+
+
+def test_flow_scale():
+    flows = basic_flows.flow_scale('1', 65535, 3, table_id=2)
+    assert not isinstance(flows, list)
+    flows = list(flows)
+    assert [f['match']['ipv4_dst'] for f in flows] == \
+        ['10.0.255.255', '10.1.0.0', '10.1.0.1']
+    assert all(f['table_id'] == 2 and f['actions'] == [] for f in flows)
@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import Mock
+
+import oftester.scenario.model as model
+from oftester.conservation import analyze, flow_for_port, hop_name, \
+    snake_hops
+from oftester.constants import COOKIE_SNAKE, COOKIE_VLAN
+from oftester.report.generator import PlotlyReportGenerator
+
+
+def counters(start_port, end_port, packets, dropped_at=None, dropped=0):
+    """
+    Port counters of packets injected into the first port of the snake
+    once, with the hop named dropped_at losing dropped of them.
+    """
+    stats = {port: {} for port in range(start_port, end_port + 1)}
+    passing = packets
+    for hop in snake_hops(start_port, end_port):
+        if hop['direction'] != 'forward':
+            break
+        rx, tx = ('rx_packets', 'tx_packets') if hop['kind'] == 'rule' \
+            else ('tx_packets', 'rx_packets')
+        stats[hop['src']].setdefault(rx, passing)
+        if hop_name(hop) == dropped_at:
+            passing -= dropped
+        stats[hop['dst']].setdefault(tx, passing)
+    return {port: dict({'rx_packets': 0, 'tx_packets': 0}, **counters)
+            for port, counters in stats.items()}
+
+
+class TestConservation(unittest.TestCase):
+
+    def test_snake_order(self):
+        names = [hop_name(hop) for hop in snake_hops(5, 12)]
+        self.assertEqual(names[:8], [
+            'link 5->6', 'rule 6->7', 'link 7->8', 'rule 8->9',
+            'link 9->10', 'rule 10->11', 'link 11->12', 'rule 12->5'])
+        self.assertEqual(names[8:], [
+            'rule 5->12', 'link 12->11', 'rule 11->10', 'link 10->9',
+            'rule 9->8', 'link 8->7', 'rule 7->6', 'link 6->5'])
+
+    def test_flow_for_port(self):
+        flows = [{'cookie': COOKIE_SNAKE, 'priority': 1000, 'table_id': 0,
+                  'match': {'in_port': 8}},
+                 {'cookie': COOKIE_VLAN, 'priority': 2000, 'table_id': 0,
+                  'match': {'in_port': 8, 'vlan_vid': 4096}},
+                 {'cookie': 1, 'priority': 3000, 'table_id': 1,
+                  'match': {}}]
+        self.assertEqual(flow_for_port(flows, 8)['cookie'], COOKIE_VLAN)
+        self.assertEqual(flow_for_port(flows, 6), None)
+
+    def test_lossless_snake(self):
+        before = counters(5, 12, 0)
+        after = counters(5, 12, 1000)
+        result = analyze(5, 12, before, after, 10)
+        self.assertEqual(result['drops'], [])
+        self.assertIsNone(result['worst'])
+        self.assertEqual(len(result['hops']), 16)
+        self.assertEqual(result['hops'][0]['in_pps'], 100)
+
+    def test_finds_dropping_rule(self):
+        before = counters(5, 12, 0)
+        after = counters(5, 12, 10000, 'rule 8->9', 3000)
+        # a small link loss stays under the tolerance
+        after[12]['rx_packets'] -= 1
+        flows = [{'cookie': COOKIE_SNAKE, 'priority': 1000, 'table_id': 0,
+                  'match': {'in_port': port}} for port in range(5, 13)]
+        flows.append({'cookie': COOKIE_VLAN, 'priority': 2000,
+                      'table_id': 0, 'match': {'in_port': 8}})
+
+        result = analyze(5, 12, before, after, 10, flows)
+
+        self.assertEqual(result['drops'], ['rule 8->9'])
+        self.assertEqual(result['worst'], 'rule 8->9')
+        hop = result['hops'][3]
+        self.assertEqual(hop['cookie'], COOKIE_VLAN)
+        self.assertEqual(hop['lost'], 3000)
+        self.assertEqual(hop['lost_pps'], 300)
+        self.assertAlmostEqual(hop['loss'], 0.3)
+        self.assertEqual(result['hops'][1]['cookie'], COOKIE_SNAKE)
+
+        fig = PlotlyReportGenerator.make_conservation_figure(
+            1500, {'1': result})
+        table, bars = fig.data
+        self.assertEqual(list(table.cells.values[1]), ['rule 8->9'])
+        self.assertEqual(list(table.cells.values[2]), [str(COOKIE_VLAN)])
+        self.assertEqual(bars.y[3], 300)
+
+    def test_only_switches_with_snake(self):
+        scenario = model.Scenario('test', {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': [{'dpid': '1', 'snake_start_port': 5,
+                          'snake_end_port': 12, 'ingress_port': 3,
+                          'egress_port': 4}]
+        })
+        scenario.next_packet_size()
+        scenario.port_stats = Mock(side_effect=[counters(5, 12, 0),
+                                                counters(5, 12, 1000)])
+        scenario.flow_stats = Mock(return_value=[])
+
+        scenario.snapshot_ports('1')
+        scenario.check_conservation('1')
+        scenario.port_stats.assert_not_called()
+        self.assertEqual(scenario.time_metrics[-1].conservation, {})
+
+        scenario.cookies['1'].add((0, COOKIE_SNAKE))
+        scenario.snapshot_ports('1')
+        scenario.check_conservation('1')
+        self.assertEqual(
+            scenario.time_metrics[-1].conservation['1']['drops'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
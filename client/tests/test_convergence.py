@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+
+from oftester.convergence import ConvergenceDetector, \
+    async_wait_for_convergence, coefficient_of_variation, \
+    relative_confidence, wait_for_convergence
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestConvergence(unittest.TestCase):
+
+    def test_coefficient_of_variation(self):
+        self.assertEqual(coefficient_of_variation([5, 5, 5]), 0.0)
+        self.assertEqual(coefficient_of_variation([0, 0, 0]), 0.0)
+        self.assertAlmostEqual(coefficient_of_variation([9, 11]),
+                               2 ** 0.5 / 10)
+        self.assertAlmostEqual(relative_confidence([9, 11]),
+                               1.96 * 0.1)
+
+    def test_detector_needs_full_window(self):
+        detector = ConvergenceDetector(window=3, threshold=0.05)
+        detector.add([(1, 100), (2, 101)])
+        self.assertIsNone(detector.cv)
+        self.assertFalse(detector.converged())
+        detector.add([(1, 100), (2, 101), (3, 99)])
+        self.assertTrue(detector.converged())
+        self.assertEqual(detector.summary()['samples'], 3)
+
+    def test_detector_skips_old_samples(self):
+        detector = ConvergenceDetector(window=2, threshold=0.05)
+        detector.skip([(1, 5), (2, 500)])
+        detector.add([(1, 5), (2, 500), (3, 100), (4, 100)])
+        self.assertEqual(list(detector.samples), [100, 100])
+
+    def test_wait_ends_once_converged(self):
+        clock = FakeClock()
+        rates = [1000, 500, 100, 100, 100, 100]
+
+        def sample(key):
+            ts = int(clock.now)
+            return [(t, rates[min(t, len(rates) - 1)])
+                    for t in range(ts + 1)]
+
+        converged, seconds = wait_for_convergence(
+            sample, {'1': ConvergenceDetector(window=3)}, 0, 60,
+            clock=clock, sleep=clock.sleep)
+        self.assertTrue(converged)
+        self.assertEqual(seconds, 4)
+
+    def test_wait_respects_min_and_max(self):
+        clock = FakeClock()
+
+        def steady(key):
+            return [(clock.now, 100)]
+
+        self.assertEqual(wait_for_convergence(
+            steady, {'1': ConvergenceDetector(window=2)}, 10, 60,
+            clock=clock, sleep=clock.sleep), (True, 10))
+
+        clock.now = 0
+
+        def noisy(key):
+            return [(clock.now, 100 if clock.now % 2 else 200)]
+
+        self.assertEqual(wait_for_convergence(
+            noisy, {'1': ConvergenceDetector(window=2)}, 0, 5,
+            clock=clock, sleep=clock.sleep), (False, 5))
+
+    def test_async_wait_samples_all_keys(self):
+        clock = FakeClock()
+        sampled = []
+
+        async def sample(key):
+            sampled.append(key)
+            return [(clock.now, 100)]
+
+        async def sleep(seconds):
+            clock.sleep(seconds)
+
+        detectors = {'1': ConvergenceDetector(window=2),
+                     '2': ConvergenceDetector(window=2)}
+        result = asyncio.run(async_wait_for_convergence(
+            sample, detectors, 0, 60, clock=clock, sleep=sleep))
+        self.assertEqual(result, (True, 2))
+        self.assertEqual(sampled, ['1', '2'] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
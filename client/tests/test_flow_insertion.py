@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import Mock
+
+from oftester.scenario.flow_insertion import FlowInsertionScenario
+
+
+class TestFlowInsertion(unittest.TestCase):
+
+    def setUp(self):
+        self.scenario = FlowInsertionScenario('flow-insertion', {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': [{
+                'dpid': '1',
+                'snake_start_port': 5,
+                'snake_end_port': 12,
+                'ingress_port': 3,
+                'egress_port': 4
+            }]
+        }, packet_sizes=[100], options={'flow-insertion': {
+            'batches': [1000, 2000, 4000]}})
+        self.scenario.next_packet_size()
+
+    def test_rate_from_controller_timings(self):
+        scenario = self.scenario
+        # the table holds 2500 flows, a batch takes 1 ms per flow
+        table = {'flows': 0}
+
+        def add_flows(dpid, flowmods, phase=None):
+            count = len(list(flowmods))
+            table['flows'] = min(table['flows'] + count, 2500)
+            results = [{'send_time': 100.0,
+                        'barrier_time': 100.0 + count / 1000,
+                        'errors': 0, 'error_samples': []},
+                       {'send_time': 100.5, 'barrier_time': 101.0,
+                        'errors': 0, 'error_samples': []}]
+            scenario.record_phase(dpid, phase, results)
+            return results
+
+        scenario.add_flows = Mock(side_effect=add_flows)
+        scenario.flow_count = Mock(side_effect=lambda *args: table['flows'])
+
+        scenario.run_switch(scenario.environment.sw_by_dpid('1'))
+
+        results = scenario.time_metrics[-1].flow_insertion['1']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['seconds'], 1.0)
+        self.assertEqual(results[0]['rate'], 1000.0)
+        self.assertEqual(results[1]['seconds'], 2.0)
+        self.assertEqual(results[1]['rate'], 750.0)
+        self.assertTrue(results[1]['failed'])
+        self.assertIn('batch-2', scenario.time_metrics[-1].phases['1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+from oftester.http_client import HttpClient
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = HttpClient(connect_timeout=1, read_timeout=2)
+        self.session = Mock()
+        self.client.sessions['ryu:8080'] = self.session
+
+    def test_endpoint(self):
+        self.assertEqual(HttpClient.endpoint('http://ryu:8080/tpn/flows/1'),
+                         'ryu:8080/tpn/flows')
+        self.assertEqual(HttpClient.endpoint('http://otsdb:4242/q?x=1'),
+                         'otsdb:4242/q')
+
+    def test_request_uses_timeouts_and_counts(self):
+        self.session.request.return_value = Mock(status_code=200)
+        self.client.get('http://ryu:8080/stats/port/1')
+        self.client.post('http://ryu:8080/tpn/saturate/1', json={},
+                         timeout=(1, None))
+        self.session.request.return_value = Mock(status_code=500)
+        self.client.get('http://ryu:8080/stats/port/2')
+
+        self.session.request.assert_any_call(
+            'GET', 'http://ryu:8080/stats/port/1', timeout=(1, 2))
+        self.session.request.assert_any_call(
+            'POST', 'http://ryu:8080/tpn/saturate/1', json={},
+            timeout=(1, None))
+        summary = self.client.summary()
+        self.assertEqual(summary['GET ryu:8080/stats/port']['requests'], 2)
+        self.assertEqual(summary['GET ryu:8080/stats/port']['errors'], 1)
+        self.assertEqual(summary['POST ryu:8080/tpn/saturate']['errors'], 0)
+
+    def test_exceptions_count_as_errors(self):
+        self.session.request.side_effect = requests.ConnectionError()
+        with self.assertRaises(requests.ConnectionError):
+            self.client.delete('http://ryu:8080/tpn/probe/session/1')
+        self.assertEqual(
+            self.client.summary()['DELETE ryu:8080/tpn/probe']['errors'], 1)
+
+    def test_session_per_endpoint(self):
+        client = HttpClient()
+        first = client._session('ryu:8080')
+        self.assertIs(client._session('ryu:8080'), first)
+        self.assertIsNot(client._session('otsdb:4242'), first)
+        client.close()
+        self.assertEqual(client.sessions, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+from unittest.mock import Mock, patch
+
+import oftester.scenario.model as model
+from oftester.constants import COOKIE_DRAIN, COOKIE_SNAKE_SINK
+from oftester.scenario.lossless import MaxLosslessRateScenario
+from oftester.scenario.model import STEP_SWITCHES
+from oftester.throughput import search_max_lossless_rate
+
+
+def capacity_trial(capacity):
+    def trial(pps):
+        lost = max(pps - capacity, 0)
+        return {'loss': lost / pps}
+    return trial
+
+
+class TestLossless(unittest.TestCase):
+
+    def setUp(self):
+        self.environment = {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': [{
+                'dpid': '1',
+                'snake_start_port': 5,
+                'snake_end_port': 12,
+                'ingress_port': 3,
+                'egress_port': 4
+            }]
+        }
+
+    def scenario(self, generator_pps=None):
+        """
+        Scenario on a switch forwarding at most 2500 pps with a generator
+        sending at most generator_pps.
+        """
+        scenario = MaxLosslessRateScenario(
+            'max-lossless-rate', self.environment, packet_sizes=[100],
+            options={'max-lossless-rate': {'min_pps': 1000,
+                                           'max_pps': 4000,
+                                           'trial_duration': 1}})
+        scenario.next_packet_size()
+        scenario.add_flows = Mock()
+        scenario.add_flow = Mock(side_effect=lambda flowmod: list(
+            scenario._track(flowmod['dpid'], [flowmod])))
+        scenario._post_entries = Mock()
+        counters = {5: 0, 12: 0}
+        scenario.offered = []
+
+        def start_generator(dpid, ports, pps, size, duration):
+            scenario.offered.append(pps)
+            sent = min(pps, generator_pps or pps)
+            counters[5] += sent * duration
+            counters[12] += min(sent, 2500) * duration
+            return {'job_id': len(scenario.offered)}
+
+        scenario.start_generator = Mock(side_effect=start_generator)
+        scenario.generator_status = Mock(return_value={
+            'sent': 0, 'achieved_pps': 0})
+        scenario.port_stats = Mock(side_effect=lambda dpid: {
+            5: {'tx_packets': counters[5], 'rx_packets': 0},
+            12: {'tx_packets': 0, 'rx_packets': counters[12]}})
+        return scenario
+
+    def test_search_converges_to_capacity(self):
+        pps, trials = search_max_lossless_rate(capacity_trial(4321), 100,
+                                               10000, precision=0.001)
+        self.assertLessEqual(pps, 4321)
+        self.assertGreater(pps, 4321 * 0.999)
+        self.assertEqual(trials[0]['pps'], 10000)
+        self.assertEqual(trials[1]['pps'], 100)
+        self.assertTrue(all(t['passed'] == (t['pps'] <= 4321)
+                            for t in trials))
+
+    def test_search_bounds(self):
+        self.assertEqual(search_max_lossless_rate(capacity_trial(10 ** 6),
+                                                  100, 10000)[0], 10000)
+        pps, trials = search_max_lossless_rate(capacity_trial(10), 100,
+                                               10000)
+        self.assertIsNone(pps)
+        self.assertEqual(len(trials), 2)
+
+    def test_search_loss_threshold_and_max_trials(self):
+        pps, trials = search_max_lossless_rate(capacity_trial(5000), 100,
+                                               10000, loss_threshold=0.5)
+        self.assertEqual(pps, 10000)
+        pps, trials = search_max_lossless_rate(capacity_trial(5000), 100,
+                                               10000, precision=0,
+                                               max_trials=5)
+        self.assertEqual(len(trials), 5)
+
+    def test_search_fails_under_delivered_trials(self):
+        def trial(pps):
+            return {'loss': 0.0, 'under_delivered': pps > 3000}
+
+        pps, trials = search_max_lossless_rate(trial, 1000, 10000)
+        self.assertLessEqual(pps, 3000)
+        self.assertFalse(trials[0]['passed'])
+
+    @patch('oftester.scenario.model.time.sleep')
+    def test_trials_use_port_counters(self, sleep):
+        scenario = self.scenario()
+        self.assertIn((STEP_SWITCHES, scenario.search_lossless_rate),
+                      scenario.phases())
+
+        scenario.run_switch(scenario.environment.sw_by_dpid('1'))
+        scenario.search_lossless_rate('1')
+
+        sink, drain = [c[0][0] for c in scenario.add_flow.call_args_list]
+        self.assertEqual(sink['match'], {'in_port': 12})
+        self.assertEqual(sink['actions'], [])
+        # the snake is drained both ways and the drain removed again
+        self.assertEqual((drain['match'], drain['cookie']),
+                         ({}, COOKIE_DRAIN))
+        deleted = scenario._post_entries.call_args[0]
+        self.assertEqual(deleted[1][0]['cookie'], COOKIE_DRAIN)
+        self.assertEqual(deleted[3], 'delete')
+        self.assertNotIn((0, COOKIE_DRAIN), scenario.cookies['1'])
+        self.assertIn((0, COOKIE_SNAKE_SINK), scenario.cookies['1'])
+        result = scenario.time_metrics[-1].lossless_rate['1']
+        self.assertEqual(scenario.offered[:3], [4000, 1000, 2500])
+        self.assertEqual(result['max_lossless_pps'], result['target_pps'])
+        self.assertGreater(result['max_lossless_pps'], 2500 * 0.99)
+        self.assertEqual(result['hops'], 4)
+        self.assertEqual(result['trials'][0]['lost'], 1500)
+
+    @patch('oftester.scenario.model.time.sleep')
+    def test_under_delivering_generator(self, sleep):
+        # the switch would forward 2500 pps but only 2000 are offered
+        scenario = self.scenario(generator_pps=2000)
+
+        scenario.search_lossless_rate('1')
+
+        result = scenario.time_metrics[-1].lossless_rate['1']
+        for trial in result['trials']:
+            self.assertEqual(trial['under_delivered'], trial['pps'] > 2020)
+            self.assertEqual(trial['passed'], trial['pps'] <= 2020)
+        self.assertLessEqual(result['max_lossless_pps'], 2000)
+        self.assertEqual(result['max_lossless_pps'], max(
+            t['offered_pps'] for t in result['trials'] if t['passed']))
+
+    @patch('oftester.scenario.model.time.sleep')
+    def test_failing_switches(self, sleep):
+        scenario = self.scenario()
+        scenario.time_metrics[-1].errors['2'] = 'broken switch'
+        scenario.search_lossless_rate('2')
+        scenario.start_generator.side_effect = ValueError('no generator')
+
+        scenario.search_lossless_rate('1')
+
+        self.assertEqual(scenario.time_metrics[-1].errors,
+                         {'1': 'no generator', '2': 'broken switch'})
+        self.assertEqual(scenario.time_metrics[-1].lossless_rate, {})
+
+    def test_search_option_of_other_scenarios(self):
+        scenario = model.Scenario('vlan', self.environment, options={
+            'vlan': {'search': 'lossless'}})
+        steps = scenario.phases()
+        self.assertIn((STEP_SWITCHES, scenario.search_lossless_rate), steps)
+        self.assertNotIn((STEP_SWITCHES, scenario.check_conservation),
+                         steps)
+        self.assertNotIn((STEP_SWITCHES, scenario.search_lossless_rate),
+                         model.Scenario('vlan', self.environment).phases())
+
+
+if __name__ == '__main__':
+    unittest.main()
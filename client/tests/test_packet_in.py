@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from oftester.constants import COOKIE_PACKET_IN
+from oftester.report.generator import PlotlyReportGenerator
+from oftester.scenario.model import STEP_WAIT
+from oftester.scenario.packet_in import PacketInScenario
+
+
+class TestPacketIn(unittest.TestCase):
+
+    def setUp(self):
+        self.scenario = PacketInScenario('packet-in', {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': [{
+                'dpid': '1',
+                'snake_start_port': 5,
+                'snake_end_port': 12,
+                'ingress_port': 3,
+                'egress_port': 4
+            }]
+        }, packet_sizes=[100], options={'packet-in': {'punt_ports': 2,
+                                                      'duration': 1}})
+        self.scenario.next_packet_size()
+
+    def test_no_collection(self):
+        self.assertEqual([step for step in self.scenario.phases()
+                          if step[0] == STEP_WAIT],
+                         [(STEP_WAIT, 'drain', 0, self.scenario.settle_time)])
+
+    @patch('oftester.scenario.packet_in.time.sleep')
+    def test_only_punted_packet_ins_count(self, sleep):
+        scenario = self.scenario
+        scenario.add_flow = Mock()
+        scenario.reset_packet_in_stats = Mock()
+        scenario.start_generator = Mock(return_value={'job_id': 1})
+        scenario.generator_status = Mock(return_value={'sent': 2000})
+        scenario.port_stats = Mock(side_effect=[
+            {6: {'rx_packets': 0}, 8: {'rx_packets': 0}},
+            {6: {'rx_packets': 1000}, 8: {'rx_packets': 1000}}])
+        # LLDP packet ins of another flow hide no loss
+        scenario.packet_in_stats = Mock(return_value={
+            'total': 2000, 'rate': 1900.0,
+            'cookies': {str(COOKIE_PACKET_IN): 1900, '0': 100}})
+
+        scenario.run_switch(scenario.environment.sw_by_dpid('1'))
+
+        self.assertEqual([args[0]['match'] for args, _ in
+                          scenario.add_flow.call_args_list],
+                         [{'in_port': 6}, {'in_port': 8}])
+        result = scenario.time_metrics[-1].packet_in['1']
+        self.assertEqual(result['packet_ins'], 1900)
+        self.assertEqual(result['lost'], 100)
+        self.assertAlmostEqual(result['loss'], 0.05)
+
+        fig = PlotlyReportGenerator.make_packet_in_figure(
+            {100: scenario.time_metrics[-1].packet_in})
+        table, rate = fig.data
+        self.assertEqual(list(table.cells.values[2]), ['6, 8'])
+        self.assertEqual(list(table.cells.values[7]), ['5.00%'])
+        self.assertEqual(list(rate.y), [1900.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,6 @@ import unittest
 from datetime import datetime
 from unittest.mock import Mock, mock_open, call, patch, PropertyMock
 
-import requests
 from plotly.graph_objs import Scatter
 
 import oftester.report.generator as generator
@@ -36,7 +35,7 @@ class TestReportGenerator(unittest.TestCase):
         report_generator = generator.OtsdbReportGenerator(scenario)
         get_attrs = {'status_code': 200,
                      'iter_content.return_value': [1]}
-        requests.get = Mock(return_value=Mock(**get_attrs))
+        scenario.session.get.return_value = Mock(**get_attrs)
         m_open = mock_open()
 
         # when
@@ -47,7 +46,7 @@ class TestReportGenerator(unittest.TestCase):
         scenario.assert_has_calls([call.get_current_packet_size_idx(),
                                    call.get_current_packet_size_idx()])
 
-        requests.get.assert_called_once()
+        scenario.session.get.assert_called_once()
         m_open.assert_has_calls([call('./reports/test_0.png', 'wb'),
                                  call().__enter__(),
                                  call().write(1),
@@ -89,7 +88,7 @@ class TestReportGenerator(unittest.TestCase):
         report_generator = generator.PlotlyReportGenerator(scenario)
         get_attrs = {'status_code': 200,
                      'json.return_value': [{'test': 'test'}]}
-        requests.get = Mock(return_value=Mock(**get_attrs))
+        scenario.session.get.return_value = Mock(**get_attrs)
 
         # when
         report_generator.collect_data()
@@ -97,7 +96,7 @@ class TestReportGenerator(unittest.TestCase):
         # then
         scenario.assert_has_calls([call.get_current_packet_size_idx(),
                                    call.current_packet_size()])
-        requests.get.assert_called_once()
+        scenario.session.get.assert_called_once()
 
         self.assertEqual(report_generator.collected_data,
                          {9000: [{'test': 'test', 'timestamps': {}}]})
@@ -165,7 +164,7 @@ class TestReportGenerator(unittest.TestCase):
         report_generator = generator.PlotlyAggregatedReportGenerator(scenario)
         get_attrs = {'status_code': 200,
                      'json.return_value': [{'test': 'test'}]}
-        requests.get = Mock(return_value=Mock(**get_attrs))
+        scenario.session.get.return_value = Mock(**get_attrs)
 
         # when
         report_generator.collect_data()
@@ -173,7 +172,7 @@ class TestReportGenerator(unittest.TestCase):
         # then
         scenario.assert_has_calls([call.get_current_packet_size_idx(),
                                    call.current_packet_size()])
-        requests.get.assert_called_once()
+        scenario.session.get.assert_called_once()
 
         self.assertEqual(report_generator.collected_data,
                          {9000: [{'test': 'test', 'timestamps': {}}]})
@@ -235,6 +234,23 @@ class TestReportGenerator(unittest.TestCase):
              call.stream(name='test', figures=['test', 'test']),
              call.stream().dump('./reports/test-plotly-aggr.html')])
 
+    def test_latency_figure(self):
+        summary = {'received': 99, 'sent': 100, 'rtt_min': 0.001,
+                   'rtt_avg': 0.002, 'rtt_p50': 0.002, 'rtt_p99': 0.004,
+                   'rtt_p99_9': 0.005, 'rtt_max': 0.005}
+        fig = generator.PlotlyReportGenerator.make_latency_figure(
+            {1500: {'1': summary}, 100: {'1': dict(summary, rtt_p99=None)}})
+        table = fig.data[0]
+        self.assertEqual(list(table.header.values),
+                         ['packet size', 'dpid', 'received', 'min ms',
+                          'avg ms', 'p50 ms', 'p99 ms', 'p99.9 ms',
+                          'max ms'])
+        self.assertEqual(list(table.cells.values[0]), ['100', '1500'])
+        self.assertEqual(list(table.cells.values[6]), ['', '4.000'])
+        self.assertEqual([trace.name for trace in fig.data[1:]],
+                         ['1 p50', '1 p99', '1 p99.9'])
+        self.assertEqual(list(fig.data[2].y), [None, 4.0])
+
 
 if __name__ == '__main__':
     unittest.main()
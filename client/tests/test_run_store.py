@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import oftester.scenario.model as model
+from oftester.run_store import RunStore
+
+# other tests replace os.mkdir with a mock
+MKDIR = os.mkdir
+
+
+class TestRunStore(unittest.TestCase):
+
+    def setUp(self):
+        mkdir = patch.object(os, 'mkdir', MKDIR)
+        mkdir.start()
+        self.addCleanup(mkdir.stop)
+        self.run_dir = tempfile.mkdtemp()
+        self.store = RunStore(self.run_dir)
+        self.environment = {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': []
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.run_dir)
+
+    def test_save_and_restore(self):
+        scenario = model.Scenario('vlan', self.environment,
+                                  packet_sizes=[100, 1500])
+        scenario.next_packet_size()
+        metrics = scenario.time_metrics[-1]
+        metrics.start = datetime(2020, 1, 1, 12, 0, 0)
+        metrics.stop = datetime(2020, 1, 1, 12, 2, 0)
+        metrics.timestamps[1577880000] = 'vlan'
+        scenario.mark('1', 'start')
+        metrics.saturation['1'] = {'saturated': True}
+        report_generator = Mock()
+        report_generator.collected.return_value = {'points': [{'dps': {}}]}
+
+        self.store.save(scenario, report_generator)
+
+        self.assertTrue(self.store.completed('vlan', 100))
+        self.assertFalse(self.store.completed('vlan', 1500))
+        resumed = model.Scenario('vlan', self.environment,
+                                 packet_sizes=[100, 1500])
+        resumed.next_packet_size()
+        self.assertTrue(self.store.restore(resumed, report_generator))
+        restored = resumed.time_metrics[-1]
+        self.assertEqual(restored.start, metrics.start)
+        self.assertEqual(restored.stop, metrics.stop)
+        self.assertEqual(restored.timestamps, {1577880000: 'vlan'})
+        self.assertEqual(restored.markers, metrics.markers)
+        self.assertEqual(restored.saturation, {'1': {'saturated': True}})
+        report_generator.restore.assert_called_once_with(
+            100, {'points': [{'dps': {}}]})
+
+        resumed.next_packet_size()
+        self.assertFalse(self.store.restore(resumed, report_generator))
+
+
+if __name__ == '__main__':
+    unittest.main()
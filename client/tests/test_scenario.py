@@ -0,0 +1,170 @@
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import oftester.scenario.model as model
+
+
+class RecordingScenario(model.Scenario):
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingScenario, self).__init__(*args, **kwargs)
+        self.done = []
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def run_switch(self, sw):
+        # both switches have to be running at the same time to get past it
+        self.barrier.wait()
+        if sw.snake_start_port == 7:
+            raise ValueError('broken switch')
+        self.done.append(sw.dpid)
+
+
+class TestScenario(unittest.TestCase):
+
+    def setUp(self):
+        self.environment = {
+            'otsdb_host': 'localhost',
+            'otsdb_port': 4242,
+            'ryu_host': 'localhost',
+            'ryu_port': 8080,
+            'reports': 'plotly',
+            'switches': [{
+                'dpid': '1',
+                'snake_start_port': 5,
+                'snake_end_port': 28,
+                'ingress_port': 3,
+                'egress_port': 4
+            }, {
+                'dpid': '2',
+                'snake_start_port': 7,
+                'snake_end_port': 28,
+                'ingress_port': 3,
+                'egress_port': 4
+            }]
+        }
+
+    def test_run_switches_in_parallel(self):
+        scenario = RecordingScenario('test', self.environment)
+        scenario.next_packet_size()
+
+        scenario.run()
+
+        self.assertEqual(scenario.done, ['1'])
+        self.assertEqual(scenario.time_metrics[-1].errors,
+                         {'2': 'broken switch'})
+
+    @patch('oftester.scenario.model.datetime')
+    def test_markers_of_switches_in_the_same_second(self, now):
+        now.now.return_value = datetime(2020, 1, 1, 12, 0, 0)
+        second = int(now.now.return_value.timestamp())
+        scenario = RecordingScenario('test', self.environment)
+        scenario.next_packet_size()
+
+        scenario.mark('1', 'goto-table. Tables: 1')
+        scenario.mark('2', 'goto-table. Tables: 2')
+
+        self.assertEqual(scenario.time_metrics[-1].markers, {
+            '1': {second: 'goto-table. Tables: 1'},
+            '2': {second: 'goto-table. Tables: 2'}})
+
+    def test_options_of_scenario(self):
+        scenario = RecordingScenario('test', self.environment, options={
+            'test': {'a': 1}, 'other': {'b': 2}})
+        self.assertEqual(scenario.options, {'a': 1})
+
+    def test_add_flows_in_chunks(self):
+        scenario = RecordingScenario('test', self.environment,
+                                     flow_chunk_size=2, flow_pipeline_depth=2)
+        scenario.session = Mock()
+        scenario.session.post.return_value.json.side_effect = \
+            lambda: {'flows': 2}
+
+        results = scenario.add_flows('1', ({'priority': i} for i in range(5)),
+                                     groups=[{'group_id': 1}])
+
+        self.assertEqual(len(results), 4)
+        payloads = [c[1]['json'] for c in scenario.session.post.call_args_list]
+        self.assertEqual(payloads[0]['groups'], [{'group_id': 1}])
+        self.assertEqual(payloads[0]['flows'], [])
+        self.assertEqual(sorted(len(p['flows']) for p in payloads[1:]),
+                         [1, 2, 2])
+        self.assertEqual(
+            sorted(f['priority'] for p in payloads for f in p['flows']),
+            list(range(5)))
+
+    def test_add_flows_confirmed_phase(self):
+        scenario = RecordingScenario('test', self.environment)
+        scenario.next_packet_size()
+        scenario.session = Mock()
+        scenario.session.post.return_value.json.return_value = {
+            'flows': 2, 'send_time': 10.0, 'barrier_time': 10.5,
+            'dataplane_time': 11.0}
+
+        scenario.add_flows('1', iter([{'cookie': 5}, {'cookie': 3}]),
+                           phase='rules', confirm=True)
+
+        payload = scenario.session.post.call_args[1]['json']
+        self.assertEqual(payload['confirm_cookies'], [3, 5])
+        self.assertEqual(len(payload['flows']), 2)
+        self.assertEqual(scenario.time_metrics[-1].phases['1']['rules'],
+                         {'sent': 10.0, 'barrier': 10.5, 'dataplane': 11.0})
+
+    def test_wait_for_steady_state_records_convergence(self):
+        scenario = RecordingScenario('test', self.environment,
+                                     convergence_window=2,
+                                     convergence_poll_interval=0)
+        scenario.next_packet_size()
+        timestamps = iter(range(100))
+        scenario.get_rates = Mock(side_effect=lambda dpid, ports: {
+            'total': {'timestamp': [next(timestamps)], 'tx_pps': [1000]}})
+
+        self.assertTrue(scenario.wait_for_steady_state('settle', 0, 10,
+                                                       dpids=['1']))
+
+        result = scenario.time_metrics[-1].convergence['settle']['1']
+        self.assertTrue(result['converged'])
+        self.assertEqual(result['cv'], 0.0)
+        self.assertEqual(result['samples'], 2)
+
+    def test_cleanup_deletes_tracked_entries(self):
+        scenario = RecordingScenario('test', self.environment)
+        scenario.session = Mock()
+        scenario.session.post.return_value.json.return_value = {
+            'flows': 1, 'errors': 0, 'barrier_latency': 0.1}
+        scenario.add_flow({'dpid': '1', 'cookie': 5, 'table_id': 2})
+        scenario.add_group({'dpid': '1', 'group_id': 7})
+        scenario.add_flows('1', iter([{'cookie': 3}]))
+        scenario.session.reset_mock()
+
+        scenario.cleanup_switch()
+
+        scenario.session.delete.assert_not_called()
+        url, kwargs = scenario.session.post.call_args
+        self.assertTrue(url[0].endswith('/tpn/flows/1'))
+        self.assertEqual(kwargs['json']['command'], 'delete')
+        self.assertEqual(
+            [(f['table_id'], f['cookie']) for f in kwargs['json']['flows']],
+            [(0, 3), (2, 5)])
+        self.assertEqual(kwargs['json']['groups'],
+                         [{'dpid': '1', 'group_id': 7}])
+        self.assertEqual(scenario.session.post.call_count, 1)
+
+        scenario.cleanup_switch()
+        self.assertEqual(scenario.session.post.call_count, 1)
+
+    def test_cleanup_clear_mode(self):
+        scenario = RecordingScenario('test', self.environment,
+                                     cleanup_mode='clear')
+        scenario.session = Mock()
+
+        scenario.cleanup_switch('1')
+
+        scenario.session.delete.assert_called_once()
+        self.assertTrue(scenario.session.delete.call_args[0][0].endswith(
+            '/stats/flowentry/clear/1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import threading
+import time
+import unittest
+
+import oftester.scenario.model as model
+from oftester import simulator
+from oftester.constants import (COOKIE_PACKET_IN, COOKIE_SNAKE,
+                                COOKIE_VLAN, GROUP_ID)
+from oftester.openflow import basic_flows as flows
+
+
+class VlanRuleScenario(model.Scenario):
+
+    def run_switch(self, sw):
+        self.prepare_snake_flows(sw.dpid, self.current_packet_size())
+        self.add_flow(flows.flow_vlan_push_pop(sw.dpid, 6, 7, 'PUSH', 100))
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        switch = {
+            'dpid': '00:00:00:00:00:00:00:01',
+            'snake_start_port': 5,
+            'snake_end_port': 12,
+            'ingress_port': 3,
+            'egress_port': 4
+        }
+        self.sim = simulator.Simulator([switch], speed=1000, noise=0,
+                                       table_capacity=20)
+        self.server = simulator.serve(self.sim, port=0)
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.scenario = model.Scenario('test', {
+            'otsdb_host': '127.0.0.1',
+            'otsdb_port': self.server.server_port,
+            'ryu_host': '127.0.0.1',
+            'ryu_port': self.server.server_port,
+            'reports': 'plotly',
+            'switches': [switch]
+        }, convergence_poll_interval=0.05, min_sleep_after_peak_load=0,
+            sleep_after_peak_load=5)
+        self.scenario.next_packet_size()
+        self.switch = switch
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_snake_rates(self):
+        self.scenario.prepare_snake_flows('1', 1500)
+
+        self.assertTrue(self.scenario.time_metrics[-1].saturation['1'][
+            'saturated'])
+        self.assertTrue(self.scenario.time_metrics[-1].convergence[
+            'peak_load']['1']['converged'])
+        total = self.scenario.get_rates('1', ports=False)['total']
+        # the snake goes both ways through ports 5 to 12
+        port_pps = simulator.LINE_RATE / ((1500 + 20) * 8) / (1 + 8 * 0.0005)
+        self.assertAlmostEqual(total['tx_pps'][-1], 8 * port_pps, places=3)
+        self.assertEqual(self.scenario.flow_count('1', COOKIE_SNAKE, 0), 8)
+        self.assertGreater(self.scenario.port_stats('1')[6]['tx_packets'], 0)
+
+        self.scenario.cleanup_switch('1')
+        self.assertEqual(self.scenario.port_stats('1')[3]['tx_packets'], 0)
+
+    def test_snake_conserves_packets(self):
+        self.scenario.prepare_snake_flows('1', 1500)
+        self.scenario.snapshot_ports('1')
+        self.scenario.wait_for_steady_state('collection', 1, 5)
+        self.scenario.check_conservation('1')
+
+        result = self.scenario.time_metrics[-1].conservation['1']
+        self.assertEqual(result['drops'], [])
+        self.assertTrue(all(hop['packets_in'] > 0
+                            for hop in result['hops']))
+        self.assertEqual({hop.get('cookie') for hop in result['hops']
+                          if hop['kind'] == 'rule'}, {COOKIE_SNAKE})
+
+    def test_stale_tester_flows_are_swept(self):
+        # a crashed run left a scenario flow in another table and a group
+        sim_switch = self.sim.switches['1']
+        sim_switch.mod_flow(dict(flows.flow_vlan_push_pop('1', 8, 9, 'PUSH',
+                                                          100), table_id=1))
+        sim_switch.mod_flow({'cookie': 7, 'table_id': 0, 'priority': 10,
+                             'match': {'in_port': 3}, 'actions': []})
+        sim_switch.groups[GROUP_ID] = {'group_id': GROUP_ID}
+
+        self.scenario.reset_switch('1')
+
+        self.assertEqual(self.scenario.flow_count('1', COOKIE_VLAN, 1), 0)
+        self.assertEqual(self.scenario.flow_count('1', 7, 0), 1)
+        self.assertNotIn(GROUP_ID, sim_switch.groups)
+        self.assertEqual(self.scenario.cookies['1'], set())
+
+    def test_table_capacity(self):
+        results = self.scenario.add_flows('1', flows.flow_scale('1', 0, 30))
+        self.assertEqual(sum(r['errors'] for r in results), 10)
+        self.assertEqual(self.sim.switches['1'].port_pps(), 0)
+
+    def test_trial_through_snake_sink(self):
+        scenario = self.scenario
+        scenario.install_snake('1')
+        scenario.add_flow(flows.flow_snake_sink('1', 12))
+        sw = scenario.environment.sw_by_dpid('1')
+        capacity = self.sim.switches['1'].port_pps(100)
+
+        # the simulated clock makes 10 seconds of the wall clock gap
+        result = scenario.run_trial(sw, capacity / 2, 100, 0.01, 0.01, 0.01)
+        self.assertEqual(result['lost'], 0)
+        self.assertFalse(result['under_delivered'])
+        self.assertEqual(result['packets_sent'],
+                         int(capacity / 2 * 0.01))
+
+        result = scenario.run_trial(sw, capacity * 2, 100, 0.01, 0.01, 0.01)
+        self.assertAlmostEqual(result['loss'], 0.5, places=3)
+
+    def test_packet_ins(self):
+        scenario = self.scenario
+        scenario.add_flow(flows.flow_table_miss_controller('1', in_port=6))
+        scenario.reset_packet_in_stats('1')
+        job = scenario.start_generator('1', [5], 1000, 100, duration=1)
+        time.sleep(0.01)
+
+        self.assertEqual(scenario.generator_status(job['job_id'])['state'],
+                         'finished')
+        stats = scenario.packet_in_stats('1')
+        self.assertEqual(stats['cookies'], {str(COOKIE_PACKET_IN): 1000})
+        self.assertAlmostEqual(stats['rate'], 999)
+        self.assertEqual(scenario.port_stats('1')[6]['rx_packets'], 1000)
+        self.assertEqual(scenario.port_stats('1')[7]['tx_packets'], 0)
+
+        job = scenario.start_generator('1', [5], 1000, 100)
+        self.assertEqual(scenario.stop_generator(job['job_id'])['state'],
+                         'stopped')
+        scenario.reset_packet_in_stats('1')
+        self.assertEqual(scenario.packet_in_stats('1')['total'], 0)
+
+    def test_probes(self):
+        scenario = self.scenario
+        scenario.install_snake('1')
+        probes = scenario.start_probes('1', 5, 10, 0.1, 128)
+        scenario.add_flow(flows.flow_probe_punt('1', 12))
+        punted = scenario.start_probes('1', 5, 10, 0.1, 128)
+        time.sleep(0.01)
+
+        lost = scenario.probe_results(probes['session_id'])
+        self.assertEqual((lost['sent'], lost['received']), (10, 0))
+        result = scenario.probe_results(punted['session_id'])
+        self.assertFalse(result['running'])
+        self.assertEqual(result['received'], 10)
+        # four hops through the switch
+        self.assertAlmostEqual(result['rtt_p99'], simulator.CONTROL_RTT +
+                               4 * simulator.HOP_LATENCY)
+
+    def test_reuse_snake(self):
+        scenario = VlanRuleScenario('vlan', {
+            'otsdb_host': '127.0.0.1',
+            'otsdb_port': self.server.server_port,
+            'ryu_host': '127.0.0.1',
+            'ryu_port': self.server.server_port,
+            'reports': 'plotly',
+            'switches': [self.switch]
+        }, packet_sizes=[100, 1500], reuse_snake=True,
+            convergence_poll_interval=0.05, min_collection_interval=0)
+
+        while scenario.has_next_packet_size():
+            scenario.next_packet_size()
+            scenario.execute()
+            self.assertEqual(scenario.flow_count('1', COOKIE_SNAKE, 0), 8)
+            self.assertEqual(scenario.flow_count('1', COOKIE_VLAN, 0), 0)
+            self.assertEqual(self.sim.switches['1'].port_pps(), 0)
+
+        self.assertIn('snake', scenario.time_metrics[0].phases['1'])
+        self.assertNotIn('1', scenario.time_metrics[1].phases)
+        self.assertTrue(scenario.time_metrics[1].saturation['1'][
+            'saturated'])
+        self.assertTrue(scenario.time_metrics[1].convergence['drain']['1'][
+            'converged'])
+        scenario.cleanup_switch()
+        self.assertEqual(scenario.flow_count('1', COOKIE_SNAKE, 0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -96,6 +96,28 @@ class TestSwitchTestRunner(unittest.TestCase):
         switch_test_runner.get_report_generator.assert_has_calls(
             [call(scenario)])
 
+    def test_resume_skips_completed(self):
+        attrs = {'has_next_packet_size.side_effect': [True, True, False]}
+        scenario = Mock(**attrs)
+        switch_test_runner.get_scenarios = Mock(return_value=[scenario])
+        report_generator = Mock()
+        switch_test_runner.get_report_generator = Mock(
+            return_value=report_generator)
+        store = Mock()
+        store.restore.side_effect = [True, False]
+        run_store = switch_test_runner.RunStore
+        switch_test_runner.RunStore = Mock(return_value=store)
+        try:
+            switch_test_runner.main(dict(self.config, run_dir='run',
+                                         resume=True))
+        finally:
+            switch_test_runner.RunStore = run_store
+
+        self.assertEqual(scenario.execute.call_count, 1)
+        self.assertEqual(report_generator.collect_data.call_count, 1)
+        store.save.assert_called_once_with(scenario, report_generator)
+        report_generator.report.assert_called_once()
+
     def test_tester_calls_with_generator(self):
         scenario_timestamp = model.ScenarioTimestamps()
         scenario_timestamp.start = 1
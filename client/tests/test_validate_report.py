@@ -0,0 +1,30 @@
+import unittest
+
+from oftester.validate_report import get_data_values
+
+
+class TestValidateReport(unittest.TestCase):
+
+    def test_phases_of_every_switch(self):
+        data = {
+            'dps': {str(ts): ts for ts in range(0, 40)},
+            'timestamps': {'30': 'goto-table'},
+            'markers': {
+                '1': {'5': 'start', '20': 'Tables: 1'},
+                '2': {'6': 'start', '18': 'Tables: 1'}
+            }
+        }
+        values = get_data_values(data)
+        self.assertEqual(values['Tables: 1 (1)'], list(range(6, 20)))
+        self.assertEqual(values['goto-table (1)'], list(range(21, 30)))
+        self.assertEqual(values['Tables: 1 (2)'], list(range(7, 18)))
+        self.assertEqual(values['goto-table (2)'], list(range(19, 30)))
+
+    def test_scenario_timestamps(self):
+        data = {'dps': {'1': 1, '2': 2, '3': 3},
+                'timestamps': {'0': 'start', '4': 'vlan'}}
+        self.assertEqual(get_data_values(data), {'vlan': [1, 2, 3]})
+
+
+if __name__ == '__main__':
+    unittest.main()
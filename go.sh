@@ -2,11 +2,18 @@ lint() {
     flake8 client/ ryu/
 }
 
+test() {
+    python3 -m pytest client/tests ryu/tests
+}
+
 
 case "$1" in
     lint)
        lint
        ;;
+    test)
+       test
+       ;;
     *)
        echo "Usage: $0 {test|lint}"
 esac
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 
 
+import json
 import os
+import time
 
-import potsdb
+from ryu.app.wsgi import ControllerBase, Response, WSGIApplication, route
 from ryu.base import app_manager
 from ryu.controller import ofp_event
 from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
@@ -11,29 +13,126 @@ from ryu.controller.handler import set_ev_cls
 from ryu.lib import hub
 from ryu.ofproto import ofproto_v1_3
 
+from counter_rates import CounterRateTracker, SampleClock
+from metrics_sinks import ColumnarFileSink, PrometheusSink, make_point
+from otsdb_writer import OpentsdbBatchWriter
+from rate_history import RateHistory
+from stats_scheduler import StatsPollScheduler
+
+WRITER_STATS_INTERVAL = 10
+COOKIE_MASK = 0xffffffffffffffff
+# every cookie of oftester.constants.TESTER_COOKIES
+TESTER_COOKIES = '100-124'
+
+SINK_OPENTSDB = 'opentsdb'
+SINK_FILE = 'file'
+SINK_PROMETHEUS = 'prometheus'
+
+FLOW_MODE_FLOW = 'flow'
+FLOW_MODE_AGGREGATE = 'aggregate'
+
+stats_collector_instance_name = 'StatsCollectorInstance'
+
+
+def make_metrics_sink(name):
+    """
+    Creates the metrics sink selected by the METRICS_SINK environment
+    variable, every backend reads its own settings from the environment.
+
+    :param name: (string) opentsdb, file or prometheus
+    :return: MetricsSink
+    """
+    if name == SINK_OPENTSDB:
+        return OpentsdbBatchWriter(
+            os.getenv('OTSDB_HOST', 'opentsdb'),
+            port=int(os.getenv('OTSDB_PORT', 4242)),
+            max_batch=int(os.getenv('OTSDB_BATCH_SIZE', 5000)),
+            flush_interval=float(os.getenv('OTSDB_FLUSH_INTERVAL', 1.0)),
+            max_queue=int(os.getenv('OTSDB_QUEUE_SIZE', 100000)))
+    if name == SINK_FILE:
+        return ColumnarFileSink(os.getenv('METRICS_FILE_DIR', '/data'))
+    if name == SINK_PROMETHEUS:
+        return PrometheusSink()
+    raise ValueError('Unknown metrics sink %s' % name)
+
+
+def parse_duration(value):
+    """
+    Parses a duration such as "60s", "500ms", "2m" or "10" (seconds).
+
+    :return: (float) seconds
+    """
+    value = value.strip()
+    for suffix, factor in (('ms', 0.001), ('s', 1), ('m', 60), ('h', 3600)):
+        if value.endswith(suffix):
+            return float(value[:-len(suffix)]) * factor
+    return float(value)
+
+
+def parse_cookies(value):
+    """
+    Parses a list of cookies such as "100-119,200".
+
+    :param value: (string) comma separated cookies and inclusive ranges
+    :return: (list) of int cookies
+    """
+    cookies = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            first, last = item.split('-', 1)
+            cookies.extend(range(int(first, 0), int(last, 0) + 1))
+        else:
+            cookies.append(int(item, 0))
+    return cookies
+
 
 class RyuToOpentsdb(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+    _CONTEXTS = {'wsgi': WSGIApplication}
 
     def __init__(self, *args, **kwargs):
         super(RyuToOpentsdb, self).__init__(*args, **kwargs)
         self.datapaths = {}
-        self.collector_thread = hub.spawn(self.run_stats_collector)
-        self.metrics = potsdb.Client(os.getenv('OTSDB_HOST', 'opentsdb'))
+        self.scheduler = StatsPollScheduler(
+            float(os.getenv('STATS_INTERVAL', 10)))
+        self.scheduler_wakeup = hub.Event()
+        self.rates = CounterRateTracker()
+        self.sample_clock = SampleClock()
+        self.history = RateHistory(int(os.getenv('STATS_HISTORY_SIZE', 600)))
+        self.flow_mode = os.getenv('STATS_FLOW_MODE', FLOW_MODE_FLOW)
+        self.cookies = parse_cookies(os.getenv('STATS_COOKIES',
+                                               TESTER_COOKIES))
+        self.pending_aggregates = {}
+        self.metrics = make_metrics_sink(
+            os.getenv('METRICS_SINK', SINK_OPENTSDB))
         self.metric_prefix = os.getenv('OTSDB_METRIC_PREFIX', 'oftester')
+        self.collector_thread = hub.spawn(self.run_stats_collector)
+        wsgi = kwargs['wsgi']
+        wsgi.register(StatsCollectorController,
+                      {stats_collector_instance_name: self})
 
     @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER,
                                                 DEAD_DISPATCHER])
     def state_change_event_handler(self, ev):
         datapath = ev.datapath
         if ev.state == MAIN_DISPATCHER:
-            if datapath not in self.datapaths:
+            if datapath.id not in self.datapaths:
                 self.logger.info('register datapath: %016x', datapath.id)
                 self.datapaths[datapath.id] = datapath
+                self.scheduler.add(datapath.id)
+                self.scheduler_wakeup.set()
         elif ev.state == DEAD_DISPATCHER:
-            if datapath in self.datapaths:
+            if datapath.id in self.datapaths:
                 self.logger.info('unregister datapath: %016x', datapath.id)
                 del self.datapaths[datapath.id]
+                self.scheduler.remove(datapath.id)
+                self.rates.forget(datapath.id)
+                self.sample_clock.forget(datapath.id)
+                self.history.forget(datapath.id)
+                self._forget_aggregates(datapath.id)
             else:
                 self.logger.error("Somehow %016x unregistered with us but was"
                                   " never registered", datapath.id)
@@ -44,66 +143,288 @@ class RyuToOpentsdb(app_manager.RyuApp):
     @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
     def flow_stats_reply_handler(self, ev):
         body = ev.msg.body
+        dpid = ev.msg.datapath.id
+        timestamp = int(time.time() * 1000)
+
+        flows = {}
+        for stat in body:
+            key = (stat.table_id, stat.cookie)
+            packets, byte_count = flows.get(key, (0, 0))
+            flows[key] = (packets + stat.packet_count,
+                          byte_count + stat.byte_count)
 
-        for stat in sorted(body, key=lambda x: x.cookie):
-            self.metrics.send(self.metric_prefix + '.flow.packets',
-                              stat.packet_count,
-                              dpid=ev.msg.datapath.id,
-                              table_id=stat.table_id)
-            self.metrics.send(self.metric_prefix + '.flow.bits',
-                              stat.byte_count * 8,
-                              dpid=ev.msg.datapath.id,
-                              table_id=stat.table_id)
+        points = []
+        for (table_id, cookie), (packets, byte_count) in sorted(
+                flows.items()):
+            tags = {'dpid': dpid, 'table_id': table_id, 'cookie': cookie}
+            points.append(make_point(self.metric_prefix + '.flow.packets',
+                                     packets, timestamp, **tags))
+            points.append(make_point(self.metric_prefix + '.flow.bits',
+                                     byte_count * 8, timestamp, **tags))
+        self.metrics.put(points)
+
+    @set_ev_cls(ofp_event.EventOFPAggregateStatsReply, MAIN_DISPATCHER)
+    def aggregate_stats_reply_handler(self, ev):
+        dpid = ev.msg.datapath.id
+        cookie = self.pending_aggregates.pop((dpid, ev.msg.xid), None)
+        if cookie is None:
+            # not requested by us, e.g. ofctl_rest
+            return
+
+        stat = ev.msg.body
+        arrival = time.time()
+        timestamp = int(arrival * 1000)
+        tags = {'dpid': dpid, 'cookie': cookie}
+        points = [make_point(self.metric_prefix + '.cookie.flows',
+                             stat.flow_count, timestamp, **tags)]
+        rates = self.rates.update((dpid, 'cookie', cookie), arrival, {
+            'packets': stat.packet_count,
+            'bytes': stat.byte_count
+        })
+        if rates:
+            points.append(make_point(
+                self.metric_prefix + '.cookie.rate.packets',
+                rates['packets'], timestamp, **tags))
+            points.append(make_point(
+                self.metric_prefix + '.cookie.rate.bits',
+                rates['bytes'] * 8, timestamp, **tags))
+        self.metrics.put(points)
 
     @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
     def port_stats_reply_handler(self, ev):
         body = ev.msg.body
+        dpid = ev.msg.datapath.id
+        arrival = time.time()
+        timestamp = int(arrival * 1000)
 
+        points = []
+        history = {}
         for stat in sorted(body, key=lambda x: x.port_no):
-            self.metrics.send(self.metric_prefix + '.port.packets',
-                              stat.rx_packets,
-                              dpid=ev.msg.datapath.id,
-                              port=stat.port_no,
-                              direction='rx')
-            self.metrics.send(self.metric_prefix + '.port.packets',
-                              stat.tx_packets,
-                              dpid=ev.msg.datapath.id,
-                              port=stat.port_no,
-                              direction='tx')
-            self.metrics.send(self.metric_prefix + '.port.bits',
-                              stat.rx_bytes * 8,
-                              dpid=ev.msg.datapath.id,
-                              port=stat.port_no,
-                              direction='rx')
-            self.metrics.send(self.metric_prefix + '.port.bits',
-                              stat.tx_bytes * 8,
-                              dpid=ev.msg.datapath.id,
-                              port=stat.port_no,
-                              direction='tx')
-            self.metrics.send(self.metric_prefix + '.port.errors',
-                              stat.rx_errors,
-                              dpid=ev.msg.datapath.id,
-                              port=stat.port_no,
-                              direction='rx')
-            self.metrics.send(self.metric_prefix + '.port.errors',
-                              stat.tx_errors,
-                              dpid=ev.msg.datapath.id,
-                              port=stat.port_no,
-                              direction='tx')
+            for direction, packets, byte_count, errors in (
+                    ('rx', stat.rx_packets, stat.rx_bytes, stat.rx_errors),
+                    ('tx', stat.tx_packets, stat.tx_bytes, stat.tx_errors)):
+                tags = {'dpid': dpid, 'port': stat.port_no,
+                        'direction': direction}
+                points.append(make_point(self.metric_prefix + '.port.packets',
+                                         packets, timestamp, **tags))
+                points.append(make_point(self.metric_prefix + '.port.bits',
+                                         byte_count * 8, timestamp, **tags))
+                points.append(make_point(self.metric_prefix + '.port.errors',
+                                         errors, timestamp, **tags))
+
+            rates = self.port_rates(dpid, stat, arrival)
+            if not rates:
+                continue
+            history[stat.port_no] = (rates['rx_bytes'] * 8,
+                                     rates['tx_bytes'] * 8,
+                                     rates['rx_packets'],
+                                     rates['tx_packets'])
+            for direction in ('rx', 'tx'):
+                tags = {'dpid': dpid, 'port': stat.port_no,
+                        'direction': direction}
+                points.append(make_point(
+                    self.metric_prefix + '.port.rate.packets',
+                    rates[direction + '_packets'], timestamp, **tags))
+                points.append(make_point(
+                    self.metric_prefix + '.port.rate.bits',
+                    rates[direction + '_bytes'] * 8, timestamp, **tags))
+                points.append(make_point(
+                    self.metric_prefix + '.port.rate.errors',
+                    rates[direction + '_errors'], timestamp, **tags))
+        self.metrics.put(points)
+        self.history.add(dpid, arrival, history)
+
+    def port_rates(self, dpid, stat, arrival):
+        """
+        Rates of a port since its previous stats reply, timed by the port
+        duration reported by the switch if it has sub-second resolution and
+        by the arrival of the reply otherwise, see SampleClock.
+
+        :return: (dict) counter name -> rate per second or None
+        """
+        base, sample_time = self.sample_clock.timestamp(
+            dpid, stat.duration_sec, stat.duration_nsec, arrival)
+        # samples of different time bases can not be subtracted
+        key = (dpid, stat.port_no, base)
+        return self.rates.update(key, sample_time, {
+            'rx_packets': stat.rx_packets,
+            'tx_packets': stat.tx_packets,
+            'rx_bytes': stat.rx_bytes,
+            'tx_bytes': stat.tx_bytes,
+            'rx_errors': stat.rx_errors,
+            'tx_errors': stat.tx_errors
+        })
+
+    def publish_writer_stats(self):
+        timestamp = int(time.time() * 1000)
+        points = []
+        for name, value in sorted(self.metrics.stats().items()):
+            points.append(make_point(self.metric_prefix + '.writer.' + name,
+                                     value, timestamp))
+        self.metrics.put(points)
 
     def request_stats(self, datapath):
         self.logger.debug('send stats request: %016x', datapath.id)
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
-        req = parser.OFPFlowStatsRequest(datapath)
-        datapath.send_msg(req)
+        if self.flow_mode == FLOW_MODE_AGGREGATE:
+            self.request_aggregate_stats(datapath)
+        else:
+            req = parser.OFPFlowStatsRequest(datapath)
+            datapath.send_msg(req)
 
         req = parser.OFPPortStatsRequest(datapath, 0, ofproto.OFPP_ANY)
         datapath.send_msg(req)
 
+    def request_aggregate_stats(self, datapath):
+        """
+        Requests aggregate stats of every configured cookie.  The replies
+        do not carry the cookie so it is looked up by the xid.
+        """
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        # replies of the previous round that never arrived won't arrive now
+        self._forget_aggregates(datapath.id)
+        for cookie in self.cookies:
+            req = parser.OFPAggregateStatsRequest(
+                datapath, 0, ofproto.OFPTT_ALL, ofproto.OFPP_ANY,
+                ofproto.OFPG_ANY, cookie, COOKIE_MASK, parser.OFPMatch())
+            datapath.send_msg(req)
+            self.pending_aggregates[(datapath.id, req.xid)] = cookie
+
+    def _forget_aggregates(self, dpid):
+        for key in [k for k in self.pending_aggregates if k[0] == dpid]:
+            del self.pending_aggregates[key]
+
+    def set_poll_interval(self, dpid, interval):
+        self.scheduler.set_interval(dpid, interval)
+        self.scheduler_wakeup.set()
+
+    def start_burst(self, dpid, interval, duration):
+        self.logger.info('stats burst for %016x: every %.3fs for %.1fs',
+                         dpid, interval, duration)
+        self.scheduler.start_burst(dpid, interval, duration)
+        self.scheduler_wakeup.set()
+
+    def stop_burst(self, dpid):
+        self.scheduler.stop_burst(dpid)
+        self.scheduler_wakeup.set()
+
+    def poll_settings(self, dpid):
+        return {'dpid': dpid,
+                'interval': self.scheduler.interval(dpid),
+                'burst': self.scheduler.burst(dpid)}
+
     def run_stats_collector(self):
+        next_writer_stats = time.time() + WRITER_STATS_INTERVAL
         while True:
-            for dp in self.datapaths.values():
-                self.request_stats(dp)
-            hub.sleep(10)
+            for dpid in self.scheduler.due():
+                dp = self.datapaths.get(dpid)
+                if dp:
+                    self.request_stats(dp)
+            if time.time() >= next_writer_stats:
+                self.publish_writer_stats()
+                next_writer_stats = time.time() + WRITER_STATS_INTERVAL
+            timeout = min(self.scheduler.seconds_to_next_poll(),
+                          next_writer_stats - time.time())
+            self.scheduler_wakeup.wait(max(timeout, 0))
+            self.scheduler_wakeup.clear()
+
+
+class StatsCollectorController(ControllerBase):
+
+    def __init__(self, req, link, data, **config):
+        super(StatsCollectorController, self).__init__(req, link, data,
+                                                       **config)
+        self.stats_collector_app = data[stats_collector_instance_name]
+
+    def _dpids(self, switchid):
+        app = self.stats_collector_app
+        if switchid == 'all':
+            return list(app.datapaths.keys())
+        dpid = int(switchid, 0)
+        if dpid not in app.datapaths:
+            return None
+        return [dpid]
+
+    @staticmethod
+    def _json_response(data):
+        return Response(content_type='application/json',
+                        body=json.dumps(data))
+
+    @route('stats', '/metrics', methods=['GET'])
+    def get_metrics(self, req, **kwargs):
+        metrics = self.stats_collector_app.metrics
+        if not isinstance(metrics, PrometheusSink):
+            return Response(status=404)
+        return Response(content_type='text/plain', charset='utf-8',
+                        body=metrics.render())
+
+    @route('stats', '/tpn/stats/{switchid}', methods=['GET'])
+    def get_rates(self, req, **kwargs):
+        app = self.stats_collector_app
+        try:
+            dpid = int(kwargs['switchid'], 0)
+            window = parse_duration(req.GET.get('window', '60s'))
+        except ValueError:
+            return Response(status=400)
+        with_ports = req.GET.get('ports', '1') not in ('0', 'false')
+        rates = app.history.window(dpid, time.time() - window, with_ports)
+        if rates is None:
+            return Response(status=404)
+        rates['window'] = window
+        return self._json_response(rates)
+
+    @route('stats', '/tpn/stats/interval/{switchid}', methods=['GET'])
+    def get_poll_interval(self, req, **kwargs):
+        app = self.stats_collector_app
+        dpids = self._dpids(kwargs['switchid'])
+        if dpids is None:
+            return Response(status=404)
+        return self._json_response([app.poll_settings(d) for d in dpids])
+
+    @route('stats', '/tpn/stats/interval/{switchid}', methods=['PUT'])
+    def set_poll_interval(self, req, **kwargs):
+        app = self.stats_collector_app
+        dpids = self._dpids(kwargs['switchid'])
+        if dpids is None:
+            return Response(status=404)
+        try:
+            interval = json.loads(req.body)['interval']
+            # null goes back to the default interval
+            if interval is not None:
+                interval = float(interval)
+        except (KeyError, TypeError, ValueError) as e:
+            return Response(status=400,
+                            body='Invalid poll interval: %s' % e)
+        for dpid in dpids:
+            app.set_poll_interval(dpid, interval)
+        return self._json_response([app.poll_settings(d) for d in dpids])
+
+    @route('stats', '/tpn/stats/burst/{switchid}', methods=['POST'])
+    def start_burst(self, req, **kwargs):
+        app = self.stats_collector_app
+        dpids = self._dpids(kwargs['switchid'])
+        if dpids is None:
+            return Response(status=404)
+        try:
+            payload = json.loads(req.body) if req.body else {}
+            interval = float(payload.get('interval', 0.1))
+            duration = float(payload.get('duration', 30))
+        except (AttributeError, TypeError, ValueError) as e:
+            return Response(status=400, body='Invalid stats burst: %s' % e)
+        for dpid in dpids:
+            app.start_burst(dpid, interval, duration)
+        return self._json_response([app.poll_settings(d) for d in dpids])
+
+    @route('stats', '/tpn/stats/burst/{switchid}', methods=['DELETE'])
+    def stop_burst(self, req, **kwargs):
+        app = self.stats_collector_app
+        dpids = self._dpids(kwargs['switchid'])
+        if dpids is None:
+            return Response(status=404)
+        for dpid in dpids:
+            app.stop_burst(dpid)
+        return self._json_response([app.poll_settings(d) for d in dpids])
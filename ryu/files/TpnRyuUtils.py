@@ -1,16 +1,32 @@
+import collections
+import functools
+import itertools
 import json
+import struct
+import time
 
-from ryu.app.wsgi import ControllerBase, WSGIApplication, route
+import ryu.app.ofctl.api as ofctl_api
+
+from ryu.app.wsgi import ControllerBase, Response, WSGIApplication, route
 from ryu.base import app_manager
 from ryu.controller import dpset
 from ryu.controller import ofp_event
 from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.lib import dpid as dpid_lib
+from ryu.lib import hub
+from ryu.lib import ofctl_v1_3
 from ryu.lib.packet import ethernet, ipv4, udp, packet, vlan, vxlan
 from ryu.ofproto import ether, inet
 from ryu.ofproto import ofproto_v1_3
 
+from counter_rates import CounterRateTracker, SampleClock
+from latency_probe import PROBE_LEN, PROBE_UDP_PORT, ProbeSession
+from latency_probe import decode_probe, encode_probe
+from packet_generator import PacketGeneratorJob, STATE_RUNNING
+from packet_templates import expand_variations
+from saturation import PlateauDetector
+
 SWITCHID_PATTERN = dpid_lib.DPID_PATTERN + r'|all'
 VLANID_PATTERN = r'[0-9]{1,4}|all'
 REQUIREMENTS = {'switchid': SWITCHID_PATTERN,
@@ -24,6 +40,15 @@ IP_PROTO = inet.IPPROTO_UDP
 UDP_SRC_PORT = 5000
 UDP_DST_PORT = 10000
 
+PACKET_CACHE_SIZE = 256
+TEMPLATE_CACHE_SIZE = 16
+
+COOKIE_PROBE = 120  # oftester.constants.COOKIE_PROBE
+PROBE_PKT_SIZE = 128
+
+MAX_ERROR_SAMPLES = 10
+CONFIRM_POLL_INTERVAL = 0.05
+
 pipeline_tester_instance_name = "PipelineTesterInstance"
 
 
@@ -88,6 +113,100 @@ def make_packet(pkt_size, outer_vlan=0, inner_vlan=0, vni=0,
     return p
 
 
+def make_frame(**packet_args):
+    """
+    Serialized bytes of make_packet(**packet_args).  Frames are cached by
+    their header fields and size, see packet_cache_info() for the hit and
+    miss counters.
+
+    :return: (bytes)
+    """
+    return _make_frame(tuple(sorted(packet_args.items())))
+
+
+@functools.lru_cache(maxsize=PACKET_CACHE_SIZE)
+def _make_frame(packet_args):
+    p = make_packet(**dict(packet_args))
+    p.serialize()
+    return bytes(p.data)
+
+
+def make_frames(variations=None, flows=None, seed=0, **packet_args):
+    """
+    Serialized frames of a multi flow template.  Every frame is
+    make_packet(**packet_args) with the header fields replaced by the
+    values of one flow of the variation spec.  Whole templates are cached.
+
+    :param variations: (dict) field -> spec, see expand_variations()
+    :param flows: (int) number of distinct frames
+    :param seed: (int) seed for random value sets
+    :return: (tuple) of bytes
+    """
+    if not variations:
+        return (make_frame(**packet_args),)
+    return _make_frames(json.dumps([variations, flows, seed, packet_args],
+                                   sort_keys=True))
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _make_frames(template):
+    variations, flows, seed, packet_args = json.loads(template)
+    frames = []
+    for fields in expand_variations(variations, flows, seed):
+        p = make_packet(**dict(packet_args, **fields))
+        p.serialize()
+        frames.append(bytes(p.data))
+    return tuple(frames)
+
+
+def packet_cache_info():
+    info = _make_frame.cache_info()
+    templates = _make_frames.cache_info()
+    return {'hits': info.hits, 'misses': info.misses,
+            'size': info.currsize, 'max_size': info.maxsize,
+            'templates': {'hits': templates.hits,
+                          'misses': templates.misses,
+                          'size': templates.currsize,
+                          'max_size': templates.maxsize}}
+
+
+def send_with_xid(dp, buf):
+    """
+    Sends a serialized message with the next xid of the datapath, the way
+    Datapath.set_xid() numbers messages, so error replies to messages sent
+    from the same buffer can be told apart.
+
+    :param dp: Datapath
+    :param buf: serialized message, left unchanged
+    :return: (bool) result of Datapath.send()
+    """
+    dp.xid = (dp.xid + 1) & dp.ofproto.MAX_XID
+    msg = bytearray(buf)
+    struct.pack_into('!I', msg, 4, dp.xid)
+    return dp.send(msg)
+
+
+class XidRecorder(object):
+    """
+    Datapath stand in for ofctl that calls back with the xid of every
+    message as it is assigned, before the message is queued, so the xids
+    of a batch are exact even if other apps send to the same datapath
+    while the batch is sent.
+    """
+
+    def __init__(self, dp, callback):
+        self.dp = dp
+        self.callback = callback
+
+    def __getattr__(self, name):
+        return getattr(self.dp, name)
+
+    def set_xid(self, msg):
+        xid = self.dp.set_xid(msg)
+        self.callback(xid)
+        return xid
+
+
 class TpnRyuUtils(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
     _CONTEXTS = {
@@ -97,11 +216,24 @@ class TpnRyuUtils(app_manager.RyuApp):
     def __init__(self, *args, **kwargs):
         super(TpnRyuUtils, self).__init__(*args, **kwargs)
         self.dpset = kwargs['dpset']
+        self.generator_jobs = {}
+        self.generator_job_ids = itertools.count(1)
+        self.probe_sessions = {}
+        self.probe_session_ids = itertools.count(1)
+        self.packet_in_counts = collections.defaultdict(collections.Counter)
+        self.packet_in_times = {}
+        self.flow_mod_xids = {}
         wsgi = kwargs['wsgi']
         wsgi.register(PipelineTesterController,
                       {pipeline_tester_instance_name: self})
 
-    def send_packet(self, dpid, pkt, port):
+    def packet_out_buffer(self, dpid, frame, port):
+        """
+        Serializes a packet out once so it can be sent repeatedly with
+        send_with_xid() instead of being rebuilt for every packet.
+
+        :return: (tuple) datapath and the serialized message
+        """
         dp = self.dpset.get(dpid)
         ofp = dp.ofproto
         ofp_parser = dp.ofproto_parser
@@ -111,8 +243,387 @@ class TpnRyuUtils(app_manager.RyuApp):
                                       in_port=ofp.OFPP_CONTROLLER,
                                       buffer_id=ofp.OFP_NO_BUFFER,
                                       actions=actions,
-                                      data=pkt)
-        dp.send_msg(req)
+                                      data=frame)
+        # every send gets its own xid
+        req.set_xid(0)
+        req.serialize()
+        return dp, req.buf
+
+    def packet_out_buffers(self, dpid, frames, port):
+        """
+        Serialized packet outs of every frame, cycled round robin.
+
+        :return: (tuple) datapath and an endless iterator of messages
+        """
+        dp = self.dpset.get(dpid)
+        buffers = [self.packet_out_buffer(dpid, frame, port)[1]
+                   for frame in frames]
+        return dp, itertools.cycle(buffers)
+
+    def send_packet(self, dpid, frames, port, count=1):
+        dp, buffers = self.packet_out_buffers(dpid, frames, port)
+        while count > 0:
+            send_with_xid(dp, next(buffers))
+            count -= 1
+
+    def start_generator(self, dpid, ports, pps, burst=1, duration=None,
+                        **packet_args):
+        """
+        Starts a job sending packet outs at a steady rate.
+
+        :param dpid: (int) datapath id
+        :param ports: (list) ports to send to, -1 floods
+        :param pps: (float) target packet outs per second
+        :param burst: (int) packets sent back to back every tick
+        :param duration: (float) seconds to run, None runs until stopped
+        :param packet_args: arguments of make_packet
+        :return: PacketGeneratorJob
+        """
+        dp = self.dpset.get(dpid)
+        if dp is None:
+            raise KeyError(dpid)
+        frames = make_frames(**packet_args)
+        buffers = {}
+        for port in ports:
+            _, buffers[port] = self.packet_out_buffers(dpid, frames, port)
+        job = PacketGeneratorJob(next(self.generator_job_ids), dpid,
+                                 lambda port: send_with_xid(
+                                     dp, next(buffers[port])),
+                                 ports, pps, burst, duration)
+        self.generator_jobs[job.job_id] = job
+        job.start()
+        self.logger.info('Started packet generator job %i on %016x: %s pps '
+                         'to ports %s', job.job_id, dpid, pps, ports)
+        return job
+
+    def mod_entries(self, dpid, flows=None, groups=None, command='add',
+                    confirm_cookies=None, confirm_timeout=10.0):
+        """
+        Sends flow and group mods back to back and waits for a single
+        barrier after the last one.  Groups are added before the flows that
+        may point to them and deleted after them.
+
+        Error messages the switch sends for any message of the batch before
+        the barrier reply are counted as errors of the batch.
+
+        With confirm_cookies the flows of those cookies are polled after the
+        barrier until their packet count grows, which is when the data
+        plane is known to use the new rules.
+
+        :param dpid: (int) datapath id
+        :param flows: (list) flow entries in the ofctl_rest format
+        :param groups: (list) group entries in the ofctl_rest format
+        :param command: (string) add, modify, modify_strict, delete or
+        delete_strict
+        :param confirm_cookies: (list) cookies to wait for traffic on
+        :param confirm_timeout: (float) seconds to wait for traffic
+        :return: (dict) number of messages sent, errors and the send,
+        barrier reply and data plane confirmation times
+        """
+        dp = self.dpset.get(dpid)
+        if dp is None:
+            raise KeyError(dpid)
+        flows = flows or []
+        groups = groups or []
+        ofp = dp.ofproto
+        flow_cmd = {'add': ofp.OFPFC_ADD,
+                    'modify': ofp.OFPFC_MODIFY,
+                    'modify_strict': ofp.OFPFC_MODIFY_STRICT,
+                    'delete': ofp.OFPFC_DELETE,
+                    'delete_strict': ofp.OFPFC_DELETE_STRICT}.get(command)
+        if flow_cmd is None:
+            raise ValueError('Unknown command %s' % command)
+        deleting = command.startswith('delete')
+        if command == 'add':
+            group_cmd = ofp.OFPGC_ADD
+        elif deleting:
+            group_cmd = ofp.OFPGC_DELETE
+        else:
+            group_cmd = ofp.OFPGC_MODIFY
+
+        if confirm_cookies:
+            packets = self.cookie_packet_count(dpid, confirm_cookies)
+
+        batch = {'xids': [], 'errors': []}
+
+        def track(xid):
+            batch['xids'].append(xid)
+            self.flow_mod_xids[(dpid, xid)] = batch
+
+        recorder = XidRecorder(dp, track)
+        send_time = time.time()
+        try:
+            if not deleting:
+                for group in groups:
+                    ofctl_v1_3.mod_group_entry(recorder, group, group_cmd)
+            for flow in flows:
+                ofctl_v1_3.mod_flow_entry(recorder, flow, flow_cmd)
+            if deleting:
+                for group in groups:
+                    ofctl_v1_3.mod_group_entry(recorder, group, group_cmd)
+            ofctl_api.send_msg(self,
+                               dp.ofproto_parser.OFPBarrierRequest(dp),
+                               reply_cls=dp.ofproto_parser.OFPBarrierReply)
+        finally:
+            for xid in batch['xids']:
+                self.flow_mod_xids.pop((dpid, xid), None)
+        barrier_time = time.time()
+
+        dataplane_time = None
+        if confirm_cookies:
+            while time.time() - barrier_time < confirm_timeout:
+                if self.cookie_packet_count(dpid, confirm_cookies) > packets:
+                    dataplane_time = time.time()
+                    break
+                hub.sleep(CONFIRM_POLL_INTERVAL)
+        return {'dpid': dpid,
+                'flows': len(flows),
+                'groups': len(groups),
+                'errors': len(batch['errors']),
+                'error_samples': batch['errors'][:MAX_ERROR_SAMPLES],
+                'send_time': send_time,
+                'barrier_time': barrier_time,
+                'barrier_latency': barrier_time - send_time,
+                'dataplane_time': dataplane_time}
+
+    def cookie_packet_count(self, dpid, cookies):
+        """
+        Packets matched by all flows of the cookies, in any table.
+        """
+        dp = self.dpset.get(dpid)
+        ofp = dp.ofproto
+        parser = dp.ofproto_parser
+        packets = 0
+        for cookie in cookies:
+            req = parser.OFPAggregateStatsRequest(
+                dp, 0, ofp.OFPTT_ALL, ofp.OFPP_ANY, ofp.OFPG_ANY, cookie,
+                0xffffffffffffffff, parser.OFPMatch())
+            replies = ofctl_api.send_msg(
+                self, req, reply_cls=parser.OFPAggregateStatsReply,
+                reply_multi=True)
+            packets += sum(reply.body.packet_count for reply in replies)
+        return packets
+
+    def port_stats(self, dpid):
+        """
+        Requests port stats and waits for the replies.
+
+        :return: (list) OFPPortStats of every port
+        """
+        dp = self.dpset.get(dpid)
+        parser = dp.ofproto_parser
+        req = parser.OFPPortStatsRequest(dp, 0, dp.ofproto.OFPP_ANY)
+        replies = ofctl_api.send_msg(self, req,
+                                     reply_cls=parser.OFPPortStatsReply,
+                                     reply_multi=True)
+        return [stat for reply in replies for stat in reply.body]
+
+    def port_rates(self, dpid, tracker, clock):
+        """
+        Polls port stats and turns them into rates since the previous poll
+        with the same tracker and clock.
+
+        :return: (dict) port_no -> dict of rx/tx bps and pps
+        """
+        now = time.time()
+        result = {}
+        for stat in self.port_stats(dpid):
+            base, sample_time = clock.timestamp(dpid, stat.duration_sec,
+                                                stat.duration_nsec, now)
+            rates = tracker.update((dpid, stat.port_no, base),
+                                   sample_time, {
+                                       'rx_packets': stat.rx_packets,
+                                       'tx_packets': stat.tx_packets,
+                                       'rx_bytes': stat.rx_bytes,
+                                       'tx_bytes': stat.tx_bytes})
+            if rates:
+                result[stat.port_no] = {
+                    'rx_bps': rates['rx_bytes'] * 8,
+                    'tx_bps': rates['tx_bytes'] * 8,
+                    'rx_pps': rates['rx_packets'],
+                    'tx_pps': rates['tx_packets']}
+        return result
+
+    def saturate(self, dpid, port=-1, interval=1.0, initial_burst=1,
+                 growth=2, max_burst=1024, tolerance=0.05, stable_rounds=2,
+                 timeout=600, **packet_args):
+        """
+        Injects packets in growing bursts until the per port rates stop
+        growing.
+
+        :param dpid: (int) datapath id
+        :param port: (int) port to send packet outs to, -1 floods
+        :param interval: (float) seconds between bursts
+        :param initial_burst: (int) packets in the first burst
+        :param growth: (int) factor the burst grows by every round
+        :param max_burst: (int) upper limit of a burst
+        :param tolerance: (float) relative change of the port tx rates
+        still considered a plateau
+        :param stable_rounds: (int) rounds the rates have to stay within
+        tolerance
+        :param timeout: (float) seconds to give up after
+        :param packet_args: arguments of make_packet
+        :return: (dict) result of the run
+        """
+        dp = self.dpset.get(dpid)
+        if dp is None:
+            raise KeyError(dpid)
+        _, buffers = self.packet_out_buffers(dpid,
+                                             make_frames(**packet_args), port)
+        tracker = CounterRateTracker()
+        clock = SampleClock()
+        detector = PlateauDetector(tolerance, stable_rounds)
+
+        self.port_rates(dpid, tracker, clock)
+        start = time.time()
+        burst = initial_burst
+        sent = 0
+        rounds = 0
+        saturated = False
+        rates = {}
+        while not saturated and time.time() - start < timeout:
+            for _ in range(burst):
+                send_with_xid(dp, next(buffers))
+            sent += burst
+            rounds += 1
+            hub.sleep(interval)
+            rates = self.port_rates(dpid, tracker, clock)
+            saturated = detector.update(
+                {p: r['tx_bps'] for p, r in rates.items()})
+            if not saturated:
+                burst = min(burst * growth, max_burst)
+
+        elapsed = time.time() - start
+        self.logger.info('%016x %s after %i packets in %.1f seconds',
+                         dpid, 'saturated' if saturated else 'timed out',
+                         sent, elapsed)
+        return {'dpid': dpid,
+                'saturated': saturated,
+                'packets_sent': sent,
+                'rounds': rounds,
+                'time_to_saturation': elapsed,
+                'rates': rates}
+
+    def start_probes(self, dpid, port, count=1000, interval=0.01,
+                     **packet_args):
+        """
+        Sends count probe packets, interval seconds apart, that carry a
+        session id, sequence number and send timestamp at the end of their
+        payload.  A flow with cookie COOKIE_PROBE has to punt them back,
+        the packet in handler then records their round trip time.
+
+        The probe header overwrites the tail of the cached frame, the UDP
+        checksum is left as computed for the zero payload.
+
+        :param dpid: (int) datapath id
+        :param port: (int) port to send the probes to
+        :param count: (int) number of probes
+        :param interval: (float) seconds between probes
+        :param packet_args: arguments of make_packet, pkt_size defaults to
+        PROBE_PKT_SIZE and udp_dst_port to PROBE_UDP_PORT
+        :return: (ProbeSession)
+        """
+        dp = self.dpset.get(dpid)
+        if dp is None:
+            raise KeyError(dpid)
+        if count <= 0 or interval <= 0:
+            raise ValueError('count and interval need to be positive')
+        packet_args.setdefault('pkt_size', PROBE_PKT_SIZE)
+        if packet_args.get('udp_dst_port') is None:
+            packet_args['udp_dst_port'] = PROBE_UDP_PORT
+        if len(make_packet(**packet_args).protocols[-1]) < PROBE_LEN:
+            raise ValueError('pkt_size is too small to carry a probe')
+        frame = make_frame(**packet_args)[:-PROBE_LEN]
+
+        session = ProbeSession(next(self.probe_session_ids), dpid, port,
+                               count, interval)
+        self.probe_sessions[session.session_id] = session
+        hub.spawn(self._send_probes, dp, session, frame)
+        self.logger.info('Started probe session %i on %016x: %i probes to '
+                         'port %i', session.session_id, dpid, count, port)
+        return session
+
+    def _send_probes(self, dp, session, frame):
+        ofp = dp.ofproto
+        parser = dp.ofproto_parser
+        actions = [parser.OFPActionOutput(session.port)]
+        try:
+            for seq in range(session.count):
+                if session.stop_time is not None:
+                    break
+                delay = session.start_time + seq * session.interval \
+                    - time.time()
+                if delay > 0:
+                    hub.sleep(delay)
+                data = frame + encode_probe(session.session_id, seq)
+                dp.send_msg(parser.OFPPacketOut(
+                    dp, buffer_id=ofp.OFP_NO_BUFFER,
+                    in_port=ofp.OFPP_CONTROLLER, actions=actions, data=data))
+                session.sent += 1
+        except Exception as e:
+            self.logger.exception('Probe session %i failed',
+                                  session.session_id)
+            session.error = str(e)
+        # give the last probes time to come back
+        hub.sleep(1)
+        if session.stop_time is None:
+            session.stop_time = time.time()
+
+    def packet_in_stats(self, dpid):
+        """
+        Packet ins counted since the last reset_packet_in_stats().
+
+        :return: (dict) total and per cookie counts, the times of the
+        first and last packet in and the rate in between
+        """
+        counts = self.packet_in_counts.get(dpid, {})
+        total = sum(counts.values())
+        first, last = self.packet_in_times.get(dpid, (None, None))
+        rate = 0.0
+        if total > 1 and last > first:
+            rate = (total - 1) / (last - first)
+        return {'dpid': dpid,
+                'timestamp': time.time(),
+                'total': total,
+                'cookies': {str(cookie): count
+                            for cookie, count in counts.items()},
+                'first': first,
+                'last': last,
+                'rate': rate}
+
+    def reset_packet_in_stats(self, dpid):
+        self.packet_in_counts.pop(dpid, None)
+        self.packet_in_times.pop(dpid, None)
+
+    @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
+    def packet_in_handler(self, ev):
+        now = time.time()
+        msg = ev.msg
+        dpid = msg.datapath.id
+        # counters only, the packet in channel is what is being measured
+        self.packet_in_counts[dpid][msg.cookie] += 1
+        times = self.packet_in_times.get(dpid)
+        if times is None:
+            self.packet_in_times[dpid] = [now, now]
+        else:
+            times[1] = now
+        if msg.cookie != COOKIE_PROBE:
+            return
+        probe = decode_probe(msg.data)
+        if probe is None:
+            return
+        session_id, seq, sent_time = probe
+        session = self.probe_sessions.get(session_id)
+        if session is not None and session.dpid == msg.datapath.id:
+            session.received(seq, sent_time, now)
+
+    @set_ev_cls(ofp_event.EventOFPErrorMsg, MAIN_DISPATCHER)
+    def error_msg_handler(self, ev):
+        msg = ev.msg
+        batch = self.flow_mod_xids.get((msg.datapath.id, msg.xid))
+        if batch is not None:
+            batch['errors'].append({'xid': msg.xid, 'type': msg.type,
+                                    'code': msg.code})
 
     @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER,
                                                 DEAD_DISPATCHER])
@@ -122,6 +633,13 @@ class TpnRyuUtils(app_manager.RyuApp):
             self.logger.info('register datapath: %016x', datapath.id)
         elif ev.state == DEAD_DISPATCHER:
             self.logger.info('unregister datapath: %016x', datapath.id)
+            for job in self.generator_jobs.values():
+                if job.dpid == datapath.id and job.state == STATE_RUNNING:
+                    job.stop()
+            for session in self.probe_sessions.values():
+                if session.dpid == datapath.id and session.stop_time is None:
+                    session.stop_time = time.time()
+            self.reset_packet_in_stats(datapath.id)
         else:
             self.logger.error(
                 "Somehow %016x unregistered with us but was never registered",
@@ -152,7 +670,155 @@ class PipelineTesterController(ControllerBase):
             count = payload['count']
             del payload['count']
 
-        p = make_packet(**payload)
-        while count > 0:
-            app.send_packet(switchid, p, port)
-            count -= 1
+        try:
+            frames = make_frames(**payload)
+        except ValueError as e:
+            return Response(status=400, body=str(e))
+        app.send_packet(switchid, frames, port, count)
+
+    @route('tester', '/tpn/saturate/{switchid}', methods=['POST'])
+    def saturate(self, req, **kwargs):
+        app = self.pipeline_tester_app
+        if req.content_type == 'application/json':
+            payload = json.loads(req.body)
+        else:
+            raise ValueError("Not valid payload")
+
+        switchid = int(kwargs['switchid'], 0)
+        try:
+            result = app.saturate(switchid, **payload)
+        except KeyError:
+            return Response(status=404)
+        except ValueError as e:
+            return Response(status=400, body=str(e))
+        return Response(content_type='application/json',
+                        body=json.dumps(result))
+
+    @route('tester', '/tpn/packet_cache', methods=['GET'])
+    def get_packet_cache(self, req, **kwargs):
+        return Response(content_type='application/json',
+                        body=json.dumps(packet_cache_info()))
+
+    @route('tester', '/tpn/generator/{switchid}', methods=['POST'])
+    def start_generator(self, req, **kwargs):
+        app = self.pipeline_tester_app
+        if req.content_type == 'application/json':
+            payload = json.loads(req.body)
+        else:
+            raise ValueError("Not valid payload")
+
+        switchid = int(kwargs['switchid'], 0)
+        try:
+            ports = [int(port) for port in payload.pop('ports')]
+            pps = float(payload.pop('pps'))
+            burst = int(payload.pop('burst', 1))
+            duration = payload.pop('duration', None)
+            if duration is not None:
+                duration = float(duration)
+        except KeyError as e:
+            return Response(status=400, body='Missing %s' % e)
+        except (TypeError, ValueError) as e:
+            return Response(status=400, body=str(e))
+        try:
+            job = app.start_generator(switchid, ports, pps, burst, duration,
+                                      **payload)
+        except KeyError:
+            return Response(status=404)
+        except ValueError as e:
+            return Response(status=400, body=str(e))
+        return Response(status=201, content_type='application/json',
+                        body=json.dumps(job.status()))
+
+    @route('tester', '/tpn/generator/job/{job_id}', methods=['GET'])
+    def get_generator(self, req, **kwargs):
+        job = self.pipeline_tester_app.generator_jobs.get(
+            int(kwargs['job_id']))
+        if job is None:
+            return Response(status=404)
+        return Response(content_type='application/json',
+                        body=json.dumps(job.status()))
+
+    @route('tester', '/tpn/generator/job/{job_id}', methods=['DELETE'])
+    def stop_generator(self, req, **kwargs):
+        job = self.pipeline_tester_app.generator_jobs.get(
+            int(kwargs['job_id']))
+        if job is None:
+            return Response(status=404)
+        job.stop()
+        return Response(content_type='application/json',
+                        body=json.dumps(job.status()))
+
+    @route('tester', '/tpn/probe/{switchid}', methods=['POST'])
+    def start_probes(self, req, **kwargs):
+        app = self.pipeline_tester_app
+        if req.content_type == 'application/json':
+            payload = json.loads(req.body)
+        else:
+            raise ValueError("Not valid payload")
+
+        switchid = int(kwargs['switchid'], 0)
+        port = payload.pop('port')
+        try:
+            session = app.start_probes(switchid, port, **payload)
+        except KeyError:
+            return Response(status=404)
+        except ValueError as e:
+            return Response(status=400, body=str(e))
+        return Response(status=201, content_type='application/json',
+                        body=json.dumps(session.summary()))
+
+    @route('tester', '/tpn/probe/session/{session_id}', methods=['GET'])
+    def get_probes(self, req, **kwargs):
+        session = self.pipeline_tester_app.probe_sessions.get(
+            int(kwargs['session_id']))
+        if session is None:
+            return Response(status=404)
+        return Response(content_type='application/json',
+                        body=json.dumps(session.summary()))
+
+    @route('tester', '/tpn/probe/session/{session_id}', methods=['DELETE'])
+    def delete_probes(self, req, **kwargs):
+        session = self.pipeline_tester_app.probe_sessions.pop(
+            int(kwargs['session_id']), None)
+        if session is None:
+            return Response(status=404)
+        if session.stop_time is None:
+            session.stop_time = time.time()
+        return Response(content_type='application/json',
+                        body=json.dumps(session.summary()))
+
+    @route('tester', '/tpn/packet_in/{switchid}', methods=['GET'])
+    def get_packet_in_stats(self, req, **kwargs):
+        switchid = int(kwargs['switchid'], 0)
+        return Response(content_type='application/json',
+                        body=json.dumps(
+                            self.pipeline_tester_app.packet_in_stats(
+                                switchid)))
+
+    @route('tester', '/tpn/packet_in/{switchid}', methods=['DELETE'])
+    def reset_packet_in_stats(self, req, **kwargs):
+        switchid = int(kwargs['switchid'], 0)
+        self.pipeline_tester_app.reset_packet_in_stats(switchid)
+        return Response(status=204)
+
+    @route('tester', '/tpn/flows/{switchid}', methods=['POST'])
+    def mod_entries(self, req, **kwargs):
+        app = self.pipeline_tester_app
+        if req.content_type == 'application/json':
+            payload = json.loads(req.body)
+        else:
+            raise ValueError("Not valid payload")
+
+        switchid = int(kwargs['switchid'], 0)
+        if app.dpset.get(switchid) is None:
+            return Response(status=404)
+        try:
+            result = app.mod_entries(
+                switchid, payload.get('flows'), payload.get('groups'),
+                payload.get('command', 'add'),
+                payload.get('confirm_cookies'),
+                payload.get('confirm_timeout', 10.0))
+        except (KeyError, TypeError, ValueError) as e:
+            return Response(status=400, body=str(e))
+        return Response(content_type='application/json',
+                        body=json.dumps(result))
@@ -0,0 +1,111 @@
+DURATION_UNSUPPORTED = 0xffffffff
+
+
+def duration_seconds(duration_sec, duration_nsec):
+    """
+    Converts an OpenFlow duration into seconds.
+
+    :return: (float) seconds or None if the switch does not report it
+    """
+    if duration_sec == DURATION_UNSUPPORTED or \
+            (duration_sec == 0 and duration_nsec == 0):
+        return None
+    return duration_sec + duration_nsec / 1e9
+
+
+class SampleClock(object):
+    """
+    Picks the time base of the counter samples of every datapath.
+
+    Durations reported by the switch are used once it has shown that they
+    have sub-second resolution.  Switches that always report
+    duration_nsec=0 only count whole seconds, which is coarser than the
+    arrival time of the reply, so their samples are timed by arrival.
+    """
+
+    def __init__(self):
+        self.precise = set()
+
+    def timestamp(self, dpid, duration_sec, duration_nsec, arrival):
+        """
+        :return: (tuple) name of the time base, 'duration' or 'arrival',
+        and the time of the sample in seconds
+        """
+        duration = duration_seconds(duration_sec, duration_nsec)
+        if duration is not None and duration_nsec:
+            self.precise.add(dpid)
+        if duration is None or dpid not in self.precise:
+            return 'arrival', arrival
+        return 'duration', duration
+
+    def forget(self, dpid):
+        self.precise.discard(dpid)
+
+
+class CounterRateTracker(object):
+    """
+    Turns consecutive samples of cumulative counters into per second rates.
+
+    The previous sample is kept per key.  Timestamps should come from the
+    switch (e.g. the duration of a port) whenever possible so the rates are
+    not skewed by the time it took the reply to reach the controller.
+
+    A counter that goes backwards either wrapped around or was reset.  It
+    is treated as a wrap when the previous value was in the upper half of
+    the counter range and the new one is in the lower half, anything else
+    is a reset and produces no rates until the next sample.  A sample with
+    the same timestamp as the previous one is ignored, a timestamp going
+    backwards means the port or flow was re-created.
+    """
+
+    def __init__(self, counter_bits=64):
+        self.counter_range = 2 ** counter_bits
+        self.samples = {}
+
+    def update(self, key, timestamp, counters):
+        """
+        Stores a new sample and computes the rates since the previous one.
+
+        :param key: any hashable, e.g. (dpid, port_no)
+        :param timestamp: (float) time of the sample in seconds
+        :param counters: (dict) counter name -> cumulative value
+        :return: (dict) counter name -> rate per second or None if there is
+        no usable previous sample
+        """
+        previous = self.samples.get(key)
+        if previous is None:
+            self.samples[key] = (timestamp, counters)
+            return None
+
+        prev_timestamp, prev_counters = previous
+        elapsed = timestamp - prev_timestamp
+        if elapsed == 0:
+            # polled again within the resolution of the timestamps, the
+            # previous sample stays the base of the next rates
+            return None
+        self.samples[key] = (timestamp, counters)
+        if elapsed < 0:
+            # duration restarted, the port or flow was re-created
+            return None
+
+        rates = {}
+        half = self.counter_range // 2
+        for name, value in counters.items():
+            prev_value = prev_counters.get(name)
+            if prev_value is None:
+                continue
+            delta = value - prev_value
+            if delta < 0:
+                if prev_value >= half > value:
+                    delta += self.counter_range
+                else:
+                    return None
+            rates[name] = delta / elapsed
+        return rates
+
+    def forget(self, dpid):
+        """
+        Drops all samples whose key starts with the given datapath id.
+        """
+        for key in [k for k in self.samples if k[0] == dpid]:
+            del self.samples[key]
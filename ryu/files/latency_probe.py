@@ -0,0 +1,115 @@
+import math
+import struct
+import time
+
+PROBE_MAGIC = b'OFTPROBE'
+PROBE_FORMAT = '!8sIIQ'
+PROBE_LEN = struct.calcsize(PROBE_FORMAT)
+PROBE_UDP_PORT = 10001
+
+PERCENTILES = (50, 99, 99.9)
+
+
+def encode_probe(session_id, seq, timestamp=None):
+    """
+    Probe header carried at the end of the payload.
+
+    :param session_id: (int) probe session the packet belongs to
+    :param seq: (int) sequence number within the session
+    :param timestamp: (float) send time in seconds, defaults to now
+    :return: (bytes)
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    return struct.pack(PROBE_FORMAT, PROBE_MAGIC, session_id, seq,
+                       int(timestamp * 1000000))
+
+
+def decode_probe(data):
+    """
+    Finds the probe header in a packet, wherever the pipeline moved it by
+    pushing or popping headers.
+
+    :param data: (bytes) packet in data
+    :return: (tuple) session id, sequence number and send time in seconds,
+    None if the packet is not a probe
+    """
+    offset = data.rfind(PROBE_MAGIC)
+    if offset < 0 or len(data) - offset < PROBE_LEN:
+        return None
+    _, session_id, seq, timestamp = struct.unpack_from(PROBE_FORMAT, data,
+                                                       offset)
+    return session_id, seq, timestamp / 1000000.0
+
+
+def percentile(values, q):
+    """
+    Nearest rank percentile.
+
+    :param values: (list) sorted values
+    :param q: (float) percentile between 0 and 100
+    """
+    if not values:
+        return None
+    rank = int(math.ceil(q / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class ProbeSession(object):
+    """
+    Round trip times of the probes sent by one session.
+
+    The controller both sends and receives the probes so only the round
+    trip is measured; one way latency would need the switch and controller
+    clocks to be synchronized.
+    """
+
+    def __init__(self, session_id, dpid, port, count, interval):
+        self.session_id = session_id
+        self.dpid = dpid
+        self.port = port
+        self.count = count
+        self.interval = interval
+        self.sent = 0
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.last_seq = -1
+        self.rtts = {}
+        self.start_time = time.time()
+        self.stop_time = None
+        self.error = None
+
+    def received(self, seq, sent_time, now=None):
+        if now is None:
+            now = time.time()
+        if seq in self.rtts:
+            self.duplicates += 1
+            return
+        if seq < self.last_seq:
+            self.out_of_order += 1
+        self.last_seq = max(self.last_seq, seq)
+        self.rtts[seq] = now - sent_time
+
+    def summary(self):
+        rtts = sorted(self.rtts.values())
+        result = {
+            'session_id': self.session_id,
+            'dpid': self.dpid,
+            'port': self.port,
+            'count': self.count,
+            'interval': self.interval,
+            'running': self.stop_time is None,
+            'error': self.error,
+            'sent': self.sent,
+            'received': len(rtts),
+            'lost': self.sent - len(rtts),
+            'duplicates': self.duplicates,
+            'out_of_order': self.out_of_order,
+            'rtt_min': rtts[0] if rtts else None,
+            'rtt_max': rtts[-1] if rtts else None,
+            'rtt_avg': sum(rtts) / len(rtts) if rtts else None
+        }
+        for q in PERCENTILES:
+            result['rtt_p%s' % ('%g' % q).replace('.', '_')] = \
+                percentile(rtts, q)
+        return result
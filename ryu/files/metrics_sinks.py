@@ -0,0 +1,175 @@
+import json
+import logging
+import math
+import os
+import re
+import time
+
+LOG = logging.getLogger(__name__)
+
+
+def make_point(metric, value, timestamp=None, **tags):
+    """
+    Creates a data point in the OpenTSDB /api/put format, which is the
+    format every sink accepts.
+
+    :param metric: (string) full metric name
+    :param value: (int|float) value of the data point
+    :param timestamp: (int) milliseconds since epoch, defaults to now
+    :param tags: tags of the data point, values are converted to strings
+    :return: (dict)
+    """
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    return {
+        'metric': metric,
+        'timestamp': timestamp,
+        'value': value,
+        'tags': {k: str(v) for k, v in tags.items()}
+    }
+
+
+class MetricsSink(object):
+    """
+    Destination of the data points collected by RyuToOpentsdb.
+    """
+
+    def __init__(self):
+        self.points_written = 0
+        self.points_dropped = 0
+
+    def put(self, points):
+        """
+        :param points: (list) points created with make_point(), usually
+        everything built from one stats reply
+        """
+        raise NotImplementedError()
+
+    def stats(self):
+        return {
+            'points_written': self.points_written,
+            'points_dropped': self.points_dropped
+        }
+
+    def close(self):
+        pass
+
+
+class ColumnarFileSink(MetricsSink):
+    """
+    Appends the points to a local file, one file per controller run.
+
+    Every put() is written as one JSON line holding a block of columns:
+    'ts', 'sid' (series id) and 'value'.  The metric name and tags of a
+    series are only written once, in the 'series' list of the first block
+    that uses it, as [series id, metric, tags].
+    """
+
+    def __init__(self, directory):
+        super(ColumnarFileSink, self).__init__()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = os.path.join(
+            directory, time.strftime('run-%Y%m%d-%H%M%S.jsonl'))
+        self.file = open(self.path, 'a')
+        self.series = {}
+        LOG.info('Writing metrics to %s', self.path)
+
+    def put(self, points):
+        if not points:
+            return
+        block = {'series': [], 'ts': [], 'sid': [], 'value': []}
+        for point in points:
+            key = (point['metric'], tuple(sorted(point['tags'].items())))
+            sid = self.series.get(key)
+            if sid is None:
+                sid = self.series[key] = len(self.series)
+                block['series'].append([sid, point['metric'],
+                                        point['tags']])
+            block['ts'].append(point['timestamp'])
+            block['sid'].append(sid)
+            block['value'].append(point['value'])
+        try:
+            self.file.write(json.dumps(block, separators=(',', ':')))
+            self.file.write('\n')
+            self.file.flush()
+        except (IOError, OSError):
+            LOG.exception('Failed to write %i points to %s',
+                          len(points), self.path)
+            self.points_dropped += len(points)
+        else:
+            self.points_written += len(points)
+
+    def close(self):
+        self.file.close()
+
+
+def read_columnar_file(path):
+    """
+    Reads a file written by ColumnarFileSink back into points.
+
+    :param path: (string) file to read
+    :return: generator of points
+    """
+    series = {}
+    with open(path) as f:
+        for line in f:
+            block = json.loads(line)
+            for sid, metric, tags in block['series']:
+                series[sid] = (metric, tags)
+            for ts, sid, value in zip(block['ts'], block['sid'],
+                                      block['value']):
+                metric, tags = series[sid]
+                yield {'metric': metric, 'timestamp': ts, 'value': value,
+                       'tags': tags}
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Keeps the latest value of every series and renders them in the
+    Prometheus text exposition format for scraping.
+    """
+
+    def __init__(self):
+        super(PrometheusSink, self).__init__()
+        self.latest = {}
+
+    def put(self, points):
+        for point in points:
+            key = (point['metric'], tuple(sorted(point['tags'].items())))
+            self.latest[key] = (point['value'], point['timestamp'])
+        self.points_written += len(points)
+
+    def render(self):
+        lines = []
+        metric = None
+        for (name, tags), (value, timestamp) in sorted(self.latest.items()):
+            if name != metric:
+                metric = name
+                lines.append('# TYPE %s gauge' % self._name(name))
+            labels = ','.join('%s="%s"' % (self._name(k), self._label(v))
+                              for k, v in tags)
+            if labels:
+                labels = '{' + labels + '}'
+            lines.append('%s%s %s %d' % (self._name(name), labels,
+                                         self._value(value), timestamp))
+        lines.append('')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _name(name):
+        return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+    @staticmethod
+    def _label(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"') \
+            .replace('\n', '\\n')
+
+    @staticmethod
+    def _value(value):
+        value = float(value)
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
@@ -0,0 +1,128 @@
+import collections
+import json
+import logging
+import time
+from urllib import request as urllib_request
+
+from ryu.lib import hub
+
+from metrics_sinks import MetricsSink
+
+LOG = logging.getLogger(__name__)
+
+HTTP_HEADERS = {'Content-Type': 'application/json'}
+
+
+class OpentsdbBatchWriter(MetricsSink):
+    """
+    Buffers data points and writes them to OpenTSDB in bulk through the HTTP
+    /api/put endpoint.
+
+    A flush happens every flush_interval seconds or as soon as max_batch
+    points are waiting, whichever comes first.  At most max_queue points are
+    buffered; when the buffer is full put() waits up to put_timeout seconds
+    for the flusher to make room and drops whatever still does not fit.
+    """
+
+    def __init__(self, host, port=4242, max_batch=5000, flush_interval=1.0,
+                 max_queue=100000, put_timeout=1.0, http_timeout=10):
+        super(OpentsdbBatchWriter, self).__init__()
+        self.url = 'http://{}:{}/api/put'.format(host, port)
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.http_timeout = http_timeout
+
+        self.pending = collections.deque()
+        self.pending_points = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+        self._wakeup = hub.Event()
+        self.flusher_thread = hub.spawn(self._run_flusher)
+
+    def put(self, points):
+        """
+        Queues a list of points, usually everything built from one stats
+        reply, to be sent in a single bulk request.
+
+        :param points: (list) points created with make_point()
+        """
+        if not points:
+            return
+        deadline = time.time() + self.put_timeout
+        while self.pending_points + len(points) > self.max_queue:
+            self._wakeup.set()
+            if time.time() >= deadline:
+                break
+            hub.sleep(0.01)
+
+        room = max(self.max_queue - self.pending_points, 0)
+        if room < len(points):
+            self.points_dropped += len(points) - room
+            LOG.warning('OpenTSDB queue is full, dropped %i points',
+                        len(points) - room)
+            points = points[:room]
+        if points:
+            self.pending.append(points)
+            self.pending_points += len(points)
+        if self.pending_points >= self.max_batch:
+            self._wakeup.set()
+
+    def flush(self):
+        batch = []
+        while self.pending and len(batch) < self.max_batch:
+            batch.extend(self.pending.popleft())
+        self.pending_points -= len(batch)
+        if not batch:
+            return
+
+        start = time.time()
+        try:
+            self._post(batch)
+        except Exception:
+            LOG.exception('Failed to write %i points to %s',
+                          len(batch), self.url)
+            self.flush_errors += 1
+            self.points_dropped += len(batch)
+        else:
+            self.points_written += len(batch)
+        latency = time.time() - start
+
+        self.flushes += 1
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+    def stats(self):
+        avg_latency = 0.0
+        if self.flushes:
+            avg_latency = self.total_flush_latency / self.flushes
+        return {
+            'points_written': self.points_written,
+            'points_dropped': self.points_dropped,
+            'points_pending': self.pending_points,
+            'flushes': self.flushes,
+            'flush_errors': self.flush_errors,
+            'last_flush_latency': self.last_flush_latency,
+            'max_flush_latency': self.max_flush_latency,
+            'avg_flush_latency': avg_latency
+        }
+
+    def _post(self, batch):
+        req = urllib_request.Request(self.url,
+                                     data=json.dumps(batch).encode(),
+                                     headers=HTTP_HEADERS)
+        urllib_request.urlopen(req, timeout=self.http_timeout).close()
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            while self.pending_points >= self.max_batch:
+                self.flush()
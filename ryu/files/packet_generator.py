@@ -0,0 +1,124 @@
+import logging
+import time
+
+from ryu.lib import hub
+
+LOG = logging.getLogger(__name__)
+
+STATE_RUNNING = 'running'
+STATE_FINISHED = 'finished'
+STATE_STOPPED = 'stopped'
+STATE_FAILED = 'failed'
+
+
+class PacketGeneratorJob(object):
+    """
+    Sends packet outs at a target rate in its own green thread.
+
+    Every tick sends burst packets, spread round robin over the ports, and
+    ticks are scheduled burst / pps seconds apart from the start of the
+    job so the rate does not drift.  If the job falls behind, e.g. because
+    the datapath send queue is full, the missed ticks are skipped instead
+    of being sent back to back.  The job fails as soon as a packet can not
+    be sent any more, e.g. because the datapath disconnected.
+    """
+
+    def __init__(self, job_id, dpid, send, ports, pps, burst=1,
+                 duration=None):
+        """
+        :param job_id: (int) id of the job
+        :param dpid: (int) datapath id
+        :param send: callable taking the port to send one packet out to,
+        returns False if the packet could not be queued
+        :param ports: (list) ports to send the packets to
+        :param pps: (float) target packet outs per second over all ports
+        :param burst: (int) packets sent back to back every tick
+        :param duration: (float) seconds to run, None runs until stopped
+        """
+        if not ports:
+            raise ValueError('At least one port is needed')
+        if pps <= 0 or burst <= 0:
+            raise ValueError('pps and burst need to be positive')
+        self.job_id = job_id
+        self.dpid = dpid
+        self.send = send
+        self.ports = ports
+        self.pps = float(pps)
+        self.burst = int(burst)
+        self.duration = duration
+        self.state = STATE_RUNNING
+        self.error = None
+        self.sent = 0
+        self.start_time = None
+        self.stop_time = None
+        self.thread = None
+        self._stop = False
+
+    def start(self):
+        self.start_time = time.time()
+        self.thread = hub.spawn(self._run)
+
+    def stop(self):
+        self._stop = True
+
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        end = self.stop_time if self.stop_time else time.time()
+        return end - self.start_time
+
+    def status(self):
+        elapsed = self.elapsed()
+        return {
+            'job_id': self.job_id,
+            'dpid': self.dpid,
+            'ports': self.ports,
+            'state': self.state,
+            'error': self.error,
+            'target_pps': self.pps,
+            'burst': self.burst,
+            'duration': self.duration,
+            'sent': self.sent,
+            'elapsed': elapsed,
+            'achieved_pps': self.sent / elapsed if elapsed > 0 else 0.0
+        }
+
+    def _run(self):
+        interval = self.burst / self.pps
+        next_tick = self.start_time
+        port_idx = 0
+        try:
+            while not self._stop:
+                now = time.time()
+                if self.duration and now - self.start_time >= self.duration:
+                    break
+                if next_tick > now:
+                    hub.sleep(next_tick - now)
+                    continue
+                for _ in range(self.burst):
+                    if not self.send(self.ports[port_idx]):
+                        self.error = 'Datapath %016x is closed' % self.dpid
+                        break
+                    port_idx = (port_idx + 1) % len(self.ports)
+                    self.sent += 1
+                if self.error:
+                    break
+                next_tick += interval
+                if next_tick < now:
+                    next_tick = now
+                    # let the hub run even when we can't keep up
+                    hub.sleep(0)
+        except Exception as e:
+            LOG.exception('Packet generator job %i failed', self.job_id)
+            self.state = STATE_FAILED
+            self.error = str(e)
+        else:
+            if self.error:
+                self.state = STATE_FAILED
+            elif self._stop:
+                self.state = STATE_STOPPED
+            else:
+                self.state = STATE_FINISHED
+        self.stop_time = time.time()
+        LOG.info('Packet generator job %i %s after sending %i packets',
+                 self.job_id, self.state, self.sent)
@@ -0,0 +1,116 @@
+import ipaddress
+import random
+
+MAX_FLOWS = 4096
+
+FIELD_TYPES = {
+    'ip_src': 'ip',
+    'ip_dst': 'ip',
+    'eth_src': 'mac',
+    'eth_dst': 'mac',
+    'udp_src_port': 'port',
+    'udp_dst_port': 'port',
+    'outer_vlan': 'vlan',
+    'inner_vlan': 'vlan'
+}
+
+FIELD_LIMITS = {
+    'ip': (1, 2 ** 32 - 2),
+    # random MACs get a locally administered unicast first octet
+    'mac': (1, 2 ** 40 - 1),
+    'port': (1, 65535),
+    'vlan': (1, 4094)
+}
+
+
+def _to_int(field_type, value):
+    if field_type == 'ip':
+        return int(ipaddress.IPv4Address(value))
+    if field_type == 'mac':
+        return int(value.replace(':', ''), 16)
+    return int(value)
+
+
+def _from_int(field_type, value):
+    if field_type == 'ip':
+        return str(ipaddress.IPv4Address(value))
+    if field_type == 'mac':
+        return ':'.join('%02x' % b for b in value.to_bytes(6, 'big'))
+    return value
+
+
+def field_values(field, spec, rng):
+    """
+    Values of one header field for a variation spec.
+
+    :param field: (string) make_packet argument, one of FIELD_TYPES
+    :param spec: (dict) one of {'range': [first, last]}, {'values': [...]}
+    or {'random': count}
+    :param rng: random.Random used for random sets
+    :return: (list) values accepted by make_packet
+    """
+    if field not in FIELD_TYPES:
+        raise ValueError('Field %s can not be varied' % field)
+    field_type = FIELD_TYPES[field]
+
+    if 'values' in spec:
+        values = list(spec['values'])
+    elif 'range' in spec:
+        first, last = (_to_int(field_type, v) for v in spec['range'])
+        if last < first or last - first >= MAX_FLOWS:
+            raise ValueError('Invalid range for %s' % field)
+        values = [_from_int(field_type, v) for v in range(first, last + 1)]
+    elif 'random' in spec:
+        count = int(spec['random'])
+        low, high = FIELD_LIMITS[field_type]
+        if count <= 0 or count > min(MAX_FLOWS, high - low + 1):
+            raise ValueError('Invalid random count for %s' % field)
+        prefix = 0x02 << 40 if field_type == 'mac' else 0
+        values = [_from_int(field_type, prefix | v)
+                  for v in rng.sample(range(low, high + 1), count)]
+    else:
+        raise ValueError('Unknown variation for %s: %s' % (field, spec))
+
+    if not values:
+        raise ValueError('No values for %s' % field)
+    return values
+
+
+def expand_variations(variations, flows=None, seed=0):
+    """
+    Turns a field variation spec into the header fields of every flow.
+
+    Flows take the combinations of the field values in the order of
+    itertools.product over the fields sorted by name, the last field
+    changing fastest, so every flow is distinct.
+
+    :param variations: (dict) field -> spec, see field_values()
+    :param flows: (int) number of distinct flows, defaults to every
+    combination up to MAX_FLOWS
+    :param seed: (int) seed for random sets so runs are repeatable
+    :return: (list) of dicts with the varied fields of every flow
+    """
+    rng = random.Random(seed)
+    values = [(field, field_values(field, spec, rng))
+              for field, spec in sorted(variations.items())]
+    combinations = 1
+    for _, field_set in values:
+        combinations *= len(field_set)
+    if flows is None:
+        flows = min(combinations, MAX_FLOWS)
+    if flows <= 0 or flows > MAX_FLOWS:
+        raise ValueError('Number of flows must be between 1 and %i'
+                         % MAX_FLOWS)
+    if flows > combinations:
+        raise ValueError('Only %i distinct flows, %i asked for'
+                         % (combinations, flows))
+
+    result = []
+    for i in range(flows):
+        flow = {}
+        index = i
+        for field, field_set in reversed(values):
+            index, digit = divmod(index, len(field_set))
+            flow[field] = field_set[digit]
+        result.append(flow)
+    return result
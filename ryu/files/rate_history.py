@@ -0,0 +1,96 @@
+from array import array
+
+RATE_FIELDS = ('rx_bps', 'tx_bps', 'rx_pps', 'tx_pps')
+
+
+class RateRing(object):
+    """
+    Fixed size ring of rate samples.  Timestamps and every field are kept
+    in their own array of doubles so memory use does not grow with the
+    number of samples.
+    """
+
+    def __init__(self, capacity, fields=RATE_FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.columns = [array('d', bytes(8 * capacity)) for _ in fields]
+        self.head = 0
+        self.size = 0
+
+    def append(self, timestamp, values):
+        """
+        :param timestamp: (float) seconds since epoch
+        :param values: (sequence) one value per field, in field order
+        """
+        self.timestamps[self.head] = timestamp
+        for column, value in zip(self.columns, values):
+            column[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def window(self, since):
+        """
+        Samples newer than since, oldest first.
+
+        :param since: (float) seconds since epoch
+        :return: (dict) 'timestamp' and every field -> list of values
+        """
+        start = (self.head - self.size) % self.capacity
+        indexes = [(start + i) % self.capacity for i in range(self.size)]
+        indexes = [i for i in indexes if self.timestamps[i] > since]
+        result = {'timestamp': [self.timestamps[i] for i in indexes]}
+        for field, column in zip(self.fields, self.columns):
+            result[field] = [column[i] for i in indexes]
+        return result
+
+
+class RateHistory(object):
+    """
+    Recent per port rates of every datapath plus the sum over all ports of
+    each stats reply.
+    """
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.ports = {}
+        self.totals = {}
+
+    def add(self, dpid, timestamp, port_rates):
+        """
+        Stores the rates of one port stats reply.
+
+        :param dpid: (int) datapath id
+        :param timestamp: (float) arrival time of the reply
+        :param port_rates: (dict) port_no -> values in RATE_FIELDS order
+        """
+        if not port_rates:
+            return
+        ports = self.ports.setdefault(dpid, {})
+        total = [0.0] * len(RATE_FIELDS)
+        for port_no, values in port_rates.items():
+            ring = ports.get(port_no)
+            if ring is None:
+                ring = ports[port_no] = RateRing(self.capacity)
+            ring.append(timestamp, values)
+            total = [t + v for t, v in zip(total, values)]
+        if dpid not in self.totals:
+            self.totals[dpid] = RateRing(self.capacity)
+        self.totals[dpid].append(timestamp, total)
+
+    def window(self, dpid, since, with_ports=True):
+        """
+        :return: (dict) or None if nothing was recorded for the datapath
+        """
+        if dpid not in self.totals:
+            return None
+        result = {'dpid': dpid,
+                  'total': self.totals[dpid].window(since)}
+        if with_ports:
+            result['ports'] = {port_no: ring.window(since) for port_no, ring
+                               in sorted(self.ports[dpid].items())}
+        return result
+
+    def forget(self, dpid):
+        self.ports.pop(dpid, None)
+        self.totals.pop(dpid, None)
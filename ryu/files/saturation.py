@@ -0,0 +1,33 @@
+class PlateauDetector(object):
+    """
+    Decides when the per port rates stopped growing.
+
+    Ports below min_rate are ignored.  The rates have reached a plateau
+    when the same ports are active as in the previous round and each of
+    them changed by at most tolerance (relative), for stable_rounds rounds
+    in a row.
+    """
+
+    def __init__(self, tolerance=0.05, stable_rounds=2, min_rate=1000):
+        self.tolerance = tolerance
+        self.stable_rounds = stable_rounds
+        self.min_rate = min_rate
+        self.previous = {}
+        self.stable = 0
+
+    def update(self, rates):
+        """
+        :param rates: (dict) port -> rate
+        :return: (bool) True once the rates are on a plateau
+        """
+        active = {port: rate for port, rate in rates.items()
+                  if rate >= self.min_rate}
+        plateau = bool(active) and set(active) == set(self.previous)
+        if plateau:
+            for port, rate in active.items():
+                if abs(rate - self.previous[port]) / rate > self.tolerance:
+                    plateau = False
+                    break
+        self.previous = active
+        self.stable = self.stable + 1 if plateau else 0
+        return self.stable >= self.stable_rounds
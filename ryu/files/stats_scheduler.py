@@ -0,0 +1,110 @@
+import random
+import time
+
+MIN_INTERVAL = 0.1
+
+
+class StatsPollScheduler(object):
+    """
+    Keeps track of when each datapath has to be polled for stats.
+
+    Every datapath has its own polling interval and may temporarily run in
+    burst mode with a shorter interval that expires on its own.  The first
+    poll of a datapath, and the first poll after its interval changes, is
+    placed at a random offset within the interval so that switches are not
+    polled in lockstep.
+    """
+
+    def __init__(self, default_interval=10.0):
+        self.default_interval = max(float(default_interval), MIN_INTERVAL)
+        self.intervals = {}
+        self.bursts = {}
+        self.next_poll = {}
+
+    def add(self, dpid, now=None):
+        now = time.time() if now is None else now
+        self.next_poll[dpid] = now + random.uniform(0, self.interval(dpid,
+                                                                     now))
+
+    def remove(self, dpid):
+        self.next_poll.pop(dpid, None)
+
+    def set_interval(self, dpid, interval, now=None):
+        """
+        Sets the regular polling interval of a datapath.
+
+        :param dpid: (int) datapath id
+        :param interval: (float) seconds between polls, None resets it to
+        the default interval
+        """
+        if interval is None:
+            self.intervals.pop(dpid, None)
+        else:
+            self.intervals[dpid] = max(float(interval), MIN_INTERVAL)
+        self._stagger(dpid, now)
+
+    def start_burst(self, dpid, interval, duration, now=None):
+        """
+        Polls a datapath with a shorter interval for a limited time.
+
+        :param dpid: (int) datapath id
+        :param interval: (float) seconds between polls while bursting
+        :param duration: (float) seconds until the regular interval is
+        restored
+        """
+        now = time.time() if now is None else now
+        self.bursts[dpid] = (max(float(interval), MIN_INTERVAL),
+                             now + float(duration))
+        self._stagger(dpid, now)
+
+    def stop_burst(self, dpid, now=None):
+        if self.bursts.pop(dpid, None):
+            self._stagger(dpid, now)
+
+    def interval(self, dpid, now=None):
+        now = time.time() if now is None else now
+        burst = self.bursts.get(dpid)
+        if burst:
+            interval, expires = burst
+            if now < expires:
+                return interval
+            del self.bursts[dpid]
+        return self.intervals.get(dpid, self.default_interval)
+
+    def burst(self, dpid, now=None):
+        now = time.time() if now is None else now
+        burst = self.bursts.get(dpid)
+        if not burst or burst[1] <= now:
+            return None
+        return {'interval': burst[0], 'remaining': burst[1] - now}
+
+    def due(self, now=None):
+        """
+        Returns the datapaths that have to be polled now and schedules their
+        next poll.
+
+        :return: (list) datapath ids
+        """
+        now = time.time() if now is None else now
+        result = []
+        for dpid, due in self.next_poll.items():
+            if due > now:
+                continue
+            result.append(dpid)
+            interval = self.interval(dpid, now)
+            due += interval
+            if due <= now:
+                # fell behind, skip the missed polls instead of catching up
+                due = now + interval
+            self.next_poll[dpid] = due
+        return result
+
+    def seconds_to_next_poll(self, now=None):
+        now = time.time() if now is None else now
+        if not self.next_poll:
+            return self.default_interval
+        return max(min(self.next_poll.values()) - now, 0)
+
+    def _stagger(self, dpid, now=None):
+        if dpid in self.next_poll:
+            self.add(dpid, now)
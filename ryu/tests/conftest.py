@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the controller apps import their helpers as top level modules, the way
+# ryu-manager loads them from /files
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                'files'))
@@ -0,0 +1,72 @@
+import unittest
+
+from counter_rates import DURATION_UNSUPPORTED, CounterRateTracker, \
+    SampleClock, duration_seconds
+
+
+class TestCounterRates(unittest.TestCase):
+
+    def test_duration_seconds(self):
+        self.assertEqual(duration_seconds(2, 500000000), 2.5)
+        self.assertIsNone(duration_seconds(0, 0))
+        self.assertIsNone(duration_seconds(DURATION_UNSUPPORTED, 0))
+
+    def test_rates(self):
+        tracker = CounterRateTracker()
+        self.assertIsNone(tracker.update('a', 10, {'packets': 100}))
+        self.assertEqual(tracker.update('a', 12, {'packets': 300}),
+                         {'packets': 100})
+
+    def test_wrap(self):
+        tracker = CounterRateTracker(counter_bits=32)
+        tracker.update('a', 10, {'packets': 2 ** 32 - 100})
+        self.assertEqual(tracker.update('a', 11, {'packets': 50}),
+                         {'packets': 150})
+
+    def test_reset(self):
+        tracker = CounterRateTracker(counter_bits=32)
+        tracker.update('a', 10, {'packets': 1000})
+        self.assertIsNone(tracker.update('a', 11, {'packets': 10}))
+        # the reset value is the base of the next rates
+        self.assertEqual(tracker.update('a', 12, {'packets': 30}),
+                         {'packets': 20})
+
+    def test_equal_durations_keep_the_previous_sample(self):
+        tracker = CounterRateTracker()
+        tracker.update('a', 10, {'packets': 0})
+        self.assertIsNone(tracker.update('a', 10, {'packets': 100}))
+        # the rate covers the whole second since the kept sample
+        self.assertEqual(tracker.update('a', 11, {'packets': 1000}),
+                         {'packets': 1000})
+
+    def test_restarted_duration(self):
+        tracker = CounterRateTracker()
+        tracker.update('a', 100, {'packets': 5000})
+        self.assertIsNone(tracker.update('a', 1, {'packets': 10}))
+        self.assertEqual(tracker.update('a', 2, {'packets': 110}),
+                         {'packets': 100})
+
+    def test_forget(self):
+        tracker = CounterRateTracker()
+        tracker.update((1, 5), 10, {'packets': 0})
+        tracker.update((2, 5), 10, {'packets': 0})
+        tracker.forget(1)
+        self.assertEqual(list(tracker.samples), [(2, 5)])
+
+    def test_sample_clock(self):
+        clock = SampleClock()
+        # whole second durations are timed by arrival
+        self.assertEqual(clock.timestamp(1, 5, 0, 1000.25),
+                         ('arrival', 1000.25))
+        self.assertEqual(clock.timestamp(2, 5, 250000000, 1000.25),
+                         ('duration', 5.25))
+        self.assertEqual(clock.timestamp(2, 6, 0, 1001.0),
+                         ('duration', 6.0))
+        self.assertEqual(clock.timestamp(2, DURATION_UNSUPPORTED, 0, 1002),
+                         ('arrival', 1002))
+        clock.forget(2)
+        self.assertEqual(clock.timestamp(2, 7, 0, 1003), ('arrival', 1003))
+
+
+if __name__ == '__main__':
+    unittest.main()
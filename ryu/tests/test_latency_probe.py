@@ -0,0 +1,61 @@
+import unittest
+
+from latency_probe import PROBE_LEN, ProbeSession, decode_probe, \
+    encode_probe, percentile
+
+
+class TestLatencyProbe(unittest.TestCase):
+
+    def test_round_trip(self):
+        probe = encode_probe(3, 42, 1500000000.25)
+        self.assertEqual(len(probe), PROBE_LEN)
+        self.assertEqual(decode_probe(probe), (3, 42, 1500000000.25))
+
+    def test_probe_found_at_any_offset(self):
+        probe = encode_probe(1, 7, 10.5)
+        for header in (b'', b'\x00' * 14, b'\x00' * 18):
+            self.assertEqual(decode_probe(header + probe), (1, 7, 10.5))
+
+    def test_not_a_probe(self):
+        self.assertIsNone(decode_probe(b'\x00' * 64))
+        # magic without the rest of the header
+        self.assertIsNone(decode_probe(encode_probe(1, 1)[:-1]))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 99.9), 100)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([5], 99.9), 5)
+        self.assertIsNone(percentile([], 50))
+
+    def test_session_summary(self):
+        session = ProbeSession(1, 1, 5, 5, 0.1)
+        session.sent = 5
+        session.received(0, 10.0, 10.001)
+        session.received(2, 10.2, 10.203)
+        session.received(1, 10.1, 10.102)
+        session.received(2, 10.2, 10.3)
+
+        summary = session.summary()
+        self.assertEqual(summary['received'], 3)
+        self.assertEqual(summary['lost'], 2)
+        self.assertEqual(summary['duplicates'], 1)
+        self.assertEqual(summary['out_of_order'], 1)
+        self.assertAlmostEqual(summary['rtt_min'], 0.001)
+        self.assertAlmostEqual(summary['rtt_max'], 0.003)
+        self.assertAlmostEqual(summary['rtt_avg'], 0.002)
+        self.assertAlmostEqual(summary['rtt_p50'], 0.002)
+        self.assertAlmostEqual(summary['rtt_p99_9'], 0.003)
+        self.assertTrue(summary['running'])
+
+    def test_empty_session(self):
+        summary = ProbeSession(1, 1, 5, 5, 0.1).summary()
+        self.assertEqual(summary['received'], 0)
+        self.assertIsNone(summary['rtt_avg'])
+        self.assertIsNone(summary['rtt_p99'])
+
+
+if __name__ == '__main__':
+    unittest.main()
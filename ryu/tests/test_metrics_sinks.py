@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from metrics_sinks import ColumnarFileSink, PrometheusSink, make_point, \
+    read_columnar_file
+
+
+class TestMetricsSinks(unittest.TestCase):
+
+    def test_make_point(self):
+        self.assertEqual(make_point('a.b', 5, 1000, dpid=1, port=2), {
+            'metric': 'a.b', 'timestamp': 1000, 'value': 5,
+            'tags': {'dpid': '1', 'port': '2'}})
+
+    def test_columnar_file_round_trip(self):
+        sink = ColumnarFileSink(tempfile.gettempdir())
+        self.addCleanup(os.remove, sink.path)
+        first = [make_point('port.packets', 1, 1000, port=1),
+                 make_point('port.packets', 2, 1000, port=2)]
+        second = [make_point('port.packets', 3, 2000, port=1)]
+        sink.put(first)
+        sink.put(second)
+        sink.put([])
+        sink.close()
+
+        self.assertEqual(list(read_columnar_file(sink.path)),
+                         first + second)
+        self.assertEqual(sink.stats(), {'points_written': 3,
+                                        'points_dropped': 0})
+        with open(sink.path) as f:
+            blocks = f.read().splitlines()
+        # series are only described in the block that first uses them
+        self.assertEqual(len(blocks), 2)
+        self.assertNotIn('port.packets', blocks[1])
+
+    def test_prometheus_keeps_latest_value(self):
+        sink = PrometheusSink()
+        sink.put([make_point('oftester.port.packets', 1, 1000, port=1)])
+        sink.put([make_point('oftester.port.packets', 7, 2000, port=1),
+                  make_point('oftester.flow.bits', 8, 2000)])
+        self.assertEqual(sink.render().splitlines(), [
+            '# TYPE oftester_flow_bits gauge',
+            'oftester_flow_bits 8.0 2000',
+            '# TYPE oftester_port_packets gauge',
+            'oftester_port_packets{port="1"} 7.0 2000'])
+
+    def test_prometheus_escapes_labels(self):
+        sink = PrometheusSink()
+        sink.put([make_point('m', 1, 1000, name='a"b\\c\nd')])
+        self.assertIn('m{name="a\\"b\\\\c\\nd"} 1.0 1000',
+                      sink.render())
+
+    def test_prometheus_non_finite_values(self):
+        sink = PrometheusSink()
+        sink.put([make_point('a', float('inf'), 1000),
+                  make_point('b', float('-inf'), 1000),
+                  make_point('c', float('nan'), 1000)])
+        lines = sink.render().splitlines()
+        self.assertIn('a +Inf 1000', lines)
+        self.assertIn('b -Inf 1000', lines)
+        self.assertIn('c NaN 1000', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
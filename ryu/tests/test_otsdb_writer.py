@@ -0,0 +1,65 @@
+import unittest
+
+from metrics_sinks import make_point
+
+try:
+    from otsdb_writer import OpentsdbBatchWriter
+except ImportError:
+    OpentsdbBatchWriter = None
+
+
+def points(count):
+    return [make_point('oftester.test', i, 1000, dpid=1)
+            for i in range(count)]
+
+
+@unittest.skipIf(OpentsdbBatchWriter is None, 'needs Ryu')
+class TestOpentsdbBatchWriter(unittest.TestCase):
+
+    def make_writer(self, **kwargs):
+        writer = OpentsdbBatchWriter('localhost', flush_interval=3600,
+                                     **kwargs)
+        writer.batches = []
+        writer._post = writer.batches.append
+        return writer
+
+    def test_flush_sends_whole_puts_up_to_max_batch(self):
+        writer = self.make_writer(max_batch=5)
+        writer.put(points(3))
+        writer.put(points(3))
+        writer.put(points(2))
+        self.assertEqual(writer.pending_points, 8)
+
+        writer.flush()
+        # puts are never split, the batch ends after the one crossing it
+        self.assertEqual(len(writer.batches[0]), 6)
+        writer.flush()
+        self.assertEqual(len(writer.batches[1]), 2)
+        self.assertEqual(writer.pending_points, 0)
+        self.assertEqual(writer.stats()['points_written'], 8)
+        self.assertEqual(writer.stats()['flushes'], 2)
+
+    def test_full_queue_drops_what_does_not_fit(self):
+        writer = self.make_writer(max_queue=5, put_timeout=0)
+        writer.put(points(4))
+        writer.put(points(3))
+        self.assertEqual(writer.pending_points, 5)
+        self.assertEqual(writer.points_dropped, 2)
+
+    def test_failed_flush_counts_dropped_points(self):
+        writer = self.make_writer()
+
+        def fail(batch):
+            raise IOError('connection refused')
+
+        writer._post = fail
+        writer.put(points(3))
+        writer.flush()
+        stats = writer.stats()
+        self.assertEqual(stats['flush_errors'], 1)
+        self.assertEqual(stats['points_dropped'], 3)
+        self.assertEqual(stats['points_pending'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+try:
+    from packet_generator import STATE_FAILED, STATE_FINISHED, \
+        PacketGeneratorJob
+except ImportError:
+    PacketGeneratorJob = None
+
+
+@unittest.skipIf(PacketGeneratorJob is None, 'needs Ryu')
+class TestPacketGeneratorJob(unittest.TestCase):
+
+    def test_invalid_jobs(self):
+        with self.assertRaises(ValueError):
+            PacketGeneratorJob(1, 1, None, [], 100)
+        with self.assertRaises(ValueError):
+            PacketGeneratorJob(1, 1, None, [1], 0)
+
+    def test_round_robin_until_duration(self):
+        sent = []
+
+        def send(port):
+            sent.append(port)
+            return True
+
+        job = PacketGeneratorJob(1, 1, send, [1, 2], 1000, burst=3,
+                                 duration=0.05)
+        job.start()
+        job.thread.wait()
+        self.assertEqual(job.state, STATE_FINISHED)
+        self.assertEqual(job.sent, len(sent))
+        self.assertEqual(sent[:4], [1, 2, 1, 2])
+        self.assertEqual(job.sent % 3, 0)
+
+    def test_fails_when_the_datapath_is_closed(self):
+        sent = []
+
+        def send(port):
+            if len(sent) == 5:
+                return False
+            sent.append(port)
+            return True
+
+        job = PacketGeneratorJob(1, 1, send, [1], 100000, burst=4)
+        job.start()
+        job.thread.wait()
+        self.assertEqual(job.state, STATE_FAILED)
+        self.assertEqual(job.sent, 5)
+        self.assertIn('closed', job.status()['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
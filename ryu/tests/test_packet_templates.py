@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from packet_templates import MAX_FLOWS, expand_variations, field_values
+
+
+class TestPacketTemplates(unittest.TestCase):
+
+    def test_ip_range(self):
+        values = field_values('ip_src', {'range': ['10.0.0.254', '10.0.1.1']},
+                              random.Random(0))
+        self.assertEqual(values, ['10.0.0.254', '10.0.0.255', '10.0.1.0',
+                                  '10.0.1.1'])
+
+    def test_mac_range(self):
+        values = field_values('eth_dst', {'range': ['00:00:00:00:00:ff',
+                                                    '00:00:00:00:01:00']},
+                              random.Random(0))
+        self.assertEqual(values, ['00:00:00:00:00:ff', '00:00:00:00:01:00'])
+
+    def test_explicit_values(self):
+        self.assertEqual(field_values('outer_vlan', {'values': [10, 20]},
+                                      random.Random(0)), [10, 20])
+
+    def test_random_values(self):
+        values = field_values('eth_src', {'random': 50}, random.Random(1))
+        self.assertEqual(len(set(values)), 50)
+        # locally administered unicast
+        self.assertTrue(all(v.startswith('02:') for v in values))
+        ports = field_values('udp_dst_port', {'random': 10},
+                             random.Random(1))
+        self.assertTrue(all(1 <= p <= 65535 for p in ports))
+
+    def test_invalid_specs(self):
+        rng = random.Random(0)
+        for field, spec in [
+                ('ip_ttl', {'values': [1]}),
+                ('ip_src', {'range': ['10.0.0.2', '10.0.0.1']}),
+                ('udp_src_port', {'range': [1, MAX_FLOWS + 1]}),
+                ('outer_vlan', {'random': 4095}),
+                ('outer_vlan', {'random': 0}),
+                ('outer_vlan', {'values': []}),
+                ('outer_vlan', {'step': 1})]:
+            with self.assertRaises(ValueError, msg=(field, spec)):
+                field_values(field, spec, rng)
+
+    def test_flows_are_distinct_combinations(self):
+        flows = expand_variations({
+            'udp_src_port': {'range': [1, 3]},
+            'outer_vlan': {'values': [10, 20]}})
+        self.assertEqual(flows, [
+            {'outer_vlan': 10, 'udp_src_port': 1},
+            {'outer_vlan': 10, 'udp_src_port': 2},
+            {'outer_vlan': 10, 'udp_src_port': 3},
+            {'outer_vlan': 20, 'udp_src_port': 1},
+            {'outer_vlan': 20, 'udp_src_port': 2},
+            {'outer_vlan': 20, 'udp_src_port': 3}])
+
+    def test_flows_count(self):
+        variations = {'udp_src_port': {'values': [1, 2]},
+                      'outer_vlan': {'values': [10, 20]}}
+        flows = expand_variations(variations, flows=4)
+        self.assertEqual(len({tuple(sorted(f.items())) for f in flows}), 4)
+        self.assertEqual(len(expand_variations(variations, flows=3)), 3)
+        self.assertEqual(expand_variations({}), [{}])
+        for flows in (0, 5):
+            with self.assertRaises(ValueError):
+                expand_variations(variations, flows)
+        with self.assertRaises(ValueError):
+            expand_variations({'udp_src_port': {'random': 100},
+                               'ip_src': {'random': 100}}, MAX_FLOWS + 1)
+
+    def test_flows_default_to_max_flows(self):
+        flows = expand_variations({'udp_src_port': {'random': 100},
+                                   'ip_src': {'random': 100}})
+        self.assertEqual(len(flows), MAX_FLOWS)
+
+    def test_seed_is_repeatable(self):
+        variations = {'ip_dst': {'random': 20}}
+        self.assertEqual(expand_variations(variations, seed=7),
+                         expand_variations(variations, seed=7))
+        self.assertNotEqual(expand_variations(variations, seed=7),
+                            expand_variations(variations, seed=8))
+
+
+if __name__ == '__main__':
+    unittest.main()
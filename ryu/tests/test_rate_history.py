@@ -0,0 +1,44 @@
+import unittest
+
+from rate_history import RateHistory, RateRing
+
+
+class TestRateHistory(unittest.TestCase):
+
+    def test_ring_wraps_around(self):
+        ring = RateRing(3, fields=('pps',))
+        for ts in range(1, 6):
+            ring.append(ts, [ts * 10])
+        self.assertEqual(ring.window(0), {'timestamp': [3, 4, 5],
+                                          'pps': [30, 40, 50]})
+        self.assertEqual(ring.window(4), {'timestamp': [5], 'pps': [50]})
+
+    def test_ring_not_full(self):
+        ring = RateRing(5, fields=('pps',))
+        self.assertEqual(ring.window(0), {'timestamp': [], 'pps': []})
+        ring.append(1, [10])
+        self.assertEqual(ring.window(0), {'timestamp': [1], 'pps': [10]})
+
+    def test_history_totals_and_ports(self):
+        history = RateHistory(capacity=10)
+        history.add(1, 100, {5: (8, 16, 1, 2), 6: (80, 160, 10, 20)})
+        history.add(1, 110, {})
+        history.add(1, 120, {5: (8, 16, 1, 2)})
+
+        result = history.window(1, 0)
+        self.assertEqual(result['total']['timestamp'], [100, 120])
+        self.assertEqual(result['total']['tx_pps'], [22, 2])
+        self.assertEqual(result['ports'][6]['rx_bps'], [80])
+        self.assertNotIn('ports', history.window(1, 0, with_ports=False))
+        self.assertEqual(history.window(1, 100)['total']['timestamp'],
+                         [120])
+
+    def test_forget(self):
+        history = RateHistory()
+        history.add(1, 100, {5: (0, 0, 0, 0)})
+        history.forget(1)
+        self.assertIsNone(history.window(1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from saturation import PlateauDetector
+
+
+class TestPlateauDetector(unittest.TestCase):
+
+    def test_plateau_after_stable_rounds(self):
+        detector = PlateauDetector(tolerance=0.05, stable_rounds=2)
+        self.assertFalse(detector.update({1: 1000, 2: 2000}))
+        self.assertFalse(detector.update({1: 10000, 2: 20000}))
+        self.assertFalse(detector.update({1: 10100, 2: 20100}))
+        self.assertTrue(detector.update({1: 10000, 2: 20000}))
+
+    def test_growth_resets_the_count(self):
+        detector = PlateauDetector(tolerance=0.05, stable_rounds=2)
+        for rate in (5000, 5000, 6000, 6000):
+            plateau = detector.update({1: rate})
+        self.assertFalse(plateau)
+        self.assertTrue(detector.update({1: 6000}))
+
+    def test_idle_ports_are_ignored(self):
+        detector = PlateauDetector(stable_rounds=1, min_rate=1000)
+        self.assertFalse(detector.update({1: 0, 2: 10}))
+        self.assertFalse(detector.update({1: 0, 2: 10}))
+        detector.update({1: 5000, 2: 10})
+        self.assertTrue(detector.update({1: 5000, 2: 999}))
+
+    def test_new_active_port_is_no_plateau(self):
+        detector = PlateauDetector(stable_rounds=1)
+        detector.update({1: 5000})
+        self.assertFalse(detector.update({1: 5000, 2: 5000}))
+        self.assertTrue(detector.update({1: 5000, 2: 5000}))
+
+
+if __name__ == '__main__':
+    unittest.main()
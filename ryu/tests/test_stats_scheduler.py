@@ -0,0 +1,57 @@
+import unittest
+
+from stats_scheduler import MIN_INTERVAL, StatsPollScheduler
+
+
+class TestStatsPollScheduler(unittest.TestCase):
+
+    def test_first_poll_is_staggered_within_the_interval(self):
+        scheduler = StatsPollScheduler(10)
+        for dpid in range(20):
+            scheduler.add(dpid, now=100)
+        polls = scheduler.next_poll.values()
+        self.assertTrue(all(100 <= due <= 110 for due in polls))
+        self.assertGreater(len(set(polls)), 1)
+
+    def test_due_schedules_the_next_poll(self):
+        scheduler = StatsPollScheduler(10)
+        scheduler.next_poll[1] = 100
+        self.assertEqual(scheduler.due(now=99), [])
+        self.assertEqual(scheduler.seconds_to_next_poll(now=99), 1)
+        self.assertEqual(scheduler.due(now=100), [1])
+        self.assertEqual(scheduler.next_poll[1], 110)
+        # missed polls are skipped rather than caught up
+        self.assertEqual(scheduler.due(now=135), [1])
+        self.assertEqual(scheduler.next_poll[1], 145)
+
+    def test_interval_per_datapath(self):
+        scheduler = StatsPollScheduler(10)
+        scheduler.set_interval(1, 2)
+        scheduler.set_interval(2, 0)
+        self.assertEqual(scheduler.interval(1), 2)
+        self.assertEqual(scheduler.interval(2), MIN_INTERVAL)
+        self.assertEqual(scheduler.interval(3), 10)
+        scheduler.set_interval(1, None)
+        self.assertEqual(scheduler.interval(1), 10)
+
+    def test_burst_expires(self):
+        scheduler = StatsPollScheduler(10)
+        scheduler.add(1, now=0)
+        scheduler.start_burst(1, 0.5, 30, now=100)
+        self.assertLessEqual(scheduler.next_poll[1], 100.5)
+        self.assertEqual(scheduler.interval(1, now=110), 0.5)
+        self.assertEqual(scheduler.burst(1, now=110),
+                         {'interval': 0.5, 'remaining': 20})
+        self.assertIsNone(scheduler.burst(1, now=130))
+        self.assertEqual(scheduler.interval(1, now=130), 10)
+
+    def test_stop_burst(self):
+        scheduler = StatsPollScheduler(10)
+        scheduler.start_burst(1, 0.5, 30, now=100)
+        scheduler.stop_burst(1, now=101)
+        self.assertEqual(scheduler.interval(1, now=101), 10)
+        self.assertIsNone(scheduler.burst(1, now=101))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import Mock, patch
+
+try:
+    import TpnRyuUtils
+except ImportError:
+    TpnRyuUtils = None
+
+
+class FakeDatapath(object):
+
+    def __init__(self):
+        self.id = 1
+        self.xid = 0
+        self.ofproto = Mock(MAX_XID=0xffffffff)
+        self.ofproto_parser = Mock()
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.xid = self.xid
+        return self.xid
+
+
+@unittest.skipIf(TpnRyuUtils is None, 'needs Ryu')
+class TestFlowModErrors(unittest.TestCase):
+
+    def setUp(self):
+        self.dp = FakeDatapath()
+        self.app = TpnRyuUtils.TpnRyuUtils.__new__(TpnRyuUtils.TpnRyuUtils)
+        self.app.dpset = Mock()
+        self.app.dpset.get.return_value = self.dp
+        self.app.flow_mod_xids = {}
+
+    def error(self, xid):
+        return Mock(msg=Mock(datapath=self.dp, xid=xid, type=5, code=1))
+
+    def test_errors_are_matched_by_exact_xid(self):
+        def mod_flow_entry(dp, flow, cmd):
+            dp.set_xid(Mock(xid=None))
+            # another app sends to the switch in between
+            self.dp.set_xid(Mock(xid=None))
+
+        def barrier(app, msg, reply_cls):
+            # the switch rejects the second flow and the stats request
+            app.error_msg_handler(self.error(3))
+            app.error_msg_handler(self.error(4))
+
+        with patch.object(TpnRyuUtils.ofctl_v1_3, 'mod_flow_entry',
+                          side_effect=mod_flow_entry), \
+                patch.object(TpnRyuUtils.ofctl_api, 'send_msg',
+                             side_effect=barrier):
+            result = self.app.mod_entries(1, flows=[{}, {}])
+
+        self.assertEqual(result['errors'], 1)
+        self.assertEqual(result['error_samples'],
+                         [{'xid': 3, 'type': 5, 'code': 1}])
+        self.assertEqual(self.app.flow_mod_xids, {})
+
+    def test_recorder_passes_through(self):
+        xids = []
+        recorder = TpnRyuUtils.XidRecorder(self.dp, xids.append)
+        msg = Mock(xid=None)
+        self.assertEqual(recorder.set_xid(msg), 1)
+        self.assertEqual(xids, [1])
+        self.assertIs(recorder.ofproto, self.dp.ofproto)
+
+
+@unittest.skipIf(TpnRyuUtils is None, 'needs Ryu')
+class TestSendWithXid(unittest.TestCase):
+
+    def test_every_send_gets_its_own_xid(self):
+        dp = FakeDatapath()
+        dp.send = Mock(return_value=True)
+        buf = bytearray(b'\x04\x0d\x00\x10\x00\x00\x00\x00payload!')
+
+        self.assertTrue(TpnRyuUtils.send_with_xid(dp, buf))
+        TpnRyuUtils.send_with_xid(dp, buf)
+
+        sent = [args[0] for args, _ in dp.send.call_args_list]
+        self.assertEqual([bytes(msg[4:8]) for msg in sent],
+                         [b'\x00\x00\x00\x01', b'\x00\x00\x00\x02'])
+        self.assertEqual([bytes(msg[8:]) for msg in sent], [b'payload!'] * 2)
+        # the cached buffer is not touched
+        self.assertEqual(bytes(buf[4:8]), b'\x00' * 4)
+
+    def test_xid_wraps(self):
+        dp = FakeDatapath()
+        dp.xid = dp.ofproto.MAX_XID
+        dp.send = Mock()
+        TpnRyuUtils.send_with_xid(dp, bytearray(8))
+        self.assertEqual(dp.xid, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()